@@ -0,0 +1,155 @@
+from dotenv import load_dotenv
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT, metrics_enabled
+import asyncio
+import math
+import os
+import re
+import time
+from typing import Dict, List, Optional, Pattern, Tuple
+
+load_dotenv()
+
+# (route class, method, path pattern, route template), first match wins; other
+# requests (course, note and folder CRUD, slide listings, job polling) are never
+# held back. The template labels shed requests in metrics, which never reach routing.
+ROUTE_CLASSES: List[Tuple[str, str, Pattern[str], str]] = [
+    ("upload", "POST", re.compile(r"^/api/upload$"), "/api/upload"),
+    ("upload", "POST", re.compile(r"^/api/upload/batch$"), "/api/upload/batch"),
+    ("search", "GET", re.compile(r"^/api/search$"), "/api/search"),
+    ("search", "GET", re.compile(r"^/api/pages/search$"), "/api/pages/search"),
+    ("download", "GET", re.compile(r"^/api/pdf/[^/]+$"), "/api/pdf/{document_id}"),
+    ("download", "GET", re.compile(r"^/api/pdf/[^/]+/raw$"), "/api/pdf/{document_id}/raw"),
+    ("download", "GET", re.compile(r"^/api/slides/[^/]+/pages/[^/]+/thumbnail$"),
+     "/api/slides/{document_id}/pages/{page_number}/thumbnail"),
+]
+
+# concurrency, queue size, queue timeout (seconds)
+DEFAULT_LIMITS: Dict[str, Tuple[int, int, float]] = {
+    "upload": (4, 8, 10.0),
+    "search": (16, 32, 5.0),
+    "download": (16, 32, 5.0),
+}
+
+
+class RouteClassLimiter:
+    """At most `concurrency` requests of one route class at a time, with at
+    most `queue_size` more waiting up to `queue_timeout` seconds for a slot"""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float,
+                 collect: Optional[bool] = None):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.collect = metrics_enabled() if collect is None else collect
+        self.waiting = 0
+        # Moving average of how long an admitted request holds its slot
+        self.service_time: Optional[float] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def acquire(self) -> Optional[str]:
+        """None once admitted, else why the request is shed ("queue_full" or "timeout")"""
+        if not self._semaphore.locked():
+            # A slot is free, so this doesn't wait
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.queue_size:
+                return self._reject("queue_full")
+            self.waiting += 1
+            if self.collect:
+                ADMISSION_QUEUE_DEPTH.inc(self.name)
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                return self._reject("timeout")
+            finally:
+                self.waiting -= 1
+                if self.collect:
+                    ADMISSION_QUEUE_DEPTH.dec(self.name)
+                    ADMISSION_WAIT.observe(time.perf_counter() - start, self.name)
+        if self.collect:
+            ADMISSION_IN_FLIGHT.inc(self.name)
+        return None
+
+    def release(self, held: float) -> None:
+        self._semaphore.release()
+        self.service_time = held if self.service_time is None else 0.8 * self.service_time + 0.2 * held
+        if self.collect:
+            ADMISSION_IN_FLIGHT.dec(self.name)
+
+    def retry_after(self) -> int:
+        """Seconds until the requests queued now would roughly have been served"""
+        per_request = self.service_time if self.service_time is not None else 1.0
+        return max(1, math.ceil(per_request * (self.waiting + 1) / self.concurrency))
+
+    def _reject(self, reason: str) -> str:
+        if self.collect:
+            ADMISSION_REJECTED.inc(self.name, reason)
+        return reason
+
+
+def admission_limiters_from_env() -> Dict[str, RouteClassLimiter]:
+    """One limiter per route class from ADMISSION_<CLASS>_CONCURRENCY / _QUEUE / _QUEUE_TIMEOUT;
+    a concurrency of 0 (or ADMISSION_CONTROL_ENABLED=false) leaves the class unlimited"""
+    if os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() != 'true':
+        return {}
+    limiters = {}
+    for name, (concurrency, queue_size, queue_timeout) in DEFAULT_LIMITS.items():
+        prefix = f"ADMISSION_{name.upper()}"
+        concurrency = int(os.getenv(f'{prefix}_CONCURRENCY', str(concurrency)))
+        if concurrency > 0:
+            limiters[name] = RouteClassLimiter(
+                name, concurrency,
+                int(os.getenv(f'{prefix}_QUEUE', str(queue_size))),
+                float(os.getenv(f'{prefix}_QUEUE_TIMEOUT', str(queue_timeout)))
+            )
+    return limiters
+
+
+class AdmissionControlMiddleware:
+    """Shed upload and Elasticsearch-heavy requests with 503 instead of letting them pile up.
+
+    Each route class gets its own concurrency limit and bounded wait queue,
+    so an upload burst can't take the event loop, threadpool and cluster
+    away from cheap reads. A request that finds the queue full, or waits
+    longer than the queue timeout, gets `503` with a `Retry-After` estimated
+    from how long admitted requests of its class take.
+    """
+
+    def __init__(self, app: ASGIApp, limiters: Optional[Dict[str, RouteClassLimiter]] = None):
+        self.app = app
+        self.limiters = limiters if limiters is not None else admission_limiters_from_env()
+
+    def _limiter(self, scope: Scope) -> Tuple[Optional[RouteClassLimiter], Optional[str]]:
+        """The request's limiter, if its class is limited, and its route template"""
+        for name, method, pattern, template in ROUTE_CLASSES:
+            if scope["method"] == method and pattern.match(scope["path"]):
+                return self.limiters.get(name), template
+        return None, None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter, template = self._limiter(scope) if scope["type"] == "http" and self.limiters else (None, None)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if await limiter.acquire() is not None:
+            # Routing never runs for this request; tell the metrics middleware which route it was for
+            scope["route_template"] = template
+            # Before any of the body is read, so a shed upload costs next to nothing
+            response = JSONResponse(
+                {"detail": f"Too many {limiter.name} requests in progress; retry later"},
+                status_code=503,
+                headers={"Retry-After": str(limiter.retry_after())}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
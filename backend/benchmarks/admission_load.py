@@ -0,0 +1,225 @@
+"""Cheap-read latency under an upload flood, with and without admission control.
+
+Starts the app under uvicorn (as in api_load.py) once with
+ADMISSION_CONTROL_ENABLED=false and once with it on, and in each:
+
+    idle       `--readers` clients list notes, folders and courses
+    flooded    the same readers while `--uploaders` clients upload PDFs
+               as fast as they are accepted (sleeping for Retry-After on 503)
+
+Course routes need MONGODB_URL or mongomock-motor, as in api_load.py.
+The report has read p50/p99 per phase, how many uploads were accepted
+and shed, the peak `admission_queue_depth` scraped from /metrics, and
+the shed counts by reason. Exits non-zero if, with admission control
+on, flooded read p99 is more than `--max-slowdown` times idle p99, or a
+503 came without Retry-After.
+
+    python benchmarks/admission_load.py --seconds 10 --readers 4 --uploaders 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from api_load import BACKEND_DIR, Client, detect_mongo, multipart
+from corpus import make_pdf
+from es_concurrency import percentile
+from upload_memory import free_port, start_standin, wait_until_up
+
+MODES = {
+    "off": {"ADMISSION_CONTROL_ENABLED": "false"},
+    "on": {"ADMISSION_CONTROL_ENABLED": "true"},
+}
+
+
+def read_stats(client: Client) -> dict:
+    latencies = [t for endpoint, values in client.latencies.items() if endpoint.startswith("GET") for t in values]
+    errors = sum(count for endpoint, count in client.errors.items() if endpoint.startswith("GET"))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def scrape(text: str, name: str) -> dict:
+    """label string -> value for one metric in Prometheus text"""
+    values = {}
+    for line in text.splitlines():
+        if line.startswith(name + "{"):
+            labels, _, value = line[len(name):].rpartition(" ")
+            values[labels] = float(value)
+    return values
+
+
+async def phase(client: Client, session: aiohttp.ClientSession, base_url: str, args, mongo: bool,
+                uploaders: int, rng: random.Random) -> dict:
+    uploads = {"accepted": 0, "shed": 0, "errors": 0, "shed_without_retry_after": 0, "accepted_ms": []}
+    peak_depth = 0
+    paths = ["/api/notes", "/api/folders"] + (["/api/courses"] if mongo else [])
+    # Built up front: generating them here would stall this loop and inflate the read latencies
+    pdfs = [make_pdf(pages=args.pages, seed=rng.randrange(10 ** 9))
+            for _ in range(args.distinct_pdfs if uploaders else 0)]
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            await client.request(f"GET {path}", "GET", path)
+
+    async def uploader():
+        while time.perf_counter() < deadline:
+            pdf = rng.choice(pdfs)
+            start = time.perf_counter()
+            try:
+                async with session.post(base_url + "/api/upload",
+                                        data=multipart(pdf, "LOAD-000", f"flood-{len(pdf)}")) as response:
+                    await response.read()
+                    status, retry_after = response.status, response.headers.get("Retry-After")
+            except aiohttp.ClientError:
+                # A shed upload's connection is closed before its body is read
+                status, retry_after = 0, None
+            if status == 202:
+                uploads["accepted"] += 1
+                uploads["accepted_ms"].append(time.perf_counter() - start)
+            elif status == 503:
+                uploads["shed"] += 1
+                if retry_after is None:
+                    uploads["shed_without_retry_after"] += 1
+                await asyncio.sleep(min(float(retry_after or 1), max(deadline - time.perf_counter(), 0)))
+            else:
+                uploads["errors"] += 1
+
+    async def sample_depth():
+        nonlocal peak_depth
+        while time.perf_counter() < deadline:
+            async with session.get(base_url + "/metrics") as response:
+                depths = scrape(await response.text(), "admission_queue_depth")
+            peak_depth = max([peak_depth] + [int(v) for v in depths.values()])
+            await asyncio.sleep(0.1)
+
+    client.reset()
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(reader() for _ in range(args.readers)), *(uploader() for _ in range(uploaders)),
+                         sample_depth())
+    elapsed = time.perf_counter() - start
+
+    result = {"reads": read_stats(client)}
+    result["reads"]["throughput_rps"] = round(result["reads"]["requests"] / elapsed, 1)
+    if uploaders:
+        accepted_ms = uploads.pop("accepted_ms")
+        uploads["accepted_p99_ms"] = round(percentile(accepted_ms, 99) * 1000, 2) if accepted_ms else None
+        uploads["accepted_rps"] = round(uploads["accepted"] / elapsed, 1)
+        result["uploads"] = uploads
+        result["peak_admission_queue_depth"] = peak_depth
+    return result
+
+
+async def drive(args, port: int, mongo: str) -> dict:
+    rng = random.Random(args.seed)
+    base_url = f"http://127.0.0.1:{port}"
+    timeout = aiohttp.ClientTimeout(total=300)
+    connector = aiohttp.TCPConnector(limit=args.readers + args.uploaders + 4)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        client = Client(session, base_url)
+        if mongo != "none":
+            for i in range(args.courses):
+                await client.request("seed", "POST", "/api/courses", ok=(200, 400),
+                                     json={"course_id": f"LOAD-{i:03d}", "course_name": f"Course {i}"})
+        for i in range(args.folders):
+            await client.request("seed", "POST", "/api/folders", json={"folder_name": f"Folder {i}"})
+        for i in range(args.notes):
+            await client.request("seed", "POST", "/api/notes", json={"title": f"Note {i}", "notes": "x" * 2000})
+
+        report = {
+            "idle": await phase(client, session, base_url, args, mongo != "none", 0, rng),
+            "flooded": await phase(client, session, base_url, args, mongo != "none", args.uploaders, rng),
+        }
+        idle, flooded = report["idle"]["reads"]["p99_ms"], report["flooded"]["reads"]["p99_ms"]
+        report["read_p99_slowdown"] = round(flooded / idle, 2) if idle and flooded else None
+        async with session.get(base_url + "/metrics") as response:
+            report["admission_rejected_total"] = scrape(await response.text(), "admission_rejected_total")
+    return report
+
+
+def run_mode(args, mode: str, mongo: str, standin_url: str) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            **MODES[mode],
+            "ELASTICSEARCH_URL": standin_url,
+            "BLOB_STORE": "local",
+            "BLOB_STORE_PATH": os.path.join(tmp, "blobs"),
+            "THUMBNAIL_CACHE_PATH": os.path.join(tmp, "thumbnails"),
+            "INGEST_DEDUPLICATE": "false",
+            "METRICS_ENABLED": "true",
+            "CACHE_BACKEND": "none",
+        }
+        if mongo != "server":
+            env.update({"MONGODB_URL": "mongodb://127.0.0.1:1", "MONGODB_SERVER_SELECTION_TIMEOUT_MS": "500"})
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_load.py"),
+             "--serve", "--port", str(port), "--mongo", mongo],
+            cwd=BACKEND_DIR, env=env, start_new_session=True
+        )
+        try:
+            wait_until_up(port, server)
+            return asyncio.run(drive(args, port, mongo))
+        finally:
+            server.terminate()
+            server.wait()
+            # PDF pool workers still busy with queued ingestion can outlive the server
+            try:
+                os.killpg(server.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each phase")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--uploaders", type=int, default=32)
+    parser.add_argument("--pages", type=int, default=100, help="pages per uploaded PDF")
+    parser.add_argument("--distinct-pdfs", type=int, default=8, help="PDFs the uploaders cycle through")
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--folders", type=int, default=20)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--read-delay", type=float, default=0.002, help="ES stand-in delay per read")
+    parser.add_argument("--index-delay", type=float, default=0.02, help="ES stand-in delay per index call")
+    parser.add_argument("--max-slowdown", type=float, default=3.0,
+                        help="fail if flooded read p99 exceeds this multiple of idle p99 with admission on")
+    args = parser.parse_args()
+
+    mongo = detect_mongo()
+    standin = start_standin()
+    standin.read_delay, standin.index_delay = args.read_delay, args.index_delay
+    report = {"mongo": mongo, "modes": {}}
+    for mode in MODES:
+        report["modes"][mode] = run_mode(args, mode, mongo, standin.url)
+
+    on = report["modes"]["on"]
+    failures = []
+    if on["read_p99_slowdown"] is None or on["read_p99_slowdown"] > args.max_slowdown:
+        failures.append(f"read p99 slowdown {on['read_p99_slowdown']} > {args.max_slowdown} with admission on")
+    if on["flooded"]["uploads"]["shed_without_retry_after"]:
+        failures.append("503 without Retry-After")
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
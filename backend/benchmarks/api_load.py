@@ -0,0 +1,417 @@
+"""Mixed-workload load test of the whole API, reported as JSON per endpoint.
+
+Starts the app under uvicorn in a subprocess, against the in-memory ES
+stand-in and a temporary local blob store. MongoDB comes from MONGODB_URL
+when it answers, else from mongomock-motor when installed
+(`pip install mongomock-motor`); without either, the course routes are
+left out. It then seeds a synthetic corpus through the API (`--courses`
+courses of `--slides-per-course` decks, `--notes` notes in `--folders`
+folders) and runs each workload for `--seconds` with `--concurrency`
+closed-loop clients:
+
+    listing   slides by course, notes, folders, course dropdown
+    download  GET /api/pdf/{id}/raw
+    upload    POST /api/upload (distinct PDFs, so nothing is deduplicated)
+    autosave  PATCH /api/notes/{id}, one note per client
+    mixed     all of the above, weighted 60/20/5/15
+
+Each endpoint gets throughput and p50/p95/p99 latency, and each workload
+the server's peak RSS. Requests shed by admission control (503 with
+Retry-After) are counted as `shed`, left out of the latencies, and
+retried after Retry-After, as a real client would. Save a run and compare a later commit against it:
+
+    python benchmarks/api_load.py --seconds 10 --output before.json
+    python benchmarks/api_load.py --seconds 10 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import aiohttp
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import WORDS, make_pdf
+from es_concurrency import percentile
+from upload_memory import free_port, memory_kb, start_standin, wait_until_up
+
+WORKLOADS = {
+    "listing": {"listing": 1},
+    "download": {"download": 1},
+    "upload": {"upload": 1},
+    "autosave": {"autosave": 1},
+    "mixed": {"listing": 60, "download": 20, "upload": 5, "autosave": 15},
+}
+
+
+def serve(port: int, mongo: str):
+    """Run the app in this process (the --serve side of the benchmark)"""
+    sys.path.insert(0, BACKEND_DIR)
+    import uvicorn
+    from mongo_client import MongoClient
+
+    if mongo == "mongomock":
+        from mongomock_motor import AsyncMongoMockClient
+        MongoClient._client = AsyncMongoMockClient()
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def detect_mongo() -> str:
+    url = os.getenv("MONGODB_URL")
+    if url:
+        try:
+            from pymongo import MongoClient
+            MongoClient(url, serverSelectionTimeoutMS=1000).admin.command("ping")
+            return "server"
+        except Exception:
+            pass
+    try:
+        import mongomock_motor  # noqa: F401
+        return "mongomock"
+    except ImportError:
+        return "none"
+
+
+class RssSampler:
+    """Peak server RSS over a window, sampled from /proc (Linux only)"""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, memory_kb(self.pid, "VmRSS"))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Client:
+    """Records latency per endpoint (route template) against a running server"""
+
+    def __init__(self, session: aiohttp.ClientSession, base_url: str):
+        self.session = session
+        self.base_url = base_url
+        self.latencies = {}
+        self.errors = {}
+        self.shed = {}
+
+    async def request(self, endpoint: str, method: str, path: str, ok=(200,), **kwargs):
+        start = time.perf_counter()
+        retry_after = None
+        try:
+            async with self.session.request(method, self.base_url + path, **kwargs) as response:
+                body = await response.read()
+                status = response.status
+                retry_after = response.headers.get("Retry-After")
+        except aiohttp.ClientError:
+            body, status = b"", 0
+        if status == 503 and retry_after is not None:
+            # Shed by admission control: counted apart and not timed, then backed off like a real client
+            self.shed[endpoint] = self.shed.get(endpoint, 0) + 1
+            await asyncio.sleep(float(retry_after))
+            return status, body
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+        if status not in ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return status, body
+
+    def reset(self):
+        self.latencies, self.errors, self.shed = {}, {}, {}
+
+
+def multipart(pdf: bytes, course_id: str, title: str) -> aiohttp.FormData:
+    form = aiohttp.FormData()
+    form.add_field("course_id", course_id)
+    form.add_field("course_name", f"Course {course_id}")
+    form.add_field("title", title)
+    form.add_field("file", pdf, filename=f"{title}.pdf", content_type="application/pdf")
+    return form
+
+
+class Corpus:
+    """What was seeded, plus the per-client state the workloads need"""
+
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.course_ids = [f"BENCH-{i:03d}" for i in range(args.courses)]
+        self.document_ids = []
+        self.folder_ids = []
+        self.notes = {}  # note_id -> version
+        self.upload_seed = 10_000
+
+    def text(self, words: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(words))
+
+    async def seed(self, client: Client, mongo: bool):
+        args = self.args
+        if mongo:
+            for course_id in self.course_ids:
+                await client.request("seed", "POST", "/api/courses", ok=(200, 400),
+                                     json={"course_id": course_id, "course_name": f"Course {course_id}"})
+        jobs = []
+        for c, course_id in enumerate(self.course_ids):
+            for s in range(args.slides_per_course):
+                pdf = make_pdf(pages=args.pages, seed=c * 1000 + s)
+                _, body = await client.request("seed", "POST", "/api/upload", ok=(202,),
+                                               data=multipart(pdf, course_id, f"deck-{c}-{s}"))
+                result = json.loads(body)
+                jobs.append(result["job_id"])
+                self.document_ids.append(result["document_id"])
+        for i in range(args.folders):
+            _, body = await client.request("seed", "POST", "/api/folders", json={"folder_name": f"Folder {i}"})
+            self.folder_ids.append(json.loads(body)["id"])
+        for i in range(args.notes):
+            note = {"title": f"Note {i} {self.text(3)}", "notes": self.text(args.note_kb * 1024 // 8)}
+            if self.folder_ids:
+                note["folder_id"] = self.folder_ids[i % len(self.folder_ids)]
+            _, body = await client.request("seed", "POST", "/api/notes", json=note)
+            self.notes[json.loads(body)["id"]] = 0
+
+        # Wait for ingestion so downloads and listings see every deck
+        pending = set(jobs)
+        while pending:
+            for job_id in list(pending):
+                _, body = await client.request("seed", "GET", f"/api/jobs/{job_id}")
+                status = json.loads(body).get("status")
+                if status in ("succeeded", "failed"):
+                    pending.discard(job_id)
+            await asyncio.sleep(0.2)
+
+    def next_upload(self) -> bytes:
+        self.upload_seed += 1
+        return make_pdf(pages=self.args.pages, seed=self.upload_seed)
+
+
+async def listing(client: Client, corpus: Corpus, worker: int, mongo: bool):
+    pick = corpus.rng.random()
+    if pick < 0.4:
+        course_id = corpus.rng.choice(corpus.course_ids)
+        await client.request("GET /api/slides/{course_id}", "GET", f"/api/slides/{course_id}")
+    elif pick < 0.7:
+        await client.request("GET /api/notes", "GET", "/api/notes")
+    elif pick < 0.9 or not mongo:
+        await client.request("GET /api/folders", "GET", "/api/folders")
+    else:
+        await client.request("GET /api/courses/dropdown/options", "GET", "/api/courses/dropdown/options")
+
+
+async def download(client: Client, corpus: Corpus, worker: int, mongo: bool):
+    document_id = corpus.rng.choice(corpus.document_ids)
+    await client.request("GET /api/pdf/{document_id}/raw", "GET", f"/api/pdf/{document_id}/raw")
+
+
+async def upload(client: Client, corpus: Corpus, worker: int, mongo: bool):
+    pdf = corpus.next_upload()
+    await client.request("POST /api/upload", "POST", "/api/upload", ok=(202,),
+                         data=multipart(pdf, corpus.rng.choice(corpus.course_ids), f"upload-{corpus.upload_seed}"))
+
+
+async def autosave(client: Client, corpus: Corpus, worker: int, mongo: bool):
+    # One note per client, so patches never conflict with each other
+    note_id = list(corpus.notes)[worker % len(corpus.notes)]
+    patch = {"version": corpus.notes[note_id],
+             "ops": [{"pos": 0, "delete": 0, "insert": corpus.text(2) + " "}]}
+    status, body = await client.request("PATCH /api/notes/{note_id}", "PATCH", f"/api/notes/{note_id}",
+                                        json=patch)
+    if status == 200:
+        corpus.notes[note_id] = json.loads(body)["version"]
+    else:
+        _, body = await client.request("GET /api/notes/{note_id}", "GET", f"/api/notes/{note_id}")
+        corpus.notes[note_id] = json.loads(body).get("version", 0)
+
+
+OPERATIONS = {"listing": listing, "download": download, "upload": upload, "autosave": autosave}
+
+
+async def run_workload(client: Client, corpus: Corpus, weights: dict, args, mongo: bool) -> float:
+    names = list(weights)
+    deadline = time.perf_counter() + args.seconds
+
+    async def worker(n: int):
+        while time.perf_counter() < deadline:
+            op = corpus.rng.choices(names, weights=[weights[name] for name in names])[0]
+            await OPERATIONS[op](client, corpus, n, mongo)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+    return time.perf_counter() - start
+
+
+def summarize(client: Client, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint, latencies in sorted(client.latencies.items()):
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "errors": client.errors.get(endpoint, 0),
+            "shed": client.shed.get(endpoint, 0),
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+    return endpoints
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Percentage change per endpoint metric vs a saved report (positive = higher)"""
+    changes = {}
+    for workload, result in report["workloads"].items():
+        before = baseline.get("workloads", {}).get(workload)
+        if not before:
+            continue
+        for endpoint, stats in result["endpoints"].items():
+            old = before["endpoints"].get(endpoint)
+            if not old:
+                continue
+            changes.setdefault(workload, {})[endpoint] = {
+                key: round((stats[key] - old[key]) / old[key] * 100, 1) if old[key] else None
+                for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+            }
+        if before.get("peak_rss_mb"):
+            changes.setdefault(workload, {})["peak_rss_mb"] = round(
+                (result["peak_rss_mb"] - before["peak_rss_mb"]) / before["peak_rss_mb"] * 100, 1)
+    return changes
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def drive(args, port: int, pid: int, mongo: str) -> dict:
+    corpus = Corpus(args, random.Random(args.seed))
+    timeout = aiohttp.ClientTimeout(total=300)
+    connector = aiohttp.TCPConnector(limit=args.concurrency + 4)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        client = Client(session, f"http://127.0.0.1:{port}")
+        start = time.perf_counter()
+        await corpus.seed(client, mongo != "none")
+        seed_s = time.perf_counter() - start
+        seed_errors = client.errors.get("seed", 0)
+
+        workloads = {}
+        for name in args.workloads:
+            client.reset()
+            with RssSampler(pid) as sampler:
+                elapsed = await run_workload(client, corpus, WORKLOADS[name], args, mongo != "none")
+            endpoints = summarize(client, elapsed)
+            workloads[name] = {
+                "elapsed_s": round(elapsed, 2),
+                "throughput_rps": round(sum(e["requests"] for e in endpoints.values()) / elapsed, 1),
+                "errors": sum(e["errors"] for e in endpoints.values()),
+                "peak_rss_mb": round(sampler.peak_kb / 1024, 1),
+                "endpoints": endpoints,
+            }
+            # Let queued ingestion and autosave flushes drain between workloads
+            await asyncio.sleep(args.settle)
+
+    return {
+        "revision": git_revision(),
+        "config": {key: getattr(args, key) for key in (
+            "seconds", "concurrency", "courses", "slides_per_course", "pages", "notes", "note_kb",
+            "folders", "seed", "read_delay", "index_delay")},
+        "mongo": mongo,
+        "corpus": {"courses": len(corpus.course_ids), "slides": len(corpus.document_ids),
+                   "notes": len(corpus.notes), "folders": len(corpus.folder_ids),
+                   "seed_s": round(seed_s, 2), "seed_errors": seed_errors},
+        "workloads": workloads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each workload")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--courses", type=int, default=5)
+    parser.add_argument("--slides-per-course", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--note-kb", type=int, default=4)
+    parser.add_argument("--folders", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--read-delay", type=float, default=0.002, help="ES stand-in delay per read")
+    parser.add_argument("--index-delay", type=float, default=0.02, help="ES stand-in delay per index call")
+    parser.add_argument("--settle", type=float, default=2, help="pause between workloads")
+    parser.add_argument("--output", help="also write the report here")
+    parser.add_argument("--compare", help="a previous report to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mongo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.mongo)
+        return
+
+    mongo = detect_mongo()
+    standin = start_standin()
+    standin.read_delay, standin.index_delay = args.read_delay, args.index_delay
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "ELASTICSEARCH_URL": standin.url,
+            "BLOB_STORE": "local",
+            "BLOB_STORE_PATH": os.path.join(tmp, "blobs"),
+            "THUMBNAIL_CACHE_PATH": os.path.join(tmp, "thumbnails"),
+            "INGEST_DEDUPLICATE": "false",
+        }
+        if mongo != "server":
+            env.update({"MONGODB_URL": "mongodb://127.0.0.1:1", "MONGODB_SERVER_SELECTION_TIMEOUT_MS": "500"})
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--mongo", mongo],
+            cwd=BACKEND_DIR, env=env, start_new_session=True
+        )
+        try:
+            wait_until_up(port, server)
+            report = asyncio.run(drive(args, port, server.pid, mongo))
+        finally:
+            server.terminate()
+            server.wait()
+            # PDF pool workers still busy with queued ingestion can outlive the server
+            try:
+                os.killpg(server.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["vs_baseline"] = {"revision": baseline.get("revision"), "change_pct": compare(report, baseline)}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
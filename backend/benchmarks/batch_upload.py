@@ -0,0 +1,94 @@
+"""Ingest throughput: N single uploads vs one bulk batch.
+
+Runs SlideIngestService against the local ES stand-in with a temporary
+blob store, so it measures extraction + indexing round trips only.
+
+    python benchmarks/batch_upload.py --files 20 --pages 30 --chunk-sizes 10 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import make_corpus
+from es_standin import ESStandIn
+
+
+def payloads(store, corpus):
+    items = []
+    for i, pdf in enumerate(corpus):
+        items.append({
+            "document_id": uuid.uuid4().hex,
+            "blob_key": store.put_bytes(pdf),
+            "course_id": "BENCH101",
+            "course_name": "Benchmarking",
+            "filename": f"deck-{i}.pdf",
+            "title": f"Deck {i}",
+            "pdf_size": len(pdf)
+        })
+    return items
+
+
+async def main_async(args):
+    standin = await ESStandIn(index_delay=args.index_delay, per_doc_delay=args.per_doc_delay).start()
+    os.environ["ELASTICSEARCH_URL"] = standin.url
+    os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp(prefix="bench-blobs-")
+
+    from blob_store import get_blob_store
+    from es_client import ESClient
+    from page_service import PageService
+    from pdf_extractor import PdfExtractor
+    from slide_ingest import SlideIngestService
+
+    corpus = make_corpus(args.files, args.pages)
+    items = payloads(get_blob_store(), corpus)
+    extractor = PdfExtractor(max_workers=args.workers)
+    service = SlideIngestService(extractor, PageService())
+    # Every run re-ingests the same corpus; dedup would turn later runs into copies
+    service.deduplicate = False
+    await service.ingest(items[0])  # warm pool and connections
+
+    results = {}
+    start = time.perf_counter()
+    for item in items:
+        await service.ingest(item)
+    elapsed = time.perf_counter() - start
+    results["single"] = {"elapsed_s": round(elapsed, 3), "docs_per_sec": round(len(items) / elapsed, 1)}
+
+    for chunk_size in args.chunk_sizes:
+        service.bulk_chunk_size = chunk_size
+        start = time.perf_counter()
+        report = await service.ingest_batch({"items": items})
+        elapsed = time.perf_counter() - start
+        results[f"batch_chunk_{chunk_size}"] = {
+            "elapsed_s": round(elapsed, 3),
+            "docs_per_sec": round(len(items) / elapsed, 1),
+            "failed": report["failed"],
+        }
+
+    extractor.shutdown()
+    await ESClient.close()
+    await standin.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--index-delay", type=float, default=0.05, help="per-request ES overhead (s)")
+    parser.add_argument("--per-doc-delay", type=float, default=0.002, help="per-document ES cost (s)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Read-heavy workload with and without the read-through cache.
+
+Mixes folder listings and slide listings with a small share of folder
+writes (which invalidate) against the local ES stand-in.
+
+    python benchmarks/cache_read_heavy.py --requests 2000 --write-ratio 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from es_standin import ESStandIn
+
+
+async def run(args, cache_impl):
+    import cache
+    import main
+    from es_client import ESClient
+    from folder_service import FolderCreate
+
+    cache._cache = cache_impl
+    folder_service = main.app.state.services.folder_service
+    client = await ESClient.get_client()
+    rng = random.Random(0)
+    courses = [f"CS{100 + i}" for i in range(args.courses)]
+    latencies = []
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        t = time.perf_counter()
+        r = rng.random()
+        if r < args.write_ratio:
+            await folder_service.create_folder(FolderCreate(folder_name="bench"))
+        elif r < 0.5:
+            await folder_service.get_all_folders()
+        else:
+            await main.get_slides_by_course(rng.choice(courses), size=50, search_after=None,
+                                            sort="uploaded_at", order="desc", include=None, client=client)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+        "cache": cache_impl.stats.snapshot(),
+    }
+
+
+async def main_async(args):
+    standin = await ESStandIn(read_delay=args.read_delay, index_delay=args.read_delay).start()
+    os.environ["ELASTICSEARCH_URL"] = standin.url
+
+    from cache import MemoryCache, NullCache
+    from es_client import ESClient
+
+    results = {
+        "no_cache": await run(args, NullCache()),
+        "memory_cache": await run(args, MemoryCache(default_ttl=60)),
+    }
+    await ESClient.close()
+    await standin.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--read-delay", type=float, default=0.005, help="ES stand-in latency (s)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Synthetic PDF generation for benchmarks (no third-party dependencies)."""
+import os
+import random
+
+WORDS = (
+    "lecture slide theorem proof algorithm complexity graph vertex edge matrix "
+    "vector eigenvalue gradient descent network layer entropy probability "
+    "distribution variance regression kernel memory cache thread process"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int = 10, lines_per_page: int = 30, seed: int = 0, padding: int = 0) -> bytes:
+    """Build a valid text-only PDF with `pages` pages of random words.
+
+    `padding` adds an unreferenced stream of that many random bytes, for
+    large files that stay cheap to generate and parse.
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    page_tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for n in range(pages):
+        lines = [f"Slide {n + 1}"] + [
+            " ".join(rng.choice(WORDS) for _ in range(10)) for _ in range(lines_per_page)
+        ]
+        ops = ["BT", "/F1 10 Tf", "12 TL", "40 760 Td"]
+        ops += [f"({_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (page_tree, font, content)
+        ))
+
+    if padding:
+        add(b"<< /Length %d >>\nstream\n%s\nendstream" % (padding, os.urandom(padding)))
+
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def make_corpus(documents: int, pages: int, seed: int = 0) -> list:
+    return [make_pdf(pages=pages, seed=seed + i) for i in range(documents)]
@@ -0,0 +1,91 @@
+"""Ingestion cost on a corpus with duplicate uploads, with and without dedup.
+
+Every PDF is stored in a temporary blob store and ingested one job at a
+time through SlideIngestService against the ES stand-in, whose
+`--pipeline-delay` stands in for ELSER inference per document.
+
+    python benchmarks/dedup_ingest.py --unique 10 --duplicates 20 --pages 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import make_corpus
+from es_standin import ESStandIn
+
+
+async def run(args, corpus, deduplicate):
+    from blob_store import get_blob_store
+    from page_service import PageService
+    from pdf_extractor import PdfExtractor
+    from slide_ingest import SlideIngestService
+
+    standin = await ESStandIn(read_delay=0.002, index_delay=0.01, pipeline_delay=args.pipeline_delay).start()
+    os.environ["ELASTICSEARCH_URL"] = standin.url
+
+    from es_client import ESClient
+
+    extractor = PdfExtractor(max_workers=args.workers)
+    service = SlideIngestService(extractor, PageService())
+    service.deduplicate = deduplicate
+    store = get_blob_store()
+
+    start = time.perf_counter()
+    deduplicated = 0
+    for i, pdf in enumerate(corpus):
+        result = await service.ingest({
+            "document_id": uuid.uuid4().hex,
+            "blob_key": store.put_bytes(pdf),
+            "course_id": f"CS{i % 5}",
+            "course_name": "Benchmarking",
+            "filename": f"deck-{i}.pdf",
+            "title": f"Deck {i}",
+            "pdf_size": len(pdf)
+        })
+        deduplicated += "deduplicated_from" in result
+    elapsed = time.perf_counter() - start
+
+    extractor.shutdown()
+    await ESClient.close()
+    await standin.stop()
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_sec": round(len(corpus) / elapsed, 1),
+        "deduplicated": deduplicated,
+        "blob_store_files": len(set(map(hash, corpus))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unique", type=int, default=10)
+    parser.add_argument("--duplicates", type=int, default=20, help="extra uploads of already-seen PDFs")
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pipeline-delay", type=float, default=0.1, help="simulated ELSER cost per document (s)")
+    args = parser.parse_args()
+
+    os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp(prefix="bench-blobs-")
+    os.environ["CACHE_BACKEND"] = "none"
+    unique = make_corpus(args.unique, args.pages)
+    rng = random.Random(0)
+    corpus = unique + [rng.choice(unique) for _ in range(args.duplicates)]
+    rng.shuffle(corpus)
+
+    results = {
+        "without_dedup": asyncio.run(run(args, corpus, deduplicate=False)),
+        "with_dedup": asyncio.run(run(args, corpus, deduplicate=True)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Concurrency benchmark: sync vs shared async Elasticsearch client.
+
+Drives a mixed workload (mostly fast reads, some slow ELSER-style index
+calls) from coroutines on a single event loop, the same way uvicorn runs
+our `async def` routes. With the sync client every index call blocks the
+loop, so read latency tracks the slowest write; with the async client the
+reads stay close to the stand-in's read delay.
+
+    python benchmarks/es_concurrency.py --requests 400 --rate 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+sys.path.insert(0, os.path.dirname(__file__))
+from es_standin import ESStandIn
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[k]
+
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def workload(n, write_ratio, seed=0):
+    rng = random.Random(seed)
+    return ["index" if rng.random() < write_ratio else "get" for _ in range(n)]
+
+
+async def run(ops, rate, call):
+    """Open-loop load: request i is due at i / rate seconds.
+
+    Latency is measured from the due time, so time a request spends waiting
+    for a blocked event loop counts against it, as it would for a client.
+    """
+    latencies = {"get": [], "index": []}
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+
+    async def one(i, op):
+        due = t0 + i / rate
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        await call(op)
+        latencies[op].append(loop.time() - due)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, op) for i, op in enumerate(ops)))
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ops) / elapsed, 1),
+        "get": summarize(latencies["get"]),
+        "index": summarize(latencies["index"]),
+    }
+
+
+async def bench_sync(url, ops, rate, connections):
+    client = Elasticsearch(url, connections_per_node=connections)
+
+    async def call(op):
+        # Same shape as the old routes: a blocking call inside `async def`
+        if op == "index":
+            client.index(index="lecture-slides-index", body={"title": "t"})
+        else:
+            client.get(index="lecture-slides-index", id="1")
+
+    try:
+        return await run(ops, rate, call)
+    finally:
+        client.close()
+
+
+async def bench_async(url, ops, rate, connections):
+    client = AsyncElasticsearch(url, connections_per_node=connections)
+
+    async def call(op):
+        if op == "index":
+            await client.index(index="lecture-slides-index", body={"title": "t"})
+        else:
+            await client.get(index="lecture-slides-index", id="1")
+
+    try:
+        return await run(ops, rate, call)
+    finally:
+        await client.close()
+
+
+def start_standin(read_delay, index_delay):
+    """Run the stand-in on its own loop so blocking clients can't stall it"""
+    ready = threading.Event()
+    holder = {}
+
+    def target():
+        loop = asyncio.new_event_loop()
+        standin = ESStandIn(read_delay=read_delay, index_delay=index_delay)
+        loop.run_until_complete(standin.start())
+        holder["standin"] = standin
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=target, daemon=True).start()
+    ready.wait()
+    return holder["standin"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=200.0, help="request arrivals per second")
+    parser.add_argument("--connections", type=int, default=25)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--read-delay", type=float, default=0.005)
+    parser.add_argument("--index-delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    standin = start_standin(args.read_delay, args.index_delay)
+    standin.indices["lecture-slides-index"]["1"] = {"title": "t"}
+    ops = workload(args.requests, args.write_ratio)
+
+    results = {
+        "sync_client": asyncio.run(bench_sync(standin.url, ops, args.rate, args.connections)),
+        "async_client": asyncio.run(bench_async(standin.url, ops, args.rate, args.connections)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Minimal in-memory Elasticsearch stand-in for local benchmarks.
+
+Speaks just enough HTTP/1.1 for the elasticsearch-py transport: every
+response carries the product header the client checks for. Documents are
+kept per index in memory; get/index/update/delete/_bulk/_count behave like
+the real thing, and _search / _delete_by_query understand `term`/`terms`
+and `exists` filters (top level or inside `bool.filter`/`bool.must`/
+`bool.must_not`), `size` and
+`terms` aggregations (with `max` sub-aggregations) plus single-source
+`composite` ones, which covers our routes; comma-separated index names
+are searched together. _delete_by_query with `wait_for_completion=false`
+returns a task that `_tasks/<id>` reports as already completed.
+Point-in-time searches (`_pit`, sliced by hashing `_id`, paged with
+`search_after` on the returned sort value) see the documents as of
+opening. A `bulk_reject_ratio` of 0.25 answers every fourth bulk item
+with a 429 rejection. _update_by_query only counts matches: scripts aren't run, and a
+scripted _update applies `params.doc` and bumps `version` (our notes
+update script). Documents carry `_seq_no`/`_primary_term` and
+`if_seq_no` is enforced.
+
+Indexing requests sleep for `index_delay` seconds to mimic a slow ELSER
+ingest pipeline, everything else sleeps for `read_delay`. Every indexed
+document (single or via _bulk) adds `per_doc_delay` on top, plus
+`pipeline_delay` when it goes through an ingest pipeline. `requests`
+counts every request received, for round-trip accounting, and
+`bytes_received` their body sizes.
+"""
+import asyncio
+import json
+import uuid
+from collections import Counter, defaultdict
+from urllib.parse import parse_qs, urlsplit
+
+
+EXISTS = object()
+
+
+def _term_filters(query: dict, negate: bool = False) -> list:
+    """Collect `term`/`terms`/`exists` clauses as (field, allowed values, negated) triples"""
+    if not query:
+        return []
+    clauses = []
+    if "bool" in query:
+        for key, negated in (("filter", negate), ("must", negate), ("must_not", not negate)):
+            sub = query["bool"].get(key, [])
+            for clause in sub if isinstance(sub, list) else [sub]:
+                clauses.extend(_term_filters(clause, negated))
+        return clauses
+    for field, value in query.get("term", {}).items():
+        clauses.append((field, [value.get("value") if isinstance(value, dict) else value], negate))
+    for field, values in query.get("terms", {}).items():
+        clauses.append((field, values, negate))
+    if "exists" in query:
+        clauses.append((query["exists"]["field"], EXISTS, negate))
+    return clauses
+
+
+def _matches(source: dict, terms: list) -> bool:
+    for field, values, negated in terms:
+        value = source.get(field)
+        if values is EXISTS:
+            found = value is not None
+        else:
+            # Like ES, an array field matches if any element does
+            found = any(v in values for v in (value if isinstance(value, list) else [value]))
+        if found == negated:
+            return False
+    return True
+
+
+class ESStandIn:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 read_delay: float = 0.005, index_delay: float = 0.2,
+                 per_doc_delay: float = 0.0, pipeline_delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.read_delay = read_delay
+        self.index_delay = index_delay
+        self.per_doc_delay = per_doc_delay
+        self.pipeline_delay = pipeline_delay
+        self.indices = defaultdict(dict)
+        self.requests = Counter()
+        self.bytes_received = Counter()
+        self.seq_nos = {}
+        self.next_seq_no = 0
+        self.tasks = {}
+        self.pits = {}
+        self.bulk_reject_ratio = 0.0
+        self.bulk_items = 0
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def _bump(self, index: str, doc_id: str) -> dict:
+        self.seq_nos[(index, doc_id)] = self.next_seq_no
+        self.next_seq_no += 1
+        return {"_seq_no": self.seq_nos[(index, doc_id)], "_primary_term": 1}
+
+    def _seq_no(self, index: str, doc_id: str) -> dict:
+        return {"_seq_no": self.seq_nos.get((index, doc_id), 0), "_primary_term": 1}
+
+    def _aggregate(self, aggs: dict, docs: list) -> dict:
+        results = {}
+        for name, agg in aggs.items():
+            if "terms" in agg:
+                groups = defaultdict(list)
+                for doc_id, src in docs:
+                    if src.get(agg["terms"]["field"]) is not None:
+                        groups[src[agg["terms"]["field"]]].append((doc_id, src))
+                ranked = sorted(groups.items(), key=lambda kv: -len(kv[1]))[:agg["terms"].get("size", 10)]
+                results[name] = {"buckets": [
+                    {"key": key, "doc_count": len(group), **self._aggregate(agg.get("aggs", {}), group)}
+                    for key, group in ranked
+                ]}
+            elif "composite" in agg:
+                (source_name, source), = agg["composite"]["sources"][0].items()
+                field = source["terms"]["field"]
+                counts = Counter(src[field] for _, src in docs if src.get(field) is not None)
+                after = agg["composite"].get("after", {}).get(source_name)
+                keys = sorted(key for key in counts if after is None or key > after)[:agg["composite"].get("size", 10)]
+                results[name] = {"buckets": [{"key": {source_name: key}, "doc_count": counts[key]} for key in keys]}
+                if keys:
+                    results[name]["after_key"] = {source_name: keys[-1]}
+            elif "max" in agg:
+                values = [src[agg["max"]["field"]] for _, src in docs if src.get(agg["max"]["field"]) is not None]
+                top = max(values) if values else None
+                results[name] = {"value": top, **({"value_as_string": top} if isinstance(top, str) else {})}
+        return results
+
+    def _search(self, index: str, body: dict):
+        terms = _term_filters(body.get("query", {}))
+        if "pit" in body:
+            snapshot = self.pits[body["pit"]["id"]]
+            index = snapshot["index"]
+            docs = [(doc_id, src) for doc_id, src in snapshot["docs"] if _matches(src, terms)]
+            if "slice" in body:
+                slice_id, slice_max = body["slice"]["id"], body["slice"]["max"]
+                docs = [(doc_id, src) for doc_id, src in docs if int(doc_id.encode().hex(), 16) % slice_max == slice_id]
+            if body.get("search_after"):
+                docs = [(doc_id, src) for doc_id, src in docs if doc_id > body["search_after"][0]]
+        else:
+            docs = [(doc_id, src) for name in index.split(",")
+                    for doc_id, src in self.indices[name].items() if _matches(src, terms)]
+        size = body.get("size", 10)
+        hits = [
+            {"_index": index, "_id": doc_id, "_score": 1.0, "_source": src, "sort": [doc_id],
+             **self._seq_no(index, doc_id)}
+            for doc_id, src in docs[:size]
+        ]
+        response = {"hits": {"total": {"value": len(docs), "relation": "eq"}, "hits": hits}}
+        if "pit" in body:
+            response["pit_id"] = body["pit"]["id"]
+        if body.get("aggs"):
+            response["aggregations"] = self._aggregate(body["aggs"], docs)
+        return response
+
+    def _bulk(self, default_index: str, body: bytes, default_pipeline: str = None):
+        items = []
+        piped = 0
+        lines = [line for line in body.splitlines() if line.strip()]
+        i = 0
+        while i < len(lines):
+            op, meta = next(iter(json.loads(lines[i]).items()))
+            index = meta.get("_index", default_index)
+            doc_id = meta.get("_id") or uuid.uuid4().hex
+            self.bulk_items += 1
+            if self.bulk_reject_ratio and self.bulk_items % round(1 / self.bulk_reject_ratio) == 0:
+                items.append({op: {"_id": doc_id, "status": 429,
+                                   "error": {"type": "es_rejected_execution_exception"}}})
+                i += 1 if op == "delete" else 2
+                continue
+            if op == "delete":
+                self.indices[index].pop(doc_id, None)
+                items.append({op: {"_id": doc_id, "status": 200, "result": "deleted"}})
+                i += 1
+                continue
+            source = json.loads(lines[i + 1])
+            if meta.get("pipeline", default_pipeline):
+                piped += 1
+            if op == "update":
+                self.indices[index].setdefault(doc_id, {}).update(source.get("doc", {}))
+            else:
+                self.indices[index][doc_id] = source
+            items.append({op: {"_id": doc_id, "status": 201, "result": "created"}})
+            i += 2
+        delay = self.index_delay + self.per_doc_delay * len(items) + self.pipeline_delay * piped
+        errors = any(next(iter(item.values()))["status"] >= 300 for item in items)
+        return delay, 200, {"took": int(delay * 1000), "errors": errors, "items": items}
+
+    def route(self, method: str, target: str, body: bytes):
+        """Return (delay, status, payload) for a request"""
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        parts = [p for p in url.path.split("/") if p]
+        data = json.loads(body) if body and not url.path.endswith("/_bulk") else {}
+        index = parts[0] if parts and not parts[0].startswith("_") else None
+        endpoint = parts[1] if len(parts) > 1 else (parts[0] if parts else "")
+        doc_id = parts[2] if len(parts) > 2 else None
+        self.requests[endpoint or "/"] += 1
+        self.bytes_received[endpoint or "/"] += len(body)
+
+        if endpoint == "_pit" and method == "POST":
+            pit_id = uuid.uuid4().hex
+            self.pits[pit_id] = {"index": index, "docs": sorted((doc_id, dict(src))
+                                                                for doc_id, src in self.indices[index].items())}
+            return self.read_delay, 200, {"id": pit_id}
+        if endpoint == "_pit" and method == "DELETE":
+            return self.read_delay, 200, {"succeeded": self.pits.pop(data.get("id"), None) is not None}
+        if parts[:1] == ["_tasks"]:
+            task = self.tasks.get(parts[1])
+            if task is None:
+                return self.read_delay, 404, {"error": {"type": "resource_not_found_exception"}, "status": 404}
+            return self.read_delay, 200, task
+        if endpoint == "_bulk":
+            return self._bulk(index, body, params.get("pipeline", [None])[0])
+        if endpoint == "_doc" and method in ("POST", "PUT"):
+            doc_id = doc_id or uuid.uuid4().hex
+            self.indices[index][doc_id] = data
+            delay = self.index_delay + self.per_doc_delay + (self.pipeline_delay if params.get("pipeline") else 0)
+            return delay, 201, {"_index": index, "_id": doc_id, "result": "created", **self._bump(index, doc_id)}
+        if endpoint == "_doc" and method in ("GET", "HEAD"):
+            source = self.indices[index].get(doc_id)
+            if source is None:
+                return self.read_delay, 404, {"_index": index, "_id": doc_id, "found": False}
+            return self.read_delay, 200, {"_index": index, "_id": doc_id, "found": True, "_source": source,
+                                          "_seq_no": self.seq_nos.get((index, doc_id), 0), "_primary_term": 1}
+        if endpoint == "_doc" and method == "DELETE":
+            if self.indices[index].pop(doc_id, None) is None:
+                return self.read_delay, 404, {"_index": index, "_id": doc_id, "result": "not_found"}
+            return self.read_delay, 200, {"_index": index, "_id": doc_id, "result": "deleted"}
+        if endpoint == "_update":
+            source = self.indices[index].get(doc_id)
+            if source is None:
+                return self.read_delay, 404, {"error": {"type": "document_missing_exception"}, "status": 404}
+            if "if_seq_no" in params and int(params["if_seq_no"][0]) != self.seq_nos.get((index, doc_id), 0):
+                return self.read_delay, 409, {"error": {"type": "version_conflict_engine_exception"}, "status": 409}
+            source.update(data.get("doc", {}))
+            if "script" in data:
+                source.update(data["script"].get("params", {}).get("doc", {}))
+                source["version"] = source.get("version", 0) + 1
+            payload = {"_index": index, "_id": doc_id, "result": "updated", **self._bump(index, doc_id)}
+            if params.get("_source") or data.get("_source"):
+                payload["get"] = {"found": True, "_source": dict(source)}
+            return self.index_delay + self.per_doc_delay, 200, payload
+        if endpoint == "_search":
+            return self.read_delay, 200, self._search(index, data)
+        if endpoint == "_count":
+            return self.read_delay, 200, {"count": self._search(index, {**data, "size": 0})["hits"]["total"]["value"]}
+        if endpoint == "_delete_by_query":
+            terms = _term_filters(data.get("query", {}))
+            doomed = [i for i, src in self.indices[index].items() if _matches(src, terms)]
+            for i in doomed:
+                del self.indices[index][i]
+            result = {"deleted": len(doomed), "failures": []}
+            if params.get("wait_for_completion") == ["false"]:
+                task_id = f"standin:{len(self.tasks) + 1}"
+                self.tasks[task_id] = {"completed": True, "response": result,
+                                       "task": {"status": {"total": len(doomed), "deleted": len(doomed)}}}
+                return self.read_delay, 200, {"task": task_id}
+            return self.read_delay, 200, result
+        if endpoint == "_update_by_query":
+            terms = _term_filters(data.get("query", {}))
+            matched = sum(1 for src in self.indices[index].values() if _matches(src, terms))
+            return self.read_delay, 200, {"updated": matched, "failures": []}
+        return self.read_delay, 200, {}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode().split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                delay, status, payload = self.route(method, target, body)
+                await asyncio.sleep(delay)
+
+                data = b"" if method == "HEAD" else json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\n"
+                    "Content-Type: application/json\r\n"
+                    "X-Elastic-Product: Elasticsearch\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError, ValueError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,120 @@
+"""Per-request cost of the metrics middleware and timing spans.
+
+Runs the real app (against the in-memory ES stand-in, with no read delay
+so the overhead isn't hidden behind I/O) once per mode, each in its own
+process since METRICS_ENABLED / SERVER_TIMING_ENABLED are read at import:
+
+    off            METRICS_ENABLED=false
+    metrics        METRICS_ENABLED=true (the default)
+    server-timing  metrics plus a Server-Timing header on every request
+
+Requests are driven straight through the ASGI interface, so the numbers
+are app time only, with no HTTP server or client in the way.
+
+    python benchmarks/metrics_overhead.py --requests 3000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "off": {"METRICS_ENABLED": "false", "SERVER_TIMING_ENABLED": "false"},
+    "metrics": {"METRICS_ENABLED": "true", "SERVER_TIMING_ENABLED": "false"},
+    "server-timing": {"METRICS_ENABLED": "true", "SERVER_TIMING_ENABLED": "true"},
+}
+
+
+async def call(app, method: str, path: str, headers=(), query: bytes = b"") -> tuple:
+    """One request through the ASGI app; returns (status, headers, body)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query,
+        "headers": [(b"host", b"bench")] + list(headers), "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    response = {"body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+async def measure(requests: int, mode: str) -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    from note_service import NoteCreate
+
+    note = await main.app.state.services.note_service.create_note(NoteCreate(title="Bench", notes="x" * 2000))
+    headers = [(b"x-server-timing", b"1")] if mode == "server-timing" else []
+    routes = {"hello": "/", "note": f"/api/notes/{note.id}"}
+    result = {}
+    for name, path in routes.items():
+        for _ in range(50):  # warm up
+            await call(main.app, "GET", path, headers)
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            status, response_headers, _ = await call(main.app, "GET", path, headers)
+            latencies.append(time.perf_counter() - start)
+            assert status == 200, status
+        result[name] = round(statistics.median(latencies) * 1e6, 1)
+        if b"server-timing" in response_headers:
+            result[f"{name}_server_timing"] = response_headers[b"server-timing"].decode()
+
+    status, _, body = await call(main.app, "GET", "/metrics")
+    result["metrics_status"] = status
+    result["metrics_lines"] = len(body.splitlines()) if status == 200 else 0
+    from es_client import ESClient
+    await ESClient.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="timed requests per route and mode")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(measure(args.requests, args.mode))))
+        return
+
+    from upload_memory import start_standin
+
+    standin = start_standin()
+    standin.read_delay = standin.index_delay = 0
+    report = {}
+    for mode, env in MODES.items():
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--requests", str(args.requests), "--mode", mode],
+            env={**os.environ, **env, "ELASTICSEARCH_URL": standin.url, "CACHE_BACKEND": "none"},
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        report[mode] = json.loads(output.strip().splitlines()[-1])
+
+    for mode in ("metrics", "server-timing"):
+        for route in ("hello", "note"):
+            base = report["off"][route]
+            report[mode][f"{route}_overhead_us"] = round(report[mode][route] - base, 1)
+    report["unit"] = "median microseconds per request"
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Startup cost and first-request latency with and without the Mongo bootstrap.
+
+Needs MONGODB_URL to reach a mongod (local or container).
+
+    python benchmarks/mongo_startup.py --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def first_request(bootstrap: bool):
+    from mongo_client import MongoClient
+
+    await MongoClient.close()
+    start = time.perf_counter()
+    if bootstrap:
+        await MongoClient.bootstrap()
+    startup = time.perf_counter() - start
+
+    collection = await MongoClient.get_courses_collection()
+    start = time.perf_counter()
+    await collection.find_one({"course_id": "does-not-exist"})
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await collection.find_one({"course_id": "does-not-exist"})
+    second = time.perf_counter() - start
+
+    await MongoClient.close()
+    return startup, first, second
+
+
+async def main_async(runs):
+    from mongo_client import MongoClient
+
+    try:
+        client = await MongoClient.get_client()
+        await client.admin.command("ping")
+    except Exception as e:
+        return {"skipped": f"MongoDB not reachable: {e.__class__.__name__}"}
+
+    results = {}
+    for name, bootstrap in (("cold", False), ("bootstrapped", True)):
+        samples = [await first_request(bootstrap) for _ in range(runs)]
+        results[name] = {
+            "startup_ms": round(statistics.median(s[0] for s in samples) * 1000, 2),
+            "first_request_ms": round(statistics.median(s[1] for s in samples) * 1000, 2),
+            "second_request_ms": round(statistics.median(s[2] for s in samples) * 1000, 2),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    os.environ.setdefault("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "2000")
+    print(json.dumps(asyncio.run(main_async(args.runs)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
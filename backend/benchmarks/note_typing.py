@@ -0,0 +1,93 @@
+"""ES writes and bytes while a note is being typed into: PUT-per-autosave vs PATCH.
+
+A simulated editor types `--chars-per-sec` into a note that starts at
+`--initial-kb`, autosaving every `--autosave-interval` seconds. The PUT
+run sends the whole note each time; the PATCH run sends only the splice
+since the last save and lets the server coalesce. Write counts and bytes
+are measured at the in-memory ES stand-in.
+
+    python benchmarks/note_typing.py --seconds 20 --autosave-interval 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from es_standin import ESStandIn
+
+
+def es_writes(standin) -> dict:
+    return {"writes": standin.requests["_update"], "bytes": standin.bytes_received["_update"]}
+
+
+async def type_note(service, note_id, text, args, patch: bool):
+    from note_autosave import NotePatch, NoteSplice
+    from note_service import NoteUpdate
+
+    rng = random.Random(0)
+    version = (await service.get_note_by_id(note_id)).version
+    saved_len = len(text)
+    ticks = int(args.seconds / args.autosave_interval)
+    per_tick = max(1, int(args.chars_per_sec * args.autosave_interval))
+    for _ in range(ticks):
+        await asyncio.sleep(args.autosave_interval)
+        text += "".join(rng.choice("abcdefgh ") for _ in range(per_tick))
+        if patch:
+            splice = NoteSplice(pos=saved_len, insert=text[saved_len:])
+            result = await service.patch_note(note_id, NotePatch(version=version, ops=[splice]))
+            version = result.version
+        else:
+            await service.update_note(note_id, NoteUpdate(notes=text))
+        saved_len = len(text)
+    if patch:
+        await service.autosave.flush(note_id)
+    return text
+
+
+async def run(args):
+    standin = await ESStandIn(read_delay=0.001, index_delay=0.005).start()
+    os.environ["ELASTICSEARCH_URL"] = standin.url
+    os.environ["NOTE_AUTOSAVE_DELAY"] = str(args.delay)
+    os.environ["NOTE_AUTOSAVE_MAX_DELAY"] = str(args.max_delay)
+    from es_client import ESClient
+    from note_service import NoteCreate, NoteService
+
+    report = {}
+    try:
+        for mode in ("put", "patch"):
+            service = NoteService()
+            initial = "x" * (args.initial_kb * 1024)
+            note = await service.create_note(NoteCreate(title="lecture notes", notes=initial))
+            before = es_writes(standin)
+            final = await type_note(service, note.id, initial, args, patch=mode == "patch")
+            after = es_writes(standin)
+            stored = standin.indices["notes-index"][note.id]["notes"]
+            report[mode] = {
+                "es_writes": after["writes"] - before["writes"],
+                "es_bytes": after["bytes"] - before["bytes"],
+                "consistent": stored == final,
+            }
+    finally:
+        await ESClient.close()
+        await standin.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--chars-per-sec", type=float, default=5)
+    parser.add_argument("--autosave-interval", type=float, default=0.5)
+    parser.add_argument("--initial-kb", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=2, help="NOTE_AUTOSAVE_DELAY")
+    parser.add_argument("--max-delay", type=float, default=10, help="NOTE_AUTOSAVE_MAX_DELAY")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""PDF extraction throughput: pages/sec for 1 vs N process-pool workers.
+
+    python benchmarks/pdf_extraction.py --documents 8 --pages 300 --workers 1 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import make_corpus
+from pdf_extractor import PdfExtractor
+
+
+async def bench(corpus, workers, concurrent):
+    extractor = PdfExtractor(max_workers=workers, timeout=600)
+    try:
+        # Warm the pool so process spawn time isn't counted
+        await extractor.extract_pages(corpus[0])
+        start = time.perf_counter()
+        if concurrent:
+            results = await asyncio.gather(*(extractor.extract_pages(pdf) for pdf in corpus))
+        else:
+            results = [await extractor.extract_pages(pdf) for pdf in corpus]
+        elapsed = time.perf_counter() - start
+    finally:
+        extractor.shutdown()
+    pages = sum(len(r) for r in results)
+    return {
+        "workers": workers,
+        "pages": pages,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--concurrent", action="store_true", help="extract all documents at once")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = []
+        for i, pdf in enumerate(make_corpus(args.documents, args.pages)):
+            path = os.path.join(tmp, f"{i}.pdf")
+            with open(path, "wb") as f:
+                f.write(pdf)
+            corpus.append(path)
+        results = [asyncio.run(bench(corpus, w, args.concurrent)) for w in args.workers]
+    print(json.dumps({"documents": args.documents, "pages_per_document": args.pages, "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
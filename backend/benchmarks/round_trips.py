@@ -0,0 +1,100 @@
+"""Round trips per write in the CRUD services.
+
+ES calls are counted at the in-memory ES stand-in. Mongo commands are
+counted with a pymongo CommandListener against MONGODB_URL (a local mongod
+or container); the Mongo section is skipped if it can't be reached.
+
+    python benchmarks/round_trips.py
+"""
+import asyncio
+import json
+import os
+import sys
+import uuid
+
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from es_standin import ESStandIn
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name not in ("hello", "isMaster", "ismaster", "endSessions"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def count_calls(counter, op):
+    before = counter()
+    await op()
+    return counter() - before
+
+
+async def es_round_trips(standin):
+    from folder_service import FolderCreate, FolderService, FolderUpdate
+    from note_service import NoteCreate, NoteService, NoteUpdate
+
+    requests = lambda: sum(standin.requests.values())
+    notes, folders = NoteService(), FolderService()
+    note = await notes.create_note(NoteCreate(title="t", notes="n"))
+    folder = await folders.create_folder(FolderCreate(folder_name="f"))
+    return {
+        "update_note": await count_calls(requests, lambda: notes.update_note(note.id, NoteUpdate(notes="n2"))),
+        "update_folder": await count_calls(requests, lambda: folders.update_folder(folder.id, FolderUpdate(folder_name="f2"))),
+        "delete_note": await count_calls(requests, lambda: notes.delete_note(note.id)),
+    }
+
+
+async def mongo_round_trips():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from course_service import CourseCreate, CourseService, CourseUpdate
+    from mongo_client import MongoClient
+
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"),
+                                serverSelectionTimeoutMS=2000, event_listeners=[counter])
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        return {"skipped": f"MongoDB not reachable: {e.__class__.__name__}"}
+
+    MongoClient._client = client
+    service = CourseService()
+    await MongoClient.ensure_indexes()
+    course_id = f"RT-{uuid.uuid4().hex[:8]}"
+    commands = lambda: counter.count
+    try:
+        return {
+            "create_course": await count_calls(commands, lambda: service.create_course(CourseCreate(course_id=course_id, course_name="c"))),
+            "update_course": await count_calls(commands, lambda: service.update_course(course_id, CourseUpdate(course_name="c2"))),
+            "delete_course": await count_calls(commands, lambda: service.delete_course(course_id)),
+        }
+    finally:
+        client.close()
+
+
+async def main_async():
+    standin = await ESStandIn(read_delay=0, index_delay=0).start()
+    os.environ["ELASTICSEARCH_URL"] = standin.url
+    os.environ["CACHE_BACKEND"] = "none"
+
+    from es_client import ESClient
+
+    results = {"elasticsearch": await es_round_trips(standin), "mongodb": await mongo_round_trips()}
+    await ESClient.close()
+    await standin.stop()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(main_async()), indent=2))
@@ -0,0 +1,140 @@
+"""Cold import and worker startup time of the API, checked against a budget.
+
+Each sample is a fresh interpreter (against the in-memory ES stand-in):
+
+    import     `import main`: module imports plus building the app
+    startup    the ASGI lifespan startup a worker runs before serving
+               (ES client, Mongo bootstrap, ingest queue)
+
+It also fails if the ingestion stack (PDF parsing, thumbnails, course
+purges) or the Mongo driver is loaded by the import, or the ingestion
+stack by startup; those load on first use. Exits non-zero when anything
+is over budget, so it can gate CI.
+
+Without MONGODB_URL the bootstrap is pointed at a closed port with the
+shortest server-selection timeout; pymongo still waits about 500 ms
+before giving up, which the default startup budget allows for.
+
+    python benchmarks/startup_budget.py --runs 7 --max-import-ms 1500 --max-startup-ms 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be in sys.modules after `import main`
+LAZY_ON_IMPORT = ["PyPDF2", "pypdfium2", "pdf_extractor", "thumbnails", "slide_ingest", "course_cleanup",
+                  "motor", "pymongo"]
+# ...nor after the lifespan has started a worker
+LAZY_ON_STARTUP = ["PyPDF2", "pypdfium2", "pdf_extractor", "thumbnails", "slide_ingest", "course_cleanup"]
+
+
+def _loaded(modules) -> list:
+    return [name for name in modules if name in sys.modules]
+
+
+async def lifespan_startup(app) -> None:
+    """Run the app's lifespan startup the way uvicorn does"""
+    messages = asyncio.Queue()
+    await messages.put({"type": "lifespan.startup"})
+    started = asyncio.get_running_loop().create_future()
+
+    async def receive():
+        return await messages.get()
+
+    async def send(message):
+        if message["type"] == "lifespan.startup.complete":
+            started.set_result(None)
+        elif message["type"] == "lifespan.startup.failed":
+            started.set_exception(RuntimeError(message.get("message", "startup failed")))
+
+    scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+    task = asyncio.create_task(app(scope, receive, send))
+    await started
+    await messages.put({"type": "lifespan.shutdown"})
+    await task
+
+
+def measure() -> dict:
+    """One sample, in this (fresh) process"""
+    start = time.perf_counter()
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    import_ms = (time.perf_counter() - start) * 1000
+    import_loaded = _loaded(LAZY_ON_IMPORT)
+
+    async def run():
+        start = time.perf_counter()
+        await lifespan_startup(main.app)
+        return (time.perf_counter() - start) * 1000
+
+    # Shutdown is included; it's a fraction of a millisecond with nothing to flush
+    startup_ms = asyncio.run(run())
+    return {"import_ms": import_ms, "startup_ms": startup_ms, "loaded_on_import": import_loaded,
+            "loaded_on_startup": _loaded(LAZY_ON_STARTUP)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="fresh processes to sample (median is reported)")
+    parser.add_argument("--max-import-ms", type=float, default=1500)
+    parser.add_argument("--max-startup-ms", type=float, default=1000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure()))
+        return
+
+    from upload_memory import start_standin
+
+    standin = start_standin()
+    env = {**os.environ, "ELASTICSEARCH_URL": standin.url}
+    if not os.getenv("MONGODB_URL"):
+        env.update({"MONGODB_URL": "mongodb://127.0.0.1:1", "MONGODB_SERVER_SELECTION_TIMEOUT_MS": "1"})
+
+    samples = []
+    # The first run also writes bytecode caches, so it isn't counted
+    for _ in range(args.runs + 1):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    samples = samples[1:]
+
+    import_ms = round(statistics.median(s["import_ms"] for s in samples), 1)
+    startup_ms = round(statistics.median(s["startup_ms"] for s in samples), 1)
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append(f"import {import_ms} ms > {args.max_import_ms} ms")
+    if startup_ms > args.max_startup_ms:
+        failures.append(f"startup {startup_ms} ms > {args.max_startup_ms} ms")
+    loaded_on_import = sorted({name for s in samples for name in s["loaded_on_import"]})
+    loaded_on_startup = sorted({name for s in samples for name in s["loaded_on_startup"]})
+    if loaded_on_import:
+        failures.append(f"loaded by import: {', '.join(loaded_on_import)}")
+    if loaded_on_startup:
+        failures.append(f"loaded by startup: {', '.join(loaded_on_startup)}")
+
+    print(json.dumps({
+        "runs": args.runs,
+        "import_ms": {"median": import_ms, "max": round(max(s["import_ms"] for s in samples), 1),
+                      "budget": args.max_import_ms},
+        "startup_ms": {"median": startup_ms, "max": round(max(s["startup_ms"] for s in samples), 1),
+                       "budget": args.max_startup_ms},
+        "mongo": "MONGODB_URL" if os.getenv("MONGODB_URL") else "unreachable (bootstrap fails)",
+        "failures": failures
+    }, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Peak server RSS while large PDFs are uploaded concurrently.
+
+Runs the app under uvicorn in a subprocess (against the in-memory ES
+stand-in and a temporary local blob store), streams `--files` uploads of
+`--size-mb` each at once, then reads the server's peak RSS (VmHWM, Linux
+only). Exits non-zero if it is above `--max-rss-mb`, or if an upload over
+the size limit isn't refused with 413.
+
+    python benchmarks/upload_memory.py --files 8 --size-mb 80 --max-rss-mb 400
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import make_pdf
+from es_standin import ESStandIn
+
+MB = 1024 * 1024
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_standin() -> ESStandIn:
+    """Run the ES stand-in on its own event loop in a daemon thread"""
+    loop = asyncio.new_event_loop()
+    standin = ESStandIn(read_delay=0.001, index_delay=0.01)
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(standin.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return standin
+
+
+def memory_kb(pid: int, field: str) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise RuntimeError(f"{field} not available")
+
+
+def upload(port: int, path: str, declared_length: int = None) -> tuple:
+    """Stream a multipart upload from disk; return (status, seconds)"""
+    boundary = uuid.uuid4().hex
+    fields = {"course_id": "MEM-101", "course_name": "Memory", "title": os.path.basename(path)}
+    head = b"".join(
+        b'--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n' % (boundary.encode(), k.encode(), v.encode())
+        for k, v in fields.items()
+    )
+    head += (b'--%s\r\nContent-Disposition: form-data; name="file"; filename="%s"\r\n'
+             b"Content-Type: application/pdf\r\n\r\n" % (boundary.encode(), os.path.basename(path).encode()))
+    tail = b"\r\n--%s--\r\n" % boundary.encode()
+    length = len(head) + os.path.getsize(path) + len(tail)
+
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    try:
+        conn.putrequest("POST", "/api/upload")
+        conn.putheader("Content-Type", f"multipart/form-data; boundary={boundary}")
+        conn.putheader("Content-Length", str(declared_length or length))
+        conn.endheaders()
+        try:
+            conn.send(head)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(256 * 1024), b""):
+                    conn.send(chunk)
+            conn.send(tail)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the server may refuse before reading the body
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def wait_until_up(port: int, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=8, help="concurrent uploads")
+    parser.add_argument("--size-mb", type=float, default=80)
+    parser.add_argument("--limit-mb", type=float, default=100, help="MAX_UPLOAD_MB for the server")
+    parser.add_argument("--max-rss-mb", type=float, default=400, help="fail above this peak server RSS")
+    args = parser.parse_args()
+
+    standin = start_standin()
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"deck-{i}.pdf")
+            with open(path, "wb") as f:
+                # Distinct seeds so dedup doesn't skip any of them
+                f.write(make_pdf(pages=20, seed=i, padding=int(args.size_mb * MB)))
+            paths.append(path)
+
+        env = {
+            **os.environ,
+            "ELASTICSEARCH_URL": standin.url,
+            "BLOB_STORE": "local",
+            "BLOB_STORE_PATH": os.path.join(tmp, "blobs"),
+            "MAX_UPLOAD_MB": str(args.limit_mb),
+            "PDF_EXTRACT_WORKERS": "1",
+            "MONGODB_URL": "mongodb://127.0.0.1:1",
+            "MONGODB_SERVER_SELECTION_TIMEOUT_MS": "500",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        )
+        try:
+            wait_until_up(port, server)
+            idle_rss = memory_kb(server.pid, "VmRSS") / 1024
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.files) as pool:
+                results = list(pool.map(lambda p: upload(port, p), paths))
+            elapsed = time.perf_counter() - start
+            peak_rss = memory_kb(server.pid, "VmHWM") / 1024
+
+            # Declared too large: must be refused without reading the body
+            oversize_status, oversize_s = upload(port, paths[0], declared_length=int((args.limit_mb + 1) * MB))
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "files": args.files,
+        "size_mb": args.size_mb,
+        "statuses": sorted({status for status, _ in results}),
+        "elapsed_s": round(elapsed, 2),
+        "idle_rss_mb": round(idle_rss, 1),
+        "peak_rss_mb": round(peak_rss, 1),
+        "peak_rss_per_upload_mb": round((peak_rss - idle_rss) / args.files, 1),
+        "max_rss_mb": args.max_rss_mb,
+        "oversize_status": oversize_status,
+        "oversize_s": round(oversize_s, 3),
+    }
+    print(json.dumps(report, indent=2))
+    ok = report["statuses"] == [202] and oversize_status == 413 and peak_rss <= args.max_rss_mb
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
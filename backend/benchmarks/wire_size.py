@@ -0,0 +1,121 @@
+"""Bytes on the wire and serialization CPU for large JSON responses.
+
+Seeds the ES stand-in with one course of `--decks` decks carrying
+`--text-kb` of extracted text each, plus one legacy document with a
+base64 `pdf_binary` of `--pdf-mb`, then requests (straight through ASGI,
+cache off):
+
+    GET /api/slides/{course_id}?include=text   the full-text course listing
+    GET /api/pdf/{document_id}                 the base64 PDF
+
+once per Accept-Encoding the app can produce (zstd needs `zstandard`, br
+needs `brotli`), reporting wire bytes and median request time. Rendering
+the same payloads with the stdlib encoder (before) and FastJSONResponse
+(after) gives the serialization CPU.
+
+    python benchmarks/wire_size.py --decks 200 --text-kb 20 --pdf-mb 5
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import WORDS, make_pdf
+from es_standin import ESStandIn
+from metrics_overhead import call
+
+COURSE_ID = "WIRE-101"
+
+
+def seed(standin: ESStandIn, index: str, args) -> str:
+    rng = random.Random(0)
+    for i in range(args.decks):
+        text = " ".join(rng.choice(WORDS) for _ in range(args.text_kb * 1024 // 8))
+        standin.indices[index][f"deck-{i:04d}"] = {
+            "slide_id": f"deck-{i:04d}", "course_id": COURSE_ID, "course_name": "Wire Formats",
+            "filename": f"deck-{i}.pdf", "title": f"Lecture {i}", "text_snippet": text[:300],
+            "text_content": text, "pdf_size": 250_000, "page_count": 30,
+            "uploaded_at": "2026-01-01T00:00:00", "has_binary": True,
+        }
+    pdf = make_pdf(pages=30, padding=int(args.pdf_mb * 1024 * 1024))
+    standin.indices[index]["legacy-pdf"] = {
+        "slide_id": "legacy-pdf", "course_id": "LEGACY-101", "course_name": "Legacy", "filename": "legacy.pdf",
+        "title": "Legacy", "has_binary": True, "pdf_size": len(pdf),
+        "pdf_binary": base64.b64encode(pdf).decode(),
+    }
+    return "legacy-pdf"
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append(time.process_time() - start)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+async def main_async(args):
+    standin = await ESStandIn(read_delay=0, index_delay=0).start()
+    os.environ.update({"ELASTICSEARCH_URL": standin.url, "CACHE_BACKEND": "none", "METRICS_ENABLED": "false"})
+    import main
+    from es_client import ESClient
+    from response_encoding import FastJSONResponse, available_encodings, orjson
+    from starlette.responses import JSONResponse
+
+    legacy_id = seed(standin, main.index_name, args)
+    routes = {
+        "course_listing": f"/api/slides/{COURSE_ID}?include=text&size=500",
+        "pdf_base64": f"/api/pdf/{legacy_id}",
+    }
+    report = {"encodings": available_encodings(), "orjson": orjson is not None, "routes": {}}
+    for name, target in routes.items():
+        path, _, query = target.partition("?")
+        result = {}
+        payload = None
+        for encoding in ["identity"] + available_encodings():
+            headers = [(b"accept-encoding", encoding.encode())]
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                status, response_headers, body = await call(main.app, "GET", path, headers, query.encode())
+                timings.append(time.perf_counter() - start)
+            assert status == 200, (status, body[:200])
+            assert response_headers.get(b"content-encoding", b"identity").decode() == encoding
+            if payload is None:
+                payload = json.loads(body)
+            result[encoding] = {"wire_bytes": len(body), "request_ms": round(statistics.median(timings) * 1000, 2)}
+
+        before_ms = cpu_ms(lambda: JSONResponse(payload), args.repeat)
+        after_ms = cpu_ms(lambda: FastJSONResponse(payload), args.repeat)
+        best = available_encodings()[0]
+        result["serialize_cpu_ms"] = {"stdlib_json": before_ms, "fast_json": after_ms}
+        result["before"] = {"wire_bytes": result["identity"]["wire_bytes"], "serialize_cpu_ms": before_ms}
+        result["after"] = {"encoding": best, "wire_bytes": result[best]["wire_bytes"], "serialize_cpu_ms": after_ms}
+        result["wire_reduction_pct"] = round(100 * (1 - result[best]["wire_bytes"] / result["identity"]["wire_bytes"]), 1)
+        report["routes"][name] = result
+
+    await ESClient.close()
+    await standin.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type=int, default=200)
+    parser.add_argument("--text-kb", type=int, default=20)
+    parser.add_argument("--pdf-mb", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+import hashlib
+import os
+import tempfile
+from typing import AsyncIterator, BinaryIO, Iterator, Optional
+
+load_dotenv()
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobStore(ABC):
+    """Content-addressed storage for PDF payloads.
+
+    Blobs are keyed by the SHA-256 of their bytes, so the key doubles as a
+    strong ETag and identical uploads share one stored object.
+    """
+
+    @abstractmethod
+    def put_file(self, fileobj: BinaryIO, digest: Optional[str] = None) -> str:
+        ...
+
+    def put_bytes(self, data: bytes) -> str:
+        import io
+        return self.put_file(io.BytesIO(data), hashlib.sha256(data).hexdigest())
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.size(key)
+            return True
+        except BlobNotFound:
+            return False
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield bytes [start, end] (inclusive) of a blob in chunks"""
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.iter_range(key))
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        """Yield a local file path holding the blob (e.g. for mmap-based parsing)"""
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            for chunk in self.iter_range(key):
+                tmp.write(chunk)
+            tmp.flush()
+            yield tmp.name
+
+    @asynccontextmanager
+    async def async_local_copy(self, key: str) -> AsyncIterator[str]:
+        """`local_copy` for async code; fetching and cleaning up the copy run in the threadpool"""
+        copy = self.local_copy(key)
+        path = await run_in_threadpool(copy.__enter__)
+        try:
+            yield path
+        finally:
+            await run_in_threadpool(copy.__exit__, None, None, None)
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs on the local filesystem, sharded as <root>/ab/cd/<sha256>"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put_file(self, fileobj: BinaryIO, digest: Optional[str] = None) -> str:
+        # Spool to a temp file in the store's directory while hashing, then
+        # rename into place so readers never observe a partial blob.
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+            key = hasher.hexdigest()
+            if digest is not None and digest != key:
+                raise ValueError("Blob digest mismatch")
+            path = self._path(key)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return key
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def size(self, key: str) -> int:
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+        with f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise BlobNotFound(key)
+        yield path
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore(BlobStore):
+    """Blobs in an S3-compatible bucket (AWS S3, MinIO, ...)"""
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, prefix: str = "pdfs/"):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3 = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=os.getenv('S3_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('S3_SECRET_ACCESS_KEY'),
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put_file(self, fileobj: BinaryIO, digest: Optional[str] = None) -> str:
+        if digest is None:
+            hasher = hashlib.sha256()
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+            digest = hasher.hexdigest()
+            fileobj.seek(0)
+        if not self.exists(digest):
+            self.s3.upload_fileobj(fileobj, self.bucket, self._key(digest),
+                                   ExtraArgs={"ContentType": "application/pdf"})
+        return digest
+
+    def size(self, key: str) -> int:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.s3.head_object(Bucket=self.bucket, Key=self._key(key))["ContentLength"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise BlobNotFound(key)
+            raise
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        from botocore.exceptions import ClientError
+
+        byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=self._key(key), Range=byte_range)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise BlobNotFound(key)
+            raise
+        yield from obj["Body"].iter_chunks(chunk_size)
+
+    def delete(self, key: str) -> None:
+        self.s3.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+_blob_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Get the configured blob store (BLOB_STORE=local|s3)"""
+    global _blob_store
+    if _blob_store is None:
+        backend = os.getenv('BLOB_STORE', 'local')
+        if backend == 's3':
+            _blob_store = S3BlobStore(
+                bucket=str(os.getenv('S3_BUCKET')),
+                endpoint_url=os.getenv('S3_ENDPOINT_URL'),
+            )
+        else:
+            _blob_store = LocalBlobStore(os.getenv('BLOB_STORE_PATH', 'data/blobs'))
+    return _blob_store
@@ -0,0 +1,203 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from dotenv import load_dotenv
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+load_dotenv()
+
+
+def _prefixes(key: str) -> List[str]:
+    """Prefixes of `key` an invalidation can be recorded under: "" and each one ending at a ':'"""
+    return [""] + [key[:i + 1] for i, c in enumerate(key) if c == ":"]
+
+
+def _invalidated_prefix(prefix: str) -> str:
+    """Where delete_prefix(prefix) records itself: cut back to a ':' so _prefixes() finds it"""
+    return prefix[:prefix.rfind(":") + 1]
+
+
+class CacheStats:
+    """Hit/miss counters per key namespace (the part before the first ':')"""
+
+    def __init__(self):
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def hit(self, key: str) -> None:
+        self.hits[self._namespace(key)] += 1
+
+    def miss(self, key: str) -> None:
+        self.misses[self._namespace(key)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {
+            namespace: {"hits": self.hits[namespace], "misses": self.misses[namespace]}
+            for namespace in sorted(set(self.hits) | set(self.misses))
+        }
+
+
+class Cache(ABC):
+    """Async key/value cache for JSON-serializable values"""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        ...
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None) -> Any:
+        """Cached value, or loader()'s, which isn't stored if `key` was invalidated
+        while loading (it may predate the write that invalidated it)"""
+        value = await self.get(key)
+        if value is not None:
+            self.stats.hit(key)
+            return value
+        self.stats.miss(key)
+        generation = await self._generation(key)
+        value = await loader()
+        await self._set_if_current(key, value, ttl, generation)
+        return value
+
+    async def _generation(self, key: str) -> Any:
+        """Changes whenever a delete_prefix() covering `key` runs"""
+        return None
+
+    async def _set_if_current(self, key: str, value: Any, ttl: Optional[float], generation: Any) -> None:
+        if await self._generation(key) == generation:
+            await self.set(key, value, ttl)
+
+    async def close(self) -> None:
+        pass
+
+
+class NullCache(Cache):
+    """Caching disabled; every read is a miss"""
+
+    async def get(self, key: str) -> Optional[Any]:
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    async def delete_prefix(self, prefix: str) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """In-process LRU with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 60.0):
+        super().__init__()
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.generations: Dict[str, int] = defaultdict(int)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.entries[key] = (time.monotonic() + (ttl or self.default_ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        self.generations[_invalidated_prefix(prefix)] += 1
+        for key in [k for k in self.entries if k.startswith(prefix)]:
+            del self.entries[key]
+
+    async def _generation(self, key: str) -> Any:
+        return [self.generations.get(prefix, 0) for prefix in _prefixes(key)]
+
+
+class RedisCache(Cache):
+    """Shared cache in Redis so invalidations reach every worker"""
+
+    # SET the value only if none of the generation keys moved since they were read
+    _SET_IF_CURRENT = """
+    for i = 2, #KEYS do
+        if (redis.call('GET', KEYS[i]) or '') ~= ARGV[i + 1] then return 0 end
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+    """
+
+    def __init__(self, url: str, default_ttl: float = 60.0, prefix: str = "slides:cache:",
+                 generation_prefix: str = "slides:cache-gen:"):
+        import redis.asyncio as redis
+
+        super().__init__()
+        self.redis = redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        # Outside `prefix`, so delete_prefix's scan never matches a counter
+        self.generation_prefix = generation_prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self.redis.get(self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self.redis.set(self.prefix + key, json.dumps(value), px=int((ttl or self.default_ttl) * 1000))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await self.redis.incr(self.generation_prefix + _invalidated_prefix(prefix))
+        keys = [key async for key in self.redis.scan_iter(match=f"{self.prefix}{prefix}*", count=500)]
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def _generation(self, key: str) -> Any:
+        counters = await self.redis.mget([self.generation_prefix + prefix for prefix in _prefixes(key)])
+        return [counter.decode() if counter is not None else "" for counter in counters]
+
+    async def _set_if_current(self, key: str, value: Any, ttl: Optional[float], generation: Any) -> None:
+        counters = [self.generation_prefix + prefix for prefix in _prefixes(key)]
+        await self.redis.eval(self._SET_IF_CURRENT, 1 + len(counters), self.prefix + key, *counters,
+                              json.dumps(value), int((ttl or self.default_ttl) * 1000), *generation)
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+_cache: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """Get the configured cache (CACHE_BACKEND=memory|redis|none)"""
+    global _cache
+    if _cache is None:
+        backend = os.getenv('CACHE_BACKEND', 'memory')
+        ttl = float(os.getenv('CACHE_TTL', '60'))
+        if backend == 'redis':
+            _cache = RedisCache(os.getenv('REDIS_URL', 'redis://localhost:6379/0'), default_ttl=ttl)
+        elif backend == 'none':
+            _cache = NullCache()
+        else:
+            _cache = MemoryCache(int(os.getenv('CACHE_MAX_ENTRIES', '1024')), default_ttl=ttl)
+    return _cache
@@ -0,0 +1,144 @@
+from dotenv import load_dotenv
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.exceptions import GeneralAvailabilityWarning
+from es_client import ESClient
+from cache import get_cache
+from course_service import CourseService
+from ingest_queue import IngestQueue, report_progress
+from page_service import pages_index
+from slide_ingest import delete_unreferenced_blobs, slides_index
+from thumbnails import ThumbnailService
+import asyncio
+import os
+import warnings
+from typing import Any, Dict, List, Optional, Union
+
+load_dotenv()
+
+# The tasks API is flagged "technical preview" but has been stable for years
+warnings.filterwarnings("ignore", category=GeneralAvailabilityWarning, module=__name__)
+
+
+def _slices(value: str) -> Union[int, str]:
+    return int(value) if value.isdigit() else value
+
+
+class CourseCleanupService:
+    """Removes what a deleted course leaves behind: its slide and page
+    documents in Elasticsearch, plus blobs and thumbnails no other slide uses.
+
+    Deletes run as sliced, throttled `delete_by_query` tasks so a large
+    course doesn't compete with searches for the cluster, and are polled
+    through the tasks API to report progress.
+    """
+
+    def __init__(self, course_service: CourseService, thumbnail_service: Optional[ThumbnailService] = None,
+                 client: Optional[AsyncElasticsearch] = None, ingest_queue: Optional[IngestQueue] = None):
+        self.course_service = course_service
+        self.thumbnail_service = thumbnail_service
+        self.ingest_queue = ingest_queue
+        self.slices = _slices(os.getenv('COURSE_DELETE_SLICES', 'auto'))
+        # Documents per second across all slices; -1 disables throttling
+        self.requests_per_second = float(os.getenv('COURSE_DELETE_REQUESTS_PER_SECOND', '1000'))
+        self.batch_size = int(os.getenv('COURSE_DELETE_BATCH_SIZE', '1000'))
+        self.poll_interval = float(os.getenv('COURSE_DELETE_POLL_INTERVAL', '1.0'))
+        self.client = client
+
+    async def _get_client(self):
+        # Injected by the ServiceContainer; scripts that build a service on its own get the shared one
+        if self.client is None:
+            self.client = await ESClient.get_client()
+        return self.client
+
+    async def purge(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Job handler for "course_delete"; errors propagate so the queue can retry, and re-running is safe"""
+        course_id = payload["course_id"]
+        if await self.course_service.get_course_by_id(course_id) is not None:
+            # Recreated since the delete was queued: its slides are live again
+            return {"course_id": course_id, "skipped": True}
+
+        # Collected first: once the slides are gone nothing points at their blobs
+        blob_keys = await self._blob_keys(course_id)
+        progress: Dict[str, Any] = {"course_id": course_id, "blobs": len(blob_keys)}
+        slides = await self._delete_by_query(slides_index, course_id, progress)
+        pages = await self._delete_by_query(pages_index, course_id, progress)
+        await get_cache().delete_prefix(f"slides:{course_id}:")
+        blobs = await delete_unreferenced_blobs(await self._get_client(), blob_keys, self.thumbnail_service,
+                                                self.batch_size, ingest_queue=self.ingest_queue)
+        return {"course_id": course_id, "slides_deleted": slides, "pages_deleted": pages, "blobs_deleted": blobs}
+
+    async def _blob_keys(self, course_id: str) -> List[str]:
+        """Distinct blob keys of a course's slides, paged with a composite aggregation"""
+        client = await self._get_client()
+        keys: List[str] = []
+        after = None
+        while True:
+            composite = {"size": self.batch_size, "sources": [{"blob_key": {"terms": {"field": "blob_key"}}}]}
+            if after is not None:
+                composite["after"] = after
+            response = await client.search(
+                index=slides_index,
+                body={"size": 0, "query": {"term": {"course_id": course_id}}, "aggs": {"blobs": {"composite": composite}}}
+            )
+            blobs = response["aggregations"]["blobs"]
+            keys.extend(bucket["key"]["blob_key"] for bucket in blobs["buckets"])
+            after = blobs.get("after_key")
+            if not blobs["buckets"] or after is None:
+                return keys
+
+    async def _delete_by_query(self, index: str, course_id: str, progress: Dict[str, Any]) -> int:
+        client = await self._get_client()
+        response = await client.delete_by_query(
+            index=index,
+            body={"query": {"term": {"course_id": course_id}}},
+            conflicts="proceed",
+            slices=self.slices,
+            requests_per_second=self.requests_per_second,
+            scroll_size=self.batch_size,
+            refresh=True,
+            wait_for_completion=False,
+            ignore_unavailable=True
+        )
+        task_id = response["task"]
+        while True:
+            task = await client.tasks.get(task_id=task_id)
+            status = task["task"]["status"]
+            progress[index] = {"total": status.get("total", 0), "deleted": status.get("deleted", 0)}
+            await report_progress(dict(progress))
+            if task.get("completed"):
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        if task.get("error"):
+            raise Exception(f"delete_by_query on {index} failed: {task['error'].get('reason', task['error'])}")
+        result = task.get("response", {})
+        if result.get("failures"):
+            raise Exception(f"delete_by_query on {index} failed: {result['failures'][0]}")
+        return result.get("deleted", 0)
+
+    async def orphaned_courses(self) -> Dict[str, int]:
+        """course_id -> document count for courses indexed in Elasticsearch but missing from MongoDB"""
+        try:
+            client = await self._get_client()
+            counts: Dict[str, int] = {}
+            after = None
+            while True:
+                composite = {"size": self.batch_size, "sources": [{"course_id": {"terms": {"field": "course_id"}}}]}
+                if after is not None:
+                    composite["after"] = after
+                response = await client.search(
+                    index=f"{slides_index},{pages_index}",
+                    body={"size": 0, "aggs": {"courses": {"composite": composite}}},
+                    ignore_unavailable=True
+                )
+                courses = response["aggregations"]["courses"]
+                for bucket in courses["buckets"]:
+                    counts[bucket["key"]["course_id"]] = bucket["doc_count"]
+                after = courses.get("after_key")
+                if not courses["buckets"] or after is None:
+                    break
+
+            known = await self.course_service.existing_course_ids(counts, self.batch_size)
+            return {course_id: count for course_id, count in counts.items() if course_id not in known}
+        except Exception as e:
+            raise Exception(f"Error finding orphaned courses: {str(e)}")
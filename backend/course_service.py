@@ -1,7 +1,9 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set
 from pydantic import BaseModel
 from mongo_client import MongoClient
-from bson import ObjectId
+from cache import get_cache
+
+COURSES_CACHE_PREFIX = "courses:"
 
 class CourseBase(BaseModel):
     course_id: str
@@ -25,22 +27,29 @@ class CourseService:
     
     async def _get_collection(self):
         if self.collection is None:
+            # Duplicate course_ids are only rejected by the unique index; if Mongo
+            # was down at startup, create it now rather than write without it
+            await MongoClient.ensure_indexes()
             self.collection = await MongoClient.get_courses_collection()
         return self.collection
     
     async def get_all_courses(self) -> List[CourseResponse]:
         """Get all courses"""
         try:
-            collection = await self._get_collection()
-            courses = []
-            async for course in collection.find():
-                course['id'] = str(course['_id'])
-                del course['_id']
-                courses.append(CourseResponse(**course))
-            return courses
+            courses = await get_cache().get_or_load("courses:all", self._load_all_courses)
+            return [CourseResponse(**course) for course in courses]
         except Exception as e:
             raise Exception(f"Error fetching courses: {str(e)}")
     
+    async def _load_all_courses(self) -> List[dict]:
+        collection = await self._get_collection()
+        courses = []
+        async for course in collection.find():
+            course['id'] = str(course['_id'])
+            del course['_id']
+            courses.append(course)
+        return courses
+    
     async def get_course_by_id(self, course_id: str) -> Optional[CourseResponse]:
         """Get a specific course by course_id"""
         try:
@@ -57,25 +66,21 @@ class CourseService:
     async def create_course(self, course: CourseCreate) -> CourseResponse:
         """Create a new course"""
         try:
-            # Check if course_id already exists
-            existing = await self.get_course_by_id(course.course_id)
-            if existing:
-                raise ValueError(f"Course with ID '{course.course_id}' already exists")
-            
             collection = await self._get_collection()
             course_doc = {
                 "course_id": course.course_id,
                 "course_name": course.course_name
             }
             
-            result = await collection.insert_one(course_doc)
-            
-            # Retrieve the inserted document
-            inserted_doc = await collection.find_one({"_id": result.inserted_id})
-            inserted_doc['id'] = str(inserted_doc['_id'])
-            del inserted_doc['_id']
+            # The unique index on course_id (see mongo_client.INDEXES) rejects duplicates atomically
+            from pymongo.errors import DuplicateKeyError
+            try:
+                result = await collection.insert_one(course_doc)
+            except DuplicateKeyError:
+                raise ValueError(f"Course with ID '{course.course_id}' already exists")
             
-            return CourseResponse(**inserted_doc)
+            await get_cache().delete_prefix(COURSES_CACHE_PREFIX)
+            return CourseResponse(id=str(result.inserted_id), **course_doc)
         except ValueError:
             raise
         except Exception as e:
@@ -84,41 +89,58 @@ class CourseService:
     async def update_course(self, course_id: str, course_update: CourseUpdate) -> Optional[CourseResponse]:
         """Update an existing course"""
         try:
-            # Check if course exists
-            existing = await self.get_course_by_id(course_id)
-            if not existing:
-                return None
-            
             collection = await self._get_collection()
             update_data = {}
             
             if course_update.course_name:
                 update_data["course_name"] = course_update.course_name
             
-            if update_data:
-                await collection.update_one(
-                    {"course_id": course_id}, 
-                    {"$set": update_data}
-                )
+            if not update_data:
+                return await self.get_course_by_id(course_id)
             
-            return await self.get_course_by_id(course_id)
+            from pymongo import ReturnDocument
+            course = await collection.find_one_and_update(
+                {"course_id": course_id},
+                {"$set": update_data},
+                return_document=ReturnDocument.AFTER
+            )
+            if not course:
+                return None
+            
+            await get_cache().delete_prefix(COURSES_CACHE_PREFIX)
+            course['id'] = str(course['_id'])
+            del course['_id']
+            return CourseResponse(**course)
         except Exception as e:
             raise Exception(f"Error updating course: {str(e)}")
     
     async def delete_course(self, course_id: str) -> bool:
         """Delete a course"""
         try:
-            # Check if course exists
-            existing = await self.get_course_by_id(course_id)
-            if not existing:
-                return False
-            
             collection = await self._get_collection()
             result = await collection.delete_one({"course_id": course_id})
-            return result.deleted_count > 0
+            if result.deleted_count == 0:
+                return False
+            
+            await get_cache().delete_prefix(COURSES_CACHE_PREFIX)
+            return True
         except Exception as e:
             raise Exception(f"Error deleting course: {str(e)}")
     
+    async def existing_course_ids(self, course_ids: Iterable[str], batch_size: int = 1000) -> Set[str]:
+        """The ids among `course_ids` that still have a course, looked up `batch_size` at a time"""
+        try:
+            collection = await self._get_collection()
+            course_ids = list(course_ids)
+            existing = set()
+            for i in range(0, len(course_ids), batch_size):
+                async for course in collection.find({"course_id": {"$in": course_ids[i:i + batch_size]}},
+                                                    {"course_id": 1}):
+                    existing.add(course["course_id"])
+            return existing
+        except Exception as e:
+            raise Exception(f"Error looking up courses: {str(e)}")
+    
     async def get_courses_for_dropdown(self) -> List[dict]:
         """Get courses formatted for dropdown options"""
         try:
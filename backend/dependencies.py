@@ -0,0 +1,158 @@
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict
+from elasticsearch import AsyncElasticsearch
+from fastapi import Request
+from es_client import ESClient
+from mongo_client import MongoClient
+from cache import get_cache
+from course_service import CourseService
+from note_service import NoteService
+from folder_service import FolderService
+from page_service import PageService
+from search_service import SearchService
+from ingest_queue import IngestQueue
+import logging
+import os
+
+if TYPE_CHECKING:
+    from course_cleanup import CourseCleanupService
+    from pdf_extractor import PdfExtractor
+    from slide_ingest import SlideIngestService
+    from thumbnails import ThumbnailService
+
+logger = logging.getLogger(__name__)
+
+
+def check_worker_backends() -> None:
+    """Refuse to run several workers (WEB_CONCURRENCY, which uvicorn and gunicorn read) on
+    per-process backends: job polls would 404 on the wrong worker and cache invalidations
+    would only reach one"""
+    workers = int(os.getenv('WEB_CONCURRENCY', '1') or '1')
+    if workers <= 1:
+        return
+    per_process = []
+    if os.getenv('INGEST_QUEUE_BACKEND', 'memory') != 'redis':
+        per_process.append("INGEST_QUEUE_BACKEND")
+    if os.getenv('CACHE_BACKEND', 'memory') not in ('redis', 'none'):
+        per_process.append("CACHE_BACKEND")
+    if per_process:
+        raise RuntimeError(f"WEB_CONCURRENCY={workers} needs shared backends; set {' and '.join(per_process)} to redis")
+
+
+class ServiceContainer:
+    """The services one worker process shares between requests.
+
+    Built by `main.create_app()` and started/stopped by the app's lifespan.
+    The Elasticsearch client and the services using it, and the ingestion
+    stack (PDF parsing, thumbnails, course purges), are only constructed
+    when a job or route first needs them, so importing the app and
+    starting a worker don't pay for them. Every service gets the same
+    client.
+    """
+
+    def __init__(self):
+        self.course_service = CourseService()
+        self.ingest_queue = IngestQueue()
+        discard = self._job("slide_ingest_service", "discard")
+        self.ingest_queue.register("slide", self._job("slide_ingest_service", "ingest"), on_failure=discard)
+        self.ingest_queue.register("slide_batch", self._job("slide_ingest_service", "ingest_batch"), on_failure=discard)
+        self.ingest_queue.register("course_delete", self._job("course_cleanup_service", "purge"))
+
+    def _job(self, service: str, method: str) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        async def handle(payload: Dict[str, Any]) -> Any:
+            return await getattr(getattr(self, service), method)(payload)
+        return handle
+
+    @cached_property
+    def es_client(self) -> AsyncElasticsearch:
+        return ESClient.shared_client()
+
+    @cached_property
+    def note_service(self) -> NoteService:
+        return NoteService(self.es_client)
+
+    @cached_property
+    def folder_service(self) -> FolderService:
+        return FolderService(self.es_client)
+
+    @cached_property
+    def page_service(self) -> PageService:
+        return PageService(self.es_client)
+
+    @cached_property
+    def search_service(self) -> SearchService:
+        return SearchService(self.es_client)
+
+    @cached_property
+    def pdf_extractor(self) -> "PdfExtractor":
+        from pdf_extractor import PdfExtractor
+        return PdfExtractor()
+
+    @cached_property
+    def thumbnail_service(self) -> "ThumbnailService":
+        from thumbnails import ThumbnailService
+        return ThumbnailService(self.pdf_extractor)
+
+    @cached_property
+    def slide_ingest_service(self) -> "SlideIngestService":
+        from slide_ingest import SlideIngestService
+        return SlideIngestService(self.pdf_extractor, self.page_service, self.thumbnail_service, self.es_client,
+                                  self.ingest_queue)
+
+    @cached_property
+    def course_cleanup_service(self) -> "CourseCleanupService":
+        from course_cleanup import CourseCleanupService
+        return CourseCleanupService(self.course_service, self.thumbnail_service, self.es_client, self.ingest_queue)
+
+    async def start(self) -> None:
+        check_worker_backends()
+        try:
+            await MongoClient.bootstrap()
+        except Exception as e:
+            # Only the course routes need Mongo; keep serving slides and notes
+            logger.warning("MongoDB bootstrap failed (%s); course routes will error until it is reachable", e)
+        await self.ingest_queue.start()
+
+    async def stop(self) -> None:
+        if "note_service" in self.__dict__:
+            await self.note_service.autosave.flush_all()
+        await self.ingest_queue.stop()
+        await get_cache().close()
+        # Never started a worker pool if nothing was ingested
+        if "pdf_extractor" in self.__dict__:
+            self.pdf_extractor.shutdown()
+        await ESClient.close()
+        await MongoClient.close()
+
+
+async def get_course_service(request: Request) -> CourseService:
+    return request.app.state.services.course_service
+
+
+async def get_note_service(request: Request) -> NoteService:
+    return request.app.state.services.note_service
+
+
+async def get_folder_service(request: Request) -> FolderService:
+    return request.app.state.services.folder_service
+
+
+async def get_page_service(request: Request) -> PageService:
+    return request.app.state.services.page_service
+
+
+async def get_search_service(request: Request) -> SearchService:
+    return request.app.state.services.search_service
+
+
+async def get_ingest_queue(request: Request) -> IngestQueue:
+    return request.app.state.services.ingest_queue
+
+
+async def get_thumbnail_service(request: Request) -> "ThumbnailService":
+    return request.app.state.services.thumbnail_service
+
+
+async def get_es_client(request: Request) -> AsyncElasticsearch:
+    """The client the worker's services share"""
+    return request.app.state.services.es_client
@@ -0,0 +1,26 @@
+from elasticsearch import Elasticsearch
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+client = Elasticsearch(
+    str(os.getenv('ELASTICSEARCH_URL')),
+    api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
+)
+
+notes_index = "notes-index"
+
+# Note listings tie-break their sort on note_id; add it to notes created before it existed
+client.indices.put_mapping(index=notes_index, body={"properties": {"note_id": {"type": "keyword"}}})
+
+backfill = {
+    "query": { "bool": { "must_not": { "exists": { "field": "note_id" } } } },
+    "script": {
+        "source": "ctx._source.note_id = ctx._id",
+        "lang": "painless"
+    }
+}
+
+response = client.update_by_query(index=notes_index, body=backfill, conflicts="proceed", slices="auto")
+print(response)
@@ -0,0 +1,36 @@
+from elasticsearch import Elasticsearch
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+client = Elasticsearch(
+    str(os.getenv('ELASTICSEARCH_URL')),
+    api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
+)
+
+index_name = "lecture-slides-index"
+
+# Fill in the listing fields for slides uploaded before they existed
+backfill = {
+    "query": {
+        "bool": {
+            "should": [
+                { "bool": { "must_not": { "exists": { "field": "slide_id" } } } },
+                { "bool": { "must_not": { "exists": { "field": "text_snippet" } } } }
+            ]
+        }
+    },
+    "script": {
+        "source": """
+            ctx._source.slide_id = ctx._id;
+            String text = ctx._source.text_content == null ? '' : ctx._source.text_content;
+            ctx._source.text_snippet = text.substring(0, (int) Math.min(params.snippet_length, text.length()));
+        """,
+        "lang": "painless",
+        "params": { "snippet_length": 500 }
+    }
+}
+
+response = client.update_by_query(index=index_name, body=backfill, conflicts="proceed", slices="auto")
+print(response)
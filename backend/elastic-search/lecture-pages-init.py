@@ -0,0 +1,21 @@
+from elasticsearch import Elasticsearch
+from dotenv import load_dotenv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from index_management import PAGES_ALIAS, ensure_index
+
+load_dotenv()
+
+client = Elasticsearch(
+    str(os.getenv('ELASTICSEARCH_URL')),
+    api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
+)
+
+def init_pages_index():
+    index = ensure_index(client, PAGES_ALIAS)
+    print(f"{PAGES_ALIAS} -> {index}")
+
+if __name__ == "__main__":
+    init_pages_index()
@@ -1,6 +1,10 @@
 from elasticsearch import Elasticsearch
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from index_management import SLIDES_ALIAS, ensure_index
 
 load_dotenv()
 
@@ -10,25 +14,6 @@ client = Elasticsearch(
     api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
 )
 
-index_name = "lecture-slides-index"
-
-mappings = {
-    "properties": {
-        "course_id": { "type": "keyword" },
-        "course_name": { "type": "text" },
-        "filename": { "type": "keyword" },
-        "title": { "type": "text" },
-        "text_content": { "type": "text" },
-        "text_embedding": { "type": "sparse_vector" },
-        "pdf_binary": { 
-            "type": "binary", 
-            "store": True,
-            "doc_values": False 
-        },
-        "pdf_size": { "type": "long" },
-        "has_binary": { "type": "boolean" }
-    }
-}
-
-mapping_response = client.indices.put_mapping(index=index_name, body=mappings)
-print(mapping_response)
+# Mappings and settings live in index_management.INDEX_DEFINITIONS
+index = ensure_index(client, SLIDES_ALIAS)
+print(f"{SLIDES_ALIAS} -> {index}")
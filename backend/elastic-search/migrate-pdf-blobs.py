@@ -0,0 +1,71 @@
+from elasticsearch import Elasticsearch, helpers
+from dotenv import load_dotenv
+import argparse
+import base64
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from blob_store import get_blob_store
+
+load_dotenv()
+
+client = Elasticsearch(
+    str(os.getenv('ELASTICSEARCH_URL')),
+    api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
+)
+
+index_name = "lecture-slides-index"
+
+# Move the blob key in and drop the base64 payload in a single update
+move_script = {
+    "source": """
+        ctx._source.blob_key = params.blob_key;
+        ctx._source.pdf_sha256 = params.blob_key;
+        ctx._source.pdf_size = params.pdf_size;
+        ctx._source.remove('pdf_binary');
+    """,
+    "lang": "painless"
+}
+
+
+def migrate(dry_run: bool = False, batch_size: int = 20):
+    """Move `pdf_binary` payloads out of the index into the blob store"""
+    store = get_blob_store()
+    query = {
+        "query": {
+            "bool": {
+                "must": [{ "exists": { "field": "pdf_binary" } }],
+                "must_not": [{ "exists": { "field": "blob_key" } }]
+            }
+        },
+        # Versioned indices keep it out of _source, as a stored field only
+        "_source": ["pdf_binary"],
+        "stored_fields": ["pdf_binary"]
+    }
+
+    migrated = 0
+    for hit in helpers.scan(client, index=index_name, query=query, size=batch_size):
+        payload = hit.get('fields', {}).get('pdf_binary', [None])[0] or hit['_source']['pdf_binary']
+        data = base64.b64decode(payload)
+        if dry_run:
+            print(f"Would migrate {hit['_id']} ({len(data)} bytes)")
+        else:
+            blob_key = store.put_bytes(data)
+            client.update(
+                index=index_name,
+                id=hit['_id'],
+                body={ "script": { **move_script, "params": { "blob_key": blob_key, "pdf_size": len(data) } } }
+            )
+            print(f"Migrated {hit['_id']} -> {blob_key}")
+        migrated += 1
+
+    print(f"{'Found' if dry_run else 'Migrated'} {migrated} documents")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move PDF payloads from Elasticsearch into the blob store")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run, batch_size=args.batch_size)
@@ -0,0 +1,34 @@
+from elasticsearch import Elasticsearch
+from dotenv import load_dotenv
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from index_management import INDEX_DEFINITIONS, reindex
+
+load_dotenv()
+
+client = Elasticsearch(
+    str(os.getenv('ELASTICSEARCH_URL')),
+    api_key=str(os.getenv('ELASTICSEARCH_API_KEY')),
+    request_timeout=120
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rebuild an index at its current INDEX_DEFINITIONS version and swap the alias to it")
+    parser.add_argument("alias", choices=sorted(INDEX_DEFINITIONS))
+    parser.add_argument("--slices", default="auto", help="parallel _reindex slices (default: auto)")
+    parser.add_argument("--requests-per-second", type=float, default=-1,
+                        help="throttle, in documents per second (default: unthrottled)")
+    parser.add_argument("--delete-old", action="store_true", help="delete the previous version after the swap")
+    parser.add_argument("--force", action="store_true", help="rebuild the target version if it already exists")
+    args = parser.parse_args()
+    slices = int(args.slices) if args.slices.isdigit() else args.slices
+    try:
+        reindex(client, args.alias, slices=slices, requests_per_second=args.requests_per_second,
+                delete_old=args.delete_old, force=args.force)
+    except ValueError as e:
+        sys.exit(str(e))
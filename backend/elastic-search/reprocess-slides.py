@@ -0,0 +1,330 @@
+from dotenv import load_dotenv
+from elasticsearch import ApiError
+from elasticsearch.helpers import async_bulk
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from blob_store import get_blob_store
+from es_client import ESClient
+from index_management import relaxed_refresh
+from page_service import PageService, pages_index
+from pdf_extractor import PdfExtractor, join_pages
+from slide_ingest import TEXT_SNIPPET_LENGTH, slides_index
+
+load_dotenv()
+
+# embed:   send the stored text back through elser-pipeline (slides and pages)
+# extract: re-extract text from the PDF blob, then embed it like an upload
+MODES = ("embed", "extract")
+
+SLIDE_SOURCE_EXCLUDES = ["text_embedding", "pdf_binary"]
+
+
+class RateLimiter:
+    """Paces documents across all slices.
+
+    Halves its rate when ES rejects work and climbs back by a tenth of the
+    configured rate after each clean write (AIMD), so the run settles just
+    below what the cluster absorbs next to live traffic.
+    """
+
+    def __init__(self, per_second: float, min_per_second: float = 1.0):
+        self.max_per_second = per_second
+        self.per_second = per_second
+        self.min_per_second = min_per_second
+        self.next_at = 0.0
+
+    async def acquire(self) -> None:
+        if self.per_second <= 0:
+            return
+        now = time.monotonic()
+        self.next_at = max(self.next_at, now)
+        wait = self.next_at - now
+        self.next_at += 1 / self.per_second
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def slow_down(self) -> None:
+        if self.per_second > 0:
+            self.per_second = max(self.min_per_second, self.per_second / 2)
+
+    def speed_up(self) -> None:
+        if self.per_second > 0:
+            self.per_second = min(self.max_per_second, self.per_second + self.max_per_second / 10)
+
+
+class Reprocessor:
+    """Walks the slides index with sliced point-in-time searches and rewrites every slide.
+
+    Rewritten slides are stamped with `reprocess_run`, so a resumed run
+    (same run id, from the checkpoint file) simply skips them, however the
+    new point in time happens to slice the index.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.page_service = PageService()
+        self.pdf_extractor = PdfExtractor()
+        self.limiter = RateLimiter(args.docs_per_second)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=args.workers * 2)
+        self.client = None
+        self.stats = {"scanned": 0, "slides": 0, "pages": 0, "deleted_pages": 0, "bulk_requests": 0,
+                      "rejections": 0, "conflicts": 0, "failed": 0}
+        self.errors = []
+        self.run_id = uuid.uuid4().hex
+        self.elapsed_before = 0.0
+        self.started = time.monotonic()
+        if args.resume:
+            with open(args.checkpoint) as f:
+                checkpoint = json.load(f)
+            if checkpoint["mode"] != args.mode:
+                sys.exit(f"Checkpoint is for --mode {checkpoint['mode']}")
+            self.run_id = checkpoint["run_id"]
+            self.stats.update(checkpoint["stats"])
+            self.elapsed_before = checkpoint["elapsed_s"]
+
+    def record_error(self, doc_id, error) -> None:
+        if len(self.errors) < 100:
+            self.errors.append({"id": doc_id, "error": str(error)})
+
+    def query(self) -> dict:
+        # Legacy slides without a blob only have their PDF as a stored field, which a rewrite would drop
+        query = {
+            "bool": {
+                "filter": [{"exists": {"field": "blob_key"}}],
+                "must_not": [{"term": {"reprocess_run": self.run_id}}]
+            }
+        }
+        if self.args.course:
+            query["bool"]["filter"].append({"terms": {"course_id": self.args.course}})
+        return query
+
+    def report(self) -> dict:
+        elapsed = self.elapsed_before + time.monotonic() - self.started
+        return {
+            "run_id": self.run_id,
+            "mode": self.args.mode,
+            "dry_run": self.args.dry_run,
+            "elapsed_s": round(elapsed, 1),
+            "docs_per_sec": round(self.stats["slides"] / elapsed, 2) if elapsed else 0.0,
+            "pages_per_sec": round(self.stats["pages"] / elapsed, 2) if elapsed else 0.0,
+            "rate_limit": self.limiter.per_second,
+            "stats": dict(self.stats),
+            "errors": self.errors[:20]
+        }
+
+    def save_checkpoint(self) -> None:
+        if self.args.dry_run:
+            return
+        tmp = self.args.checkpoint + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({**self.report(), "elapsed_s": self.elapsed_before + time.monotonic() - self.started}, f)
+        os.replace(tmp, self.args.checkpoint)
+
+    async def scan_slice(self, pit_id: str, slice_id: int, slices: int) -> None:
+        search_after = None
+        while True:
+            body = {
+                "pit": {"id": pit_id, "keep_alive": "5m"},
+                "query": self.query(),
+                "sort": [{"_shard_doc": "asc"}],
+                "size": self.args.batch_size,
+                "seq_no_primary_term": True,
+                "_source": {"excludes": SLIDE_SOURCE_EXCLUDES}
+            }
+            if slices > 1:
+                body["slice"] = {"id": slice_id, "max": slices}
+            if search_after is not None:
+                body["search_after"] = search_after
+            response = await self.client.search(body=body)
+            hits = response["hits"]["hits"]
+            if not hits:
+                return
+            for hit in hits:
+                await self.limiter.acquire()
+                self.stats["scanned"] += 1
+                if not self.args.dry_run:
+                    await self.queue.put(hit)
+            search_after = hits[-1]["sort"]
+
+    async def existing_pages(self, parent_id: str, with_source: bool) -> list:
+        response = await self.client.search(
+            index=pages_index,
+            body={
+                "query": {"term": {"parent_id": parent_id}},
+                "size": 10000,
+                "_source": {"excludes": ["text_embedding"]} if with_source else False
+            }
+        )
+        return response["hits"]["hits"]
+
+    async def extract(self, blob_key: str) -> list:
+        async with get_blob_store().async_local_copy(blob_key) as pdf_path:
+            return await self.pdf_extractor.extract_pages(pdf_path)
+
+    async def slide_actions(self, hit: dict) -> list:
+        doc_id = hit["_id"]
+        source = {**hit["_source"], "reprocess_run": self.run_id}
+        # A slide changed since the point in time was opened comes back as a 409 and is left alone
+        slide = {"_index": slides_index, "_id": doc_id, "pipeline": "elser-pipeline", "_source": source,
+                 "if_seq_no": hit["_seq_no"], "if_primary_term": hit["_primary_term"]}
+
+        if self.args.mode == "embed":
+            pages = await self.existing_pages(doc_id, with_source=True)
+            return [slide] + [
+                {"_index": pages_index, "_id": page["_id"], "pipeline": "elser-pipeline", "_source": page["_source"]}
+                for page in pages
+            ]
+
+        pages = await self.extract(source["blob_key"])
+        text_content = join_pages(pages)
+        source.update(text_content=text_content, text_snippet=text_content[:TEXT_SNIPPET_LENGTH],
+                      page_count=len(pages))
+        page_actions = list(self.page_service.page_actions(doc_id, source["course_id"], source.get("title"), pages))
+        kept = {action["_id"] for action in page_actions}
+        # Pages that are now empty (or gone) would otherwise keep matching searches
+        stale = [{"_op_type": "delete", "_index": pages_index, "_id": page["_id"]}
+                 for page in await self.existing_pages(doc_id, with_source=False) if page["_id"] not in kept]
+        return [slide] + page_actions + stale
+
+    async def write(self, actions: list) -> None:
+        pending = {action["_id"]: action for action in actions}
+        for attempt in range(self.args.max_retries + 1):
+            retry = []
+            try:
+                self.stats["bulk_requests"] += 1
+                _, errors = await async_bulk(self.client, list(pending.values()), raise_on_error=False,
+                                             max_retries=0, chunk_size=len(pending), refresh=False)
+            except ApiError as e:
+                if e.meta.status != 429:
+                    raise
+                errors = [{"index": {"_id": doc_id, "status": 429}} for doc_id in pending]
+
+            failed = {}
+            for error in errors:
+                op, info = next(iter(error.items()))
+                if info.get("status") == 429:
+                    retry.append(info["_id"])
+                elif op == "delete" and info.get("status") == 404:
+                    continue
+                else:
+                    failed[info["_id"]] = info
+            for doc_id, info in failed.items():
+                if info.get("status") == 409:
+                    self.stats["conflicts"] += 1
+                else:
+                    self.stats["failed"] += 1
+                    self.record_error(doc_id, info.get("error"))
+
+            done = [action for doc_id, action in pending.items() if doc_id not in failed and doc_id not in retry]
+            self.stats["slides"] += sum(1 for action in done if action["_index"] == slides_index)
+            self.stats["pages"] += sum(1 for action in done
+                                       if action["_index"] == pages_index and action.get("_op_type") != "delete")
+            self.stats["deleted_pages"] += sum(1 for action in done if action.get("_op_type") == "delete")
+            if not retry:
+                if attempt == 0:
+                    self.limiter.speed_up()
+                return
+            # Back off and ease the rate so live traffic keeps its share of the write pool
+            self.stats["rejections"] += len(retry)
+            self.limiter.slow_down()
+            pending = {doc_id: pending[doc_id] for doc_id in retry}
+            await asyncio.sleep(min(60, 2 ** attempt))
+
+        self.stats["failed"] += len(pending)
+        for doc_id in pending:
+            self.record_error(doc_id, "rejected (429) after retries")
+
+    async def worker(self) -> None:
+        buffer = []
+        slides_buffered = 0
+        while True:
+            hit = await self.queue.get()
+            if hit is not None:
+                try:
+                    buffer.extend(await self.slide_actions(hit))
+                    slides_buffered += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    self.record_error(hit["_id"], e)
+            if buffer and (hit is None or slides_buffered >= self.args.chunk_size):
+                try:
+                    await self.write(buffer)
+                except Exception as e:
+                    # Keep draining the queue so the scanners never block on a dead worker
+                    self.stats["failed"] += slides_buffered
+                    self.record_error(None, e)
+                buffer, slides_buffered = [], 0
+            self.queue.task_done()
+            if hit is None:
+                return
+
+    async def progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.args.report_interval)
+            self.save_checkpoint()
+            report = self.report()
+            print(f"{report['stats']['scanned']} scanned, {report['stats']['slides']} slides, "
+                  f"{report['docs_per_sec']} docs/s, {report['stats']['rejections']} rejections, "
+                  f"{report['stats']['failed']} failed", file=sys.stderr)
+
+    async def run(self) -> dict:
+        self.client = await ESClient.get_client()
+        pit_id = (await self.client.open_point_in_time(index=slides_index, keep_alive="5m"))["id"]
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.args.workers)]
+        progress = asyncio.create_task(self.progress())
+        try:
+            async with relaxed_refresh(self.client, [slides_index, pages_index],
+                                       enabled=self.args.relax_refresh and not self.args.dry_run):
+                await asyncio.gather(*(self.scan_slice(pit_id, i, self.args.slices)
+                                       for i in range(self.args.slices)))
+                for _ in workers:
+                    await self.queue.put(None)
+                await asyncio.gather(*workers)
+        finally:
+            progress.cancel()
+            for worker in workers:
+                worker.cancel()
+            await self.client.close_point_in_time(id=pit_id)
+            self.save_checkpoint()
+            self.pdf_extractor.shutdown()
+            await ESClient.close()
+        return self.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-embed or re-extract every slide (and its pages) in lecture-slides-index")
+    parser.add_argument("--mode", choices=MODES, default="embed")
+    parser.add_argument("--course", action="append", help="only this course_id (repeatable)")
+    parser.add_argument("--slices", type=int, default=4, help="parallel point-in-time slices")
+    parser.add_argument("--workers", type=int, default=4, help="slides processed concurrently")
+    parser.add_argument("--batch-size", type=int, default=100, help="hits per search page")
+    parser.add_argument("--chunk-size", type=int, default=20, help="slides per _bulk request")
+    parser.add_argument("--docs-per-second", type=float, default=10,
+                        help="slides per second across all slices (0 = unlimited)")
+    parser.add_argument("--max-retries", type=int, default=5, help="retries for 429-rejected items")
+    parser.add_argument("--relax-refresh", action="store_true",
+                        help="slow index refresh for the run (see INGEST_BULK_REFRESH_INTERVAL)")
+    parser.add_argument("--checkpoint", default="reprocess-checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="continue the run recorded in --checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be reprocessed")
+    parser.add_argument("--report-interval", type=float, default=10, help="seconds between progress lines")
+    parser.add_argument("--report", help="also write the final report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(Reprocessor(args).run())
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
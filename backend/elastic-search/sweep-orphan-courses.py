@@ -0,0 +1,47 @@
+from dotenv import load_dotenv
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from course_cleanup import CourseCleanupService
+from course_service import CourseService
+from es_client import ESClient
+from mongo_client import MongoClient
+from pdf_extractor import PdfExtractor
+from thumbnails import ThumbnailService
+
+load_dotenv()
+
+
+async def sweep(dry_run: bool = False, course_ids=None):
+    """Purge slides, pages and blobs of courses that no longer exist in MongoDB"""
+    cleanup = CourseCleanupService(CourseService(), ThumbnailService(PdfExtractor()))
+    try:
+        orphans = await cleanup.orphaned_courses()
+        if course_ids:
+            orphans = {course_id: count for course_id, count in orphans.items() if course_id in course_ids}
+
+        for course_id, count in sorted(orphans.items()):
+            if dry_run:
+                print(f"Would purge {course_id} ({count} documents)")
+                continue
+            result = await cleanup.purge({"course_id": course_id})
+            print(f"Purged {course_id}: {result.get('slides_deleted', 0)} slides, "
+                  f"{result.get('pages_deleted', 0)} pages, {result.get('blobs_deleted', 0)} blobs")
+
+        print(f"{'Found' if dry_run else 'Purged'} {len(orphans)} orphaned courses")
+    finally:
+        await ESClient.close()
+        await MongoClient.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Remove Elasticsearch documents and blobs of courses missing from MongoDB")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--course", action="append", dest="course_ids",
+                        help="only sweep this course_id (repeatable)")
+    args = parser.parse_args()
+    asyncio.run(sweep(dry_run=args.dry_run, course_ids=args.course_ids))
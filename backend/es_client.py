@@ -0,0 +1,50 @@
+from elasticsearch import AsyncElasticsearch
+from dotenv import load_dotenv
+from metrics import span
+import os
+from typing import Any, Optional
+
+load_dotenv()
+
+
+class TimedAsyncElasticsearch(AsyncElasticsearch):
+    """Every API call (helpers and namespaced APIs included) goes through perform_request"""
+
+    async def perform_request(self, method: str, path: str, *, endpoint_id: Optional[str] = None,
+                              **kwargs: Any):
+        with span("elasticsearch", endpoint_id or method):
+            return await super().perform_request(method, path, endpoint_id=endpoint_id, **kwargs)
+
+
+class ESClient:
+    _instance: Optional['ESClient'] = None
+    _client: Optional[AsyncElasticsearch] = None
+    
+    def __new__(cls) -> 'ESClient':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    @classmethod
+    def shared_client(cls) -> AsyncElasticsearch:
+        """The shared async Elasticsearch client (one connection pool per worker); connects lazily"""
+        if cls._client is None:
+            cls._client = TimedAsyncElasticsearch(
+                str(os.getenv('ELASTICSEARCH_URL')),
+                api_key=str(os.getenv('ELASTICSEARCH_API_KEY')),
+                connections_per_node=int(os.getenv('ELASTICSEARCH_MAX_CONNECTIONS', '25')),
+                request_timeout=float(os.getenv('ELASTICSEARCH_REQUEST_TIMEOUT', '30')),
+            )
+        return cls._client
+
+    @classmethod
+    async def get_client(cls) -> AsyncElasticsearch:
+        """Get the shared async Elasticsearch client (one connection pool per worker)"""
+        return cls.shared_client()
+    
+    @classmethod
+    async def close(cls) -> None:
+        """Close the shared client and release its pooled connections"""
+        if cls._client is not None:
+            await cls._client.close()
+            cls._client = None
@@ -1,18 +1,20 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
-from elasticsearch import Elasticsearch
-from dotenv import load_dotenv
-import os
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from es_client import ESClient
+from cache import get_cache
+from note_service import notes_index
 from datetime import datetime
 
-load_dotenv()
+folders_index = "folders-index"
 
-client = Elasticsearch(
-    str(os.getenv('ELASTICSEARCH_URL')),
-    api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
-)
+FOLDERS_CACHE_PREFIX = "folders:"
 
-folders_index = "folders-index"
+# Folders are few; list them all in one page instead of the default 10 hits
+FOLDER_LIST_LIMIT = 1000
+
+# Passes over a folder's notes before giving up on ones edited concurrently
+FOLDER_DELETE_ATTEMPTS = 3
 
 
 class FolderCreate(BaseModel):
@@ -27,16 +29,24 @@ class FolderResponse(BaseModel):
     id: str
     folder_name: str
     created_at: Optional[str] = None
+    note_count: int = 0
+    last_note_updated_at: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
 class FolderService:
-    def __init__(self):
-        pass
+    def __init__(self, client: Optional[AsyncElasticsearch] = None):
+        self.client = client
+
+    async def _get_client(self):
+        # Injected by the ServiceContainer; scripts that build a service on its own get the shared one
+        if self.client is None:
+            self.client = await ESClient.get_client()
+        return self.client
 
-    def create_folder(self, folder: FolderCreate) -> FolderResponse:
+    async def create_folder(self, folder: FolderCreate) -> FolderResponse:
         try:
             now = datetime.utcnow().isoformat()
             doc = {
@@ -45,54 +55,161 @@ class FolderService:
                 "updated_at": now
             }
 
-            response = client.index(index=folders_index, body=doc)
+            client = await self._get_client()
+            # wait_for so a listing reloaded right after invalidation includes it
+            response = await client.index(index=folders_index, body=doc, refresh="wait_for")
+            await get_cache().delete_prefix(FOLDERS_CACHE_PREFIX)
             doc["id"] = response["_id"]
             return FolderResponse(**doc)
         except Exception as e:
             raise Exception(f"Error creating folder: {str(e)}")
 
-    def get_all_folders(self) -> List[FolderResponse]:
+    async def get_all_folders(self) -> List[FolderResponse]:
+        """Folders with note counts; folder docs are cached, counts are always live"""
         try:
-            response = client.search(index=folders_index, body={"query": {"match_all": {}}})
-            folders = []
-            for hit in response["hits"]["hits"]:
-                folder_data = hit["_source"]
-                folder_data["id"] = hit["_id"]
-                folders.append(FolderResponse(**folder_data))
-            return folders
+            folders = await get_cache().get_or_load("folders:all", self._load_all_folders)
+            stats = await self._note_stats()
+            return [FolderResponse(**folder, **stats.get(folder["id"], {})) for folder in folders]
         except Exception as e:
             raise Exception(f"Error fetching folders: {str(e)}")
 
-    def get_folder_by_id(self, folder_id: str) -> Optional[FolderResponse]:
+    async def _note_stats(self, folder_id: Optional[str] = None) -> Dict[str, dict]:
+        """note_count and last_note_updated_at for every folder (or just `folder_id`), from one terms aggregation"""
+        client = await self._get_client()
+        response = await client.search(
+            index=notes_index,
+            body={
+                "size": 0,
+                "query": {"term": {"folder_id": folder_id}} if folder_id else {"match_all": {}},
+                "aggs": {
+                    "folders": {
+                        "terms": {"field": "folder_id", "size": FOLDER_LIST_LIMIT},
+                        "aggs": {"last_updated": {"max": {"field": "updated_at"}}}
+                    }
+                }
+            }
+        )
+        return {
+            bucket["key"]: {
+                "note_count": bucket["doc_count"],
+                "last_note_updated_at": bucket["last_updated"].get("value_as_string")
+            }
+            for bucket in response["aggregations"]["folders"]["buckets"]
+        }
+
+    async def _load_all_folders(self) -> List[dict]:
+        client = await self._get_client()
+        response = await client.search(
+            index=folders_index,
+            body={
+                "query": {"match_all": {}},
+                "size": FOLDER_LIST_LIMIT,
+                "sort": [{"folder_name.keyword": {"order": "asc"}}]
+            }
+        )
+        folders = []
+        for hit in response["hits"]["hits"]:
+            folder_data = hit["_source"]
+            folder_data["id"] = hit["_id"]
+            folders.append(folder_data)
+        return folders
+
+    async def get_folder_by_id(self, folder_id: str, with_stats: bool = False) -> Optional[FolderResponse]:
+        """`with_stats` fills in note_count and last_note_updated_at, as the folder list does"""
         try:
-            response = client.get(index=folders_index, id=folder_id)
+            client = await self._get_client()
+            response = await client.get(index=folders_index, id=folder_id)
             if response["found"]:
                 folder_data = response["_source"]
                 folder_data["id"] = response["_id"]
-                return FolderResponse(**folder_data)
+                stats = (await self._note_stats(folder_id)).get(folder_id, {}) if with_stats else {}
+                return FolderResponse(**folder_data, **stats)
             return None
         except Exception as e:
             return None
 
-    def update_folder(self, folder_id: str, folder_update: FolderUpdate) -> Optional[FolderResponse]:
+    async def update_folder(self, folder_id: str, folder_update: FolderUpdate) -> Optional[FolderResponse]:
         try:
-            existing = self.get_folder_by_id(folder_id)
-            if not existing:
-                return None
-
             update_data = {"updated_at": datetime.utcnow().isoformat()}
 
             if folder_update.folder_name:
                 update_data["folder_name"] = folder_update.folder_name
 
-            client.update(index=folders_index, id=folder_id, body={"doc": update_data})
-            return self.get_folder_by_id(folder_id)
+            client = await self._get_client()
+            # "_source": True returns the updated document, saving a follow-up get
+            try:
+                response = await client.update(index=folders_index, id=folder_id, body={"doc": update_data, "_source": True},
+                                               refresh="wait_for")
+            except NotFoundError:
+                return None
+            await get_cache().delete_prefix(FOLDERS_CACHE_PREFIX)
+            folder_data = response["get"]["_source"]
+            folder_data["id"] = response["_id"]
+            return FolderResponse(**folder_data)
         except Exception as e:
             raise Exception(f"Error updating folder: {str(e)}")
 
-    def delete_folder(self, folder_id: str) -> bool:
+    async def delete_folder(self, folder_id: str, delete_notes: bool = False,
+                            move_to: Optional[str] = None) -> Optional[Dict[str, int]]:
+        """Delete a folder and deal with its notes in one server-side batch.
+
+        Notes are deleted (`delete_notes`), moved to `move_to`, or by default
+        left unassigned. Returns the number of notes affected, or None if the
+        folder doesn't exist.
+        """
         try:
-            response = client.delete(index=folders_index, id=folder_id)
-            return response.get("result") in ["deleted", "not_found"]
+            client = await self._get_client()
+            if move_to is not None:
+                if move_to == folder_id:
+                    raise ValueError("Cannot move notes into the folder being deleted")
+                if not await client.exists(index=folders_index, id=move_to):
+                    raise ValueError(f"Target folder {move_to} not found")
+            if not await client.exists(index=folders_index, id=folder_id):
+                return None
+
+            # Notes first: if this fails the folder still exists and the delete can be retried.
+            # A note saved while a pass runs is a version conflict the pass skips; it
+            # still matches the query, so the next pass picks it up
+            query = {"term": {"folder_id": folder_id}}
+            affected = 0
+            for attempt in range(FOLDER_DELETE_ATTEMPTS):
+                if delete_notes:
+                    response = await client.delete_by_query(index=notes_index, body={"query": query},
+                                                            conflicts="proceed", refresh=True)
+                    affected += response["deleted"]
+                else:
+                    response = await client.update_by_query(
+                        index=notes_index,
+                        body={
+                            "query": query,
+                            "script": {
+                                "source": """
+                                    if (params.folder_id == null) { ctx._source.remove('folder_id') }
+                                    else { ctx._source.folder_id = params.folder_id }
+                                    ctx._source.updated_at = params.now;
+                                """,
+                                "lang": "painless",
+                                "params": {"folder_id": move_to, "now": datetime.utcnow().isoformat()}
+                            }
+                        },
+                        conflicts="proceed",
+                        refresh=True
+                    )
+                    affected += response["updated"]
+                if response.get("failures"):
+                    raise Exception(f"{len(response['failures'])} notes failed: {response['failures'][0]}")
+                if not response.get("version_conflicts"):
+                    break
+            else:
+                raise Exception(f"{response['version_conflicts']} notes kept changing; the folder was kept")
+            result = {"notes_deleted" if delete_notes else "notes_moved": affected}
+
+            await client.delete(index=folders_index, id=folder_id, refresh="wait_for")
+            await get_cache().delete_prefix(FOLDERS_CACHE_PREFIX)
+            return result
+        except NotFoundError:
+            return None
+        except ValueError:
+            raise
         except Exception as e:
-            return False
+            raise Exception(f"Error deleting folder: {str(e)}")
@@ -0,0 +1,387 @@
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from elasticsearch import helpers
+from elasticsearch.exceptions import GeneralAvailabilityWarning
+import logging
+import os
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# The tasks API is flagged "technical preview" but has been stable for years
+warnings.filterwarnings("ignore", category=GeneralAvailabilityWarning, module=__name__)
+
+# The app always reads and writes these names; each is an alias over
+# `<alias>-v<version>`, so a mapping or settings change is a reindex into a
+# new version plus an atomic alias swap rather than downtime.
+SLIDES_ALIAS = "lecture-slides-index"
+PAGES_ALIAS = "lecture-pages"
+NOTES_ALIAS = "notes-index"
+FOLDERS_ALIAS = "folders-index"
+
+NUMBER_OF_SHARDS = int(os.getenv('ES_NUMBER_OF_SHARDS', '1'))
+NUMBER_OF_REPLICAS = int(os.getenv('ES_NUMBER_OF_REPLICAS', '1'))
+BULK_REFRESH_INTERVAL = os.getenv('INGEST_BULK_REFRESH_INTERVAL', '30s')
+
+
+def _settings(refresh_interval: str, codec: Optional[str] = None) -> Dict[str, Any]:
+    index = {
+        "number_of_shards": NUMBER_OF_SHARDS,
+        "number_of_replicas": NUMBER_OF_REPLICAS,
+        "refresh_interval": refresh_interval
+    }
+    if codec:
+        index["codec"] = codec
+    return {"index": index}
+
+
+# Bump `version` whenever settings or mappings change, then run
+# elastic-search/reindex.py for that alias
+INDEX_DEFINITIONS: Dict[str, Dict[str, Any]] = {
+    SLIDES_ALIAS: {
+        "version": 2,
+        # Full text and embeddings compress well; ingestion waits for refresh anyway
+        "settings": _settings("5s", "best_compression"),
+        "mappings": {
+            # Legacy base64 payloads stay retrievable as a stored field
+            # without being copied into every _source read
+            "_source": {"excludes": ["pdf_binary"]},
+            "properties": {
+                "slide_id": {"type": "keyword"},
+                "course_id": {"type": "keyword"},
+                "course_name": {"type": "text"},
+                "filename": {"type": "keyword"},
+                "title": {"type": "text"},
+                "text_content": {"type": "text"},
+                "text_snippet": {"type": "text", "index": False},
+                "text_embedding": {"type": "sparse_vector"},
+                "pdf_binary": {"type": "binary", "store": True, "doc_values": False},
+                "blob_key": {"type": "keyword"},
+                "pdf_sha256": {"type": "keyword"},
+                "deduplicated_from": {"type": "keyword"},
+                "pdf_size": {"type": "long"},
+                "page_count": {"type": "integer"},
+                "has_binary": {"type": "boolean"},
+                "uploaded_at": {"type": "date"},
+                # Set by elastic-search/reprocess-slides.py so a resumed run skips finished slides
+                "reprocess_run": {"type": "keyword"}
+            }
+        }
+    },
+    PAGES_ALIAS: {
+        "version": 2,
+        "settings": _settings("5s", "best_compression"),
+        "mappings": {
+            "properties": {
+                "parent_id": {"type": "keyword"},
+                "course_id": {"type": "keyword"},
+                "title": {"type": "text"},
+                "page_number": {"type": "integer"},
+                "text_content": {"type": "text"},
+                "text_embedding": {"type": "sparse_vector"}
+            }
+        }
+    },
+    NOTES_ALIAS: {
+        "version": 2,
+        # Notes are read back right after autosave
+        "settings": _settings("1s"),
+        "mappings": {
+            "properties": {
+                "note_id": {"type": "keyword"},
+                "title": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+                "notes": {"type": "text"},
+                "folder_id": {"type": "keyword"},
+                "created_at": {"type": "date"},
+                "updated_at": {"type": "date"},
+                "version": {"type": "integer"}
+            }
+        }
+    },
+    FOLDERS_ALIAS: {
+        "version": 2,
+        "settings": _settings("1s"),
+        "mappings": {
+            "properties": {
+                "folder_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+                "created_at": {"type": "date"},
+                "updated_at": {"type": "date"}
+            }
+        }
+    }
+}
+
+
+def versioned_name(alias: str, version: Optional[int] = None) -> str:
+    return f"{alias}-v{version if version is not None else INDEX_DEFINITIONS[alias]['version']}"
+
+
+def refresh_interval(alias: str) -> Optional[str]:
+    """The alias's configured refresh_interval (None resets to the cluster default)"""
+    return INDEX_DEFINITIONS.get(alias, {}).get("settings", {}).get("index", {}).get("refresh_interval")
+
+
+def put_template(client, alias: str) -> None:
+    """Index template applied to every `<alias>-v*` index"""
+    definition = INDEX_DEFINITIONS[alias]
+    client.indices.put_index_template(
+        name=alias,
+        index_patterns=[f"{alias}-v*"],
+        template={"settings": definition["settings"], "mappings": definition["mappings"]},
+        priority=100,
+        meta={"version": definition["version"]}
+    )
+
+
+def current_index(client, alias: str) -> Optional[str]:
+    """Concrete index behind `alias`; the alias itself for a pre-alias (bare) index"""
+    if client.indices.exists_alias(name=alias):
+        indices = client.indices.get_alias(name=alias)
+        for name, info in indices.items():
+            if info["aliases"][alias].get("is_write_index"):
+                return name
+        return next(iter(indices))
+    if client.indices.exists(index=alias):
+        return alias
+    return None
+
+
+def ensure_index(client, alias: str) -> str:
+    """Create the current version behind `alias` if nothing answers to it yet.
+
+    An existing index (aliased or bare) only gets new fields added, since
+    settings like the codec and `_source` excludes need a reindex.
+    """
+    put_template(client, alias)
+    existing = current_index(client, alias)
+    if existing is not None:
+        client.indices.put_mapping(index=alias, properties=INDEX_DEFINITIONS[alias]["mappings"]["properties"])
+        return existing
+    name = versioned_name(alias)
+    client.indices.create(index=name, aliases={alias: {"is_write_index": True}})
+    return name
+
+
+def _legacy_binaries(client, index: str) -> int:
+    # Excluded from _source on new versions, so reindexing would drop them
+    return client.count(index=index, query={
+        "bool": {
+            "must": [{"exists": {"field": "pdf_binary"}}],
+            "must_not": [{"exists": {"field": "blob_key"}}]
+        }
+    })["count"]
+
+
+def _run_reindex(client, source: str, dest: str, slices: Union[int, str], requests_per_second: float,
+                 label: str, log: Callable[[str], None], poll_interval: float) -> Dict[str, Any]:
+    task_id = client.reindex(
+        source={"index": source, "size": 1000},
+        # External versioning carries each document's _version over, so a
+        # second pass only rewrites what changed since the first
+        dest={"index": dest, "version_type": "external"},
+        conflicts="proceed",
+        slices=slices,
+        requests_per_second=requests_per_second,
+        wait_for_completion=False
+    )["task"]
+    while True:
+        task = client.tasks.get(task_id=task_id)
+        status = task["task"]["status"]
+        log(f"  {label}: {status.get('created', 0) + status.get('updated', 0) + status.get('version_conflicts', 0)}"
+            f"/{status.get('total', 0)} documents")
+        if task.get("completed"):
+            break
+        time.sleep(poll_interval)
+    if task.get("error"):
+        raise Exception(f"Reindex {source} -> {dest} failed: {task['error'].get('reason', task['error'])}")
+    response = task.get("response", {})
+    if response.get("failures"):
+        raise Exception(f"Reindex {source} -> {dest} failed: {response['failures'][0]}")
+    return response
+
+
+def _replay_deletes(client, source: str, dest: str, batch_size: int = 1000) -> int:
+    """Delete from `dest` the documents deleted from `source` since the copy.
+
+    Only safe while `source` is write-blocked. Every source document is in
+    `dest` by then, so equal counts mean there is nothing to do.
+    """
+    client.indices.refresh(index=f"{source},{dest}")
+    if client.count(index=dest)["count"] <= client.count(index=source)["count"]:
+        return 0
+    deleted = 0
+    batch: List[str] = []
+
+    def flush() -> int:
+        found = client.mget(index=source, ids=batch, source=False)["docs"]
+        gone = [doc["_id"] for doc in found if not doc.get("found")]
+        if gone:
+            helpers.bulk(client, ({"_op_type": "delete", "_index": dest, "_id": _id} for _id in gone),
+                         raise_on_error=False)
+        return len(gone)
+
+    for hit in helpers.scan(client, index=dest, query={"query": {"match_all": {}}, "_source": False},
+                            size=batch_size):
+        batch.append(hit["_id"])
+        if len(batch) == batch_size:
+            deleted += flush()
+            batch = []
+    if batch:
+        deleted += flush()
+    return deleted
+
+
+def _set_write_block(client, index: str, blocked: bool) -> None:
+    client.indices.put_settings(index=index, settings={"index": {"blocks.write": True if blocked else None}})
+
+
+def reindex(client, alias: str, slices: Union[int, str] = "auto", requests_per_second: float = -1,
+            delete_old: bool = False, force: bool = False, log: Callable[[str], None] = print,
+            poll_interval: float = 2.0) -> str:
+    """Build the current version of `alias` from whatever it points at now, then swap the alias.
+
+    The new index is built with refresh and replicas off by a sliced
+    `_reindex` task while the old one keeps serving. Writes to the old
+    version are then blocked for a final pass that copies documents
+    created or updated meanwhile and replays deletes, and the new version
+    takes over the alias in one atomic `update_aliases`. Writes fail with
+    a cluster block for the length of that final pass only.
+
+    A bare pre-alias index is deleted in the swap (its name becomes the
+    alias); otherwise the old version is kept, unblocked, unless
+    `delete_old` is set.
+    """
+    put_template(client, alias)
+    source = current_index(client, alias)
+    if source is None:
+        raise ValueError(f"Nothing to reindex: {alias} does not exist (run the init script)")
+    dest = versioned_name(alias)
+    if source == dest:
+        raise ValueError(f"{alias} already points at {dest}; bump its version in INDEX_DEFINITIONS first")
+    if alias == SLIDES_ALIAS and _legacy_binaries(client, source):
+        raise ValueError(f"{source} still has inline pdf_binary payloads; run elastic-search/migrate-pdf-blobs.py first")
+    if client.indices.exists(index=dest):
+        if not force:
+            raise ValueError(f"{dest} already exists (a previous run?); pass force to rebuild it")
+        client.indices.delete(index=dest)
+
+    # The template supplies mappings and the final settings; these only hold during the build
+    client.indices.create(index=dest, settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+    log(f"Reindexing {source} -> {dest}")
+    copied = _run_reindex(client, source, dest, slices, requests_per_second, "copy", log, poll_interval)
+
+    client.indices.put_settings(index=dest, settings={"index": {
+        "refresh_interval": refresh_interval(alias),
+        "number_of_replicas": NUMBER_OF_REPLICAS
+    }})
+    client.cluster.health(index=dest, wait_for_status="yellow", timeout="60s")
+
+    log(f"Blocking writes to {source} for the final pass")
+    _set_write_block(client, source, True)
+    swapped = False
+    try:
+        # Unthrottled: writes are failing until this finishes
+        caught_up = _run_reindex(client, source, dest, slices, -1, "catch-up", log, poll_interval)
+        deleted = _replay_deletes(client, source, dest)
+        client.indices.refresh(index=dest)
+
+        source_count = client.count(index=source)["count"]
+        dest_count = client.count(index=dest)["count"]
+        if dest_count != source_count:
+            raise Exception(f"{dest} has {dest_count} documents but {source} has {source_count}; alias not swapped")
+
+        actions: List[Dict[str, Any]] = [{"add": {"index": dest, "alias": alias, "is_write_index": True}}]
+        if source == alias:
+            actions.append({"remove_index": {"index": source}})
+        else:
+            actions.append({"remove": {"index": source, "alias": alias}})
+        client.indices.update_aliases(actions=actions)
+        swapped = True
+    finally:
+        if not (swapped and source == alias):
+            _set_write_block(client, source, False)
+    log(f"{alias} -> {dest} ({copied.get('created', 0)} copied, {caught_up.get('created', 0)} created, "
+        f"{caught_up.get('updated', 0)} updated and {deleted} deleted meanwhile)")
+
+    if delete_old and source != alias:
+        client.indices.delete(index=source)
+        log(f"Deleted {source}")
+    return dest
+
+
+# One document per bulk load running with refresh relaxed, shared by every
+# worker process, so the last load to finish anywhere restores the interval
+REFRESH_LEASES_INDEX = "ingest-refresh-leases"
+# A lease left behind by a crashed worker stops counting after this long
+REFRESH_LEASE_SECONDS = int(os.getenv('INGEST_RELAX_REFRESH_LEASE_SECONDS', '3600'))
+
+
+async def _set_refresh_interval(client, alias: str, value: Optional[str]) -> None:
+    try:
+        await client.indices.put_settings(index=alias, settings={"index": {"refresh_interval": value}})
+    except Exception as e:
+        # Only a throughput tweak; the explicit refresh afterwards keeps results visible
+        logger.warning("Could not set refresh_interval=%s on %s: %s", value, alias, e)
+
+
+async def _take_lease(client, aliases: List[str]) -> str:
+    await client.options(ignore_status=400).indices.create(
+        index=REFRESH_LEASES_INDEX,
+        settings={"index": {"number_of_shards": 1, "auto_expand_replicas": "0-1"}},
+        mappings={"properties": {"aliases": {"type": "keyword"}, "expires_at": {"type": "date"}}}
+    )
+    lease_id = uuid.uuid4().hex
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=REFRESH_LEASE_SECONDS)
+    await client.index(index=REFRESH_LEASES_INDEX, id=lease_id, refresh=True,
+                       document={"aliases": aliases, "expires_at": expires_at.isoformat()})
+    return lease_id
+
+
+async def _lease_holders(client, alias: str) -> int:
+    response = await client.count(index=REFRESH_LEASES_INDEX, query={
+        "bool": {"filter": [{"term": {"aliases": alias}}, {"range": {"expires_at": {"gt": "now"}}}]}
+    })
+    return response["count"]
+
+
+@asynccontextmanager
+async def relaxed_refresh(client, aliases: List[str], enabled: bool = True) -> AsyncIterator[bool]:
+    """Slow periodic refresh on `aliases` for a bulk load, then refresh once at the end.
+
+    Yields whether refresh is relaxed; callers then index without
+    `refresh=wait_for` per request. Each load holds a lease document in
+    REFRESH_LEASES_INDEX, and the configured interval comes back only when
+    no lease on an alias is left, whichever worker process holds them. If
+    the leases can't be written, nothing is relaxed.
+    """
+    if not enabled:
+        yield False
+        return
+    try:
+        lease_id = await _take_lease(client, aliases)
+    except Exception as e:
+        logger.warning("Could not take a refresh lease, indexing with normal refresh: %s", e)
+        yield False
+        return
+    for alias in aliases:
+        await _set_refresh_interval(client, alias, BULK_REFRESH_INTERVAL)
+    try:
+        yield True
+    finally:
+        try:
+            await client.delete(index=REFRESH_LEASES_INDEX, id=lease_id, refresh=True)
+            for alias in aliases:
+                if await _lease_holders(client, alias) == 0:
+                    await _set_refresh_interval(client, alias, refresh_interval(alias))
+                    # A load that started meanwhile may have relaxed it again first
+                    if await _lease_holders(client, alias):
+                        await _set_refresh_interval(client, alias, BULK_REFRESH_INTERVAL)
+        except Exception as e:
+            logger.warning("Could not release refresh lease %s: %s", lease_id, e)
+        await client.indices.refresh(index=",".join(aliases), ignore_unavailable=True)
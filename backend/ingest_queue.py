@@ -0,0 +1,373 @@
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from contextvars import ContextVar
+from datetime import datetime
+from dotenv import load_dotenv
+from elasticsearch import ApiError, ConnectionError as ESConnectionError
+from elasticsearch.helpers import BulkIndexError
+from pydantic import BaseModel
+import asyncio
+import json
+import logging
+import os
+import random
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    progress: Optional[Dict[str, Any]] = None
+    created_at: str
+    updated_at: str
+
+
+class Job(JobResponse):
+    payload: Dict[str, Any] = {}
+    # Blob keys pinned for this job, released once it has finished
+    pins: List[str] = []
+
+
+def is_retryable(e: Exception) -> bool:
+    """ES rejections (429, bulk items included), dropped connections and broken PDF pools are worth retrying"""
+    if isinstance(e, ApiError):
+        return e.meta.status == 429
+    if isinstance(e, BulkIndexError):
+        # Items async_bulk's own retries couldn't get in; a mapping error would fail again
+        statuses = [next(iter(error.values())).get("status") for error in e.errors]
+        return bool(statuses) and all(status == 429 for status in statuses)
+    return isinstance(e, (ESConnectionError, BrokenProcessPool))
+
+
+class InMemoryJobBackend:
+    """Jobs in a bounded dict and an asyncio.Queue; lives and dies with the worker"""
+
+    def __init__(self, max_jobs: int = 10000):
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.queue: Optional[asyncio.Queue] = None
+        self.pins: Dict[str, int] = {}
+
+    def _queue(self) -> asyncio.Queue:
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+    async def save(self, job: Job) -> None:
+        self.jobs[job.id] = job
+        self.jobs.move_to_end(job.id)
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def enqueue(self, job_id: str) -> None:
+        await self._queue().put(job_id)
+
+    async def dequeue(self) -> str:
+        return await self._queue().get()
+
+    async def ack(self, job_id: str) -> None:
+        pass
+
+    async def pin(self, keys: List[str]) -> None:
+        for key in keys:
+            self.pins[key] = self.pins.get(key, 0) + 1
+
+    async def unpin(self, keys: List[str]) -> None:
+        for key in keys:
+            count = self.pins.get(key, 0) - 1
+            if count > 0:
+                self.pins[key] = count
+            else:
+                self.pins.pop(key, None)
+
+    async def pin_counts(self, keys: List[str]) -> Dict[str, int]:
+        return {key: self.pins[key] for key in keys if key in self.pins}
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisJobBackend:
+    """Jobs in Redis (hash-per-job as JSON, list as queue), shared across workers.
+
+    Dequeuing moves a job id (BLMOVE) onto this process's processing list,
+    where it stays until `ack`. Each process keeps a heartbeat key alive;
+    `start` requeues the processing lists of processes whose heartbeat has
+    expired (crashed or killed), and `close` requeues the jobs this process
+    was cancelled in the middle of.
+    """
+
+    def __init__(self, url: str, prefix: str = "slides:jobs", ttl: int = 24 * 3600,
+                 heartbeat_ttl: int = 30):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+        self.heartbeat_ttl = heartbeat_ttl
+        self.consumer = uuid.uuid4().hex
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def _processing(self, consumer: str) -> str:
+        return f"{self.prefix}:processing:{consumer}"
+
+    def _alive(self, consumer: str) -> str:
+        return f"{self.prefix}:consumer:{consumer}"
+
+    # Decrement a pin count and drop it at zero, atomically
+    _UNPIN = """
+    local count = redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+    if count <= 0 then redis.call('HDEL', KEYS[1], ARGV[1]) end
+    return count
+    """
+
+    async def save(self, job: Job) -> None:
+        await self.redis.set(f"{self.prefix}:{job.id}", job.model_dump_json(), ex=self.ttl)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        data = await self.redis.get(f"{self.prefix}:{job_id}")
+        return Job(**json.loads(data)) if data else None
+
+    async def enqueue(self, job_id: str) -> None:
+        await self.redis.lpush(f"{self.prefix}:queue", job_id)
+
+    async def dequeue(self) -> str:
+        job_id = await self.redis.blmove(f"{self.prefix}:queue", self._processing(self.consumer), 0, "RIGHT", "LEFT")
+        return job_id.decode()
+
+    async def ack(self, job_id: str) -> None:
+        await self.redis.lrem(self._processing(self.consumer), 1, job_id)
+
+    async def pin(self, keys: List[str]) -> None:
+        if keys:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hincrby(f"{self.prefix}:pins", key, 1)
+                await pipe.execute()
+
+    async def unpin(self, keys: List[str]) -> None:
+        for key in keys:
+            await self.redis.eval(self._UNPIN, 1, f"{self.prefix}:pins", key)
+
+    async def pin_counts(self, keys: List[str]) -> Dict[str, int]:
+        if not keys:
+            return {}
+        counts = await self.redis.hmget(f"{self.prefix}:pins", keys)
+        return {key: int(count) for key, count in zip(keys, counts) if count is not None and int(count) > 0}
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_ttl / 3)
+            try:
+                await self.redis.set(self._alive(self.consumer), 1, ex=self.heartbeat_ttl)
+            except Exception as e:
+                logger.warning("Job queue heartbeat failed: %s", e)
+
+    async def _requeue(self, consumer: str) -> None:
+        """Put the unfinished jobs on `consumer`'s processing list back at the head of the queue"""
+        processing = self._processing(consumer)
+        for raw in await self.redis.lrange(processing, 0, -1):
+            job_id = raw.decode()
+            job = await self.get(job_id)
+            unfinished = job is not None and job.status not in (JOB_SUCCEEDED, JOB_FAILED)
+            if unfinished and job.status != JOB_QUEUED:
+                # Workers skip jobs that don't look queued
+                await self.save(job.model_copy(update={"status": JOB_QUEUED, "updated_at": datetime.utcnow().isoformat()}))
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.lrem(processing, 1, job_id)
+                if unfinished:
+                    # BLMOVE takes from the right, so these run next
+                    pipe.rpush(f"{self.prefix}:queue", job_id)
+                await pipe.execute()
+            if unfinished:
+                logger.warning("Requeued job %s left unfinished by worker %s", job_id, consumer)
+
+    async def start(self) -> None:
+        await self.redis.set(self._alive(self.consumer), 1, ex=self.heartbeat_ttl)
+        self._heartbeat = asyncio.create_task(self._beat())
+        async for key in self.redis.scan_iter(match=self._processing("*")):
+            consumer = key.decode().rsplit(":", 1)[1]
+            if consumer != self.consumer and not await self.redis.exists(self._alive(consumer)):
+                await self._requeue(consumer)
+
+    async def close(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+        try:
+            await self._requeue(self.consumer)
+            await self.redis.delete(self._alive(self.consumer))
+        finally:
+            await self.redis.aclose()
+
+
+def get_job_backend():
+    """Get the configured job backend (INGEST_QUEUE_BACKEND=memory|redis)"""
+    if os.getenv('INGEST_QUEUE_BACKEND', 'memory') == 'redis':
+        return RedisJobBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    return InMemoryJobBackend()
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+_progress_reporter: ContextVar[Optional[Callable[[Dict[str, Any]], Awaitable[None]]]] = \
+    ContextVar("job_progress_reporter", default=None)
+
+
+async def report_progress(progress: Dict[str, Any]) -> None:
+    """Publish progress for the job running in this task; a no-op outside a job"""
+    reporter = _progress_reporter.get()
+    if reporter is not None:
+        await reporter(progress)
+
+
+class IngestQueue:
+    """Background job queue with bounded concurrency and retry/backoff"""
+
+    def __init__(self, backend=None, concurrency: Optional[int] = None,
+                 max_retries: Optional[int] = None, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0):
+        self.backend = backend or get_job_backend()
+        self.concurrency = concurrency or int(os.getenv('INGEST_CONCURRENCY', '2'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('INGEST_MAX_RETRIES', '5'))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.handlers: Dict[str, JobHandler] = {}
+        self.failure_handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler, on_failure: Optional[JobHandler] = None) -> None:
+        """`on_failure(payload)` runs once a job of this kind has failed for good, to clean up after it"""
+        self.handlers[kind] = handler
+        if on_failure is not None:
+            self.failure_handlers[kind] = on_failure
+
+    async def submit(self, kind: str, payload: Dict[str, Any], pins: Optional[List[str]] = None) -> Job:
+        """`pins` are blob keys the caller already pinned with `pin_blobs`; the job releases them when it's done"""
+        now = datetime.utcnow().isoformat()
+        job = Job(id=uuid.uuid4().hex, kind=kind, status=JOB_QUEUED, payload=payload,
+                  pins=pins or [], created_at=now, updated_at=now)
+        await self.backend.save(job)
+        await self.backend.enqueue(job.id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self.backend.get(job_id)
+
+    async def pin_blobs(self, keys: List[str]) -> None:
+        """Keep these blobs from being deleted as unreferenced until `unpin_blobs`
+        (or the job they're handed to via `submit(pins=...)` finishes)"""
+        await self.backend.pin(keys)
+
+    async def unpin_blobs(self, keys: List[str]) -> None:
+        await self.backend.unpin(keys)
+
+    async def blob_pins(self, keys: List[str]) -> Dict[str, int]:
+        """How many times each of `keys` is pinned, for the ones that are"""
+        return await self.backend.pin_counts(keys)
+
+    async def _update(self, job: Job, **changes) -> Job:
+        job = job.model_copy(update={**changes, "updated_at": datetime.utcnow().isoformat()})
+        await self.backend.save(job)
+        return job
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self, job: Job) -> None:
+        handler = self.handlers[job.kind]
+
+        async def report(progress: Dict[str, Any]) -> None:
+            nonlocal job
+            job = await self._update(job, progress=progress)
+
+        token = _progress_reporter.set(report)
+        try:
+            while True:
+                job = await self._update(job, status=JOB_RUNNING, attempts=job.attempts + 1)
+                try:
+                    result = await handler(job.payload)
+                    await self._update(job, status=JOB_SUCCEEDED, result=result, error=None)
+                    await self._release(job)
+                    return
+                except Exception as e:
+                    if is_retryable(e) and job.attempts <= self.max_retries:
+                        # Keep holding this worker slot while backing off so a
+                        # saturated cluster sees less load, not more
+                        delay = self._backoff(job.attempts)
+                        logger.warning("Job %s attempt %d failed (%s), retrying in %.1fs", job.id, job.attempts, e, delay)
+                        job = await self._update(job, status=JOB_QUEUED, error=str(e))
+                        await asyncio.sleep(delay)
+                        continue
+                    logger.exception("Job %s failed", job.id)
+                    await self._update(job, status=JOB_FAILED, error=str(e))
+                    # Before cleanup, which must not see this job's own pins
+                    await self._release(job)
+                    await self._on_failure(job)
+                    return
+        finally:
+            _progress_reporter.reset(token)
+
+    async def _release(self, job: Job) -> None:
+        if job.pins:
+            try:
+                await self.backend.unpin(job.pins)
+            except Exception:
+                logger.exception("Releasing blob pins of job %s failed", job.id)
+
+    async def _on_failure(self, job: Job) -> None:
+        on_failure = self.failure_handlers.get(job.kind)
+        if on_failure is None:
+            return
+        try:
+            await on_failure(job.payload)
+        except Exception:
+            logger.exception("Cleanup after failed job %s failed", job.id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.backend.dequeue()
+            try:
+                job = await self.backend.get(job_id)
+                if job is not None and job.status == JOB_QUEUED:
+                    await self._run(job)
+                await self.backend.ack(job_id)
+            except asyncio.CancelledError:
+                # Not acked: the backend requeues it (Redis) when it closes or another worker starts
+                raise
+            except Exception:
+                logger.exception("Ingest worker error on job %s", job_id)
+
+    async def start(self) -> None:
+        if not self._workers:
+            await self.backend.start()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.backend.close()
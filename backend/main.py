@@ -1,150 +1,451 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, UploadFile, File, Form, HTTPException, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from elasticsearch import AsyncElasticsearch, NotFoundError
 
-from elasticsearch import Elasticsearch
-from dotenv import load_dotenv
-import os
-import PyPDF2
-import io
+import asyncio
 import base64
-from typing import List
+import hashlib
+import json
+import logging
+import os
+import unicodedata
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
+from urllib.parse import quote
 
 from course_service import CourseCreate, CourseUpdate, CourseResponse, CourseService
-from note_service import NoteCreate, NoteUpdate, NoteResponse, NoteService
+from note_service import NOTE_SORT_FIELDS, NoteCreate, NoteListResponse, NoteUpdate, NoteResponse, NoteService
+from note_autosave import NotePatch, NotePatchResponse, VersionConflict
 from folder_service import FolderCreate, FolderUpdate, FolderResponse, FolderService
+from page_service import PageSearchResponse, PageService
+from search_service import SEARCH_MODES, SearchService, SlideSearchResponse
+from dependencies import (ServiceContainer, get_course_service, get_es_client, get_folder_service,
+                          get_ingest_queue, get_note_service, get_page_service, get_search_service,
+                          get_thumbnail_service)
+from cache import get_cache
+from blob_store import BlobNotFound, get_blob_store
+from index_management import SLIDES_ALIAS
+from ingest_queue import IngestQueue, JobResponse
+from upload_limits import UploadSizeLimitMiddleware
+from admission import AdmissionControlMiddleware
+from pagination import decode_cursor, encode_cursor
+from response_encoding import CompressionMiddleware, FastJSONRoute
+from metrics import MetricsMiddleware, TimedRoute, metrics_enabled, registry, server_timing_enabled
 
-app = FastAPI()
+if TYPE_CHECKING:
+    # Imported on first use (see dependencies.ServiceContainer)
+    from thumbnails import ThumbnailService
 
-# Initialize Services
-course_service = CourseService()
-note_service = NoteService()
-folder_service = FolderService()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+class TimedFastJSONRoute(TimedRoute, FastJSONRoute):
+    pass
 
-load_dotenv()
 
-client = Elasticsearch(
-    str(os.getenv('ELASTICSEARCH_URL')),
-    api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
-)
+# Routes are declared once on this router and included by create_app();
+# services reach them through FastAPI dependencies, not module globals
+router = APIRouter(route_class=TimedFastJSONRoute if metrics_enabled() or server_timing_enabled() else FastJSONRoute)
 
-index_name = "lecture-slides-index"
+index_name = SLIDES_ALIAS
 
+logger = logging.getLogger(__name__)
 
 
-@app.get("/")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    services: ServiceContainer = app.state.services
+    await services.start()
+    try:
+        yield
+    finally:
+        await services.stop()
+
+
+def create_app() -> FastAPI:
+    """Build the API (`uvicorn --factory main:create_app`, or the module-level `app`)"""
+    app = FastAPI(lifespan=lifespan)
+    # Set here rather than in the lifespan so the app also serves requests
+    # driven straight through ASGI (benchmarks) without starting it
+    app.state.services = ServiceContainer()
+
+    # Innermost: shed requests still get CORS headers (so browsers can read
+    # the 503 and Retry-After) and are counted by the metrics middleware
+    app.add_middleware(AdmissionControlMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Retry-After"],
+    )
+    app.add_middleware(UploadSizeLimitMiddleware)
+    if os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true':
+        app.add_middleware(CompressionMiddleware)
+    # Outermost, so rejected uploads and CORS preflights are counted too
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(router)
+    return app
+
+
+@router.get("/")
 async def get_message():
     return "Hello World"
 
 
 
-@app.get("/api/pdf/{document_id}")
-async def get_pdf_binary(document_id: str):
-    """Retrieve PDF binary data from Elasticsearch"""
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=start-end` range; None means unsatisfiable"""
+    units, _, spec = range_header.partition("=")
+    if units.strip() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
     try:
-        response = client.get(index=index_name, id=document_id)
-        
-        if not response['found']:
-            raise HTTPException(status_code=404, detail="Document not found")
-        
-        doc = response['_source']
-        
-        # Check if document has binary data
-        if not doc.get('has_binary', False) or not doc.get('pdf_binary'):
-            raise HTTPException(
-                status_code=404, 
-                detail="PDF binary data not available for this document"
-            )
+        if start_s == "":
+            length = int(end_s)
+            if length <= 0:
+                return None
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _content_disposition(filename: str) -> str:
+    """`inline` with the filename as RFC 5987 UTF-8 plus an ASCII fallback for old clients"""
+    # Headers go out as latin-1; strip accents, then anything that still isn't printable ASCII or is special
+    ascii_name = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode()
+    ascii_name = "".join(c if c.isprintable() and c not in '"\\' else "_" for c in ascii_name) or "document.pdf"
+    return f"inline; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+async def _get_pdf_source(client: AsyncElasticsearch, document_id: str) -> dict:
+    try:
+        response = await client.get(
+            index=index_name,
+            id=document_id,
+            source_excludes=["text_content", "text_embedding"],
+            stored_fields=["pdf_binary"]
+        )
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    if not response['found']:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    doc = response['_source']
+    # Versioned indices keep legacy payloads out of _source, as a stored field only
+    if 'pdf_binary' in response.get('fields', {}):
+        doc['pdf_binary'] = response['fields']['pdf_binary'][0]
+    if not doc.get('has_binary', False) or not (doc.get('blob_key') or doc.get('pdf_binary')):
+        raise HTTPException(
+            status_code=404,
+            detail="PDF binary data not available for this document"
+        )
+    return doc
+
+
+@router.get("/api/pdf/{document_id}/raw")
+async def get_pdf_raw(
+    document_id: str,
+    request: Request,
+    client: AsyncElasticsearch = Depends(get_es_client)
+):
+    """Stream the PDF bytes with Range and ETag support"""
+    try:
+        doc = await _get_pdf_source(client, document_id)
+        blob_key = doc.get('blob_key')
+        filename = doc.get('filename') or f"{document_id}.pdf"
+
+        if blob_key:
+            store = get_blob_store()
+            size = await run_in_threadpool(store.size, blob_key)
+            etag = f'"{blob_key}"'
+            read_range = lambda start, end: store.iter_range(blob_key, start, end)
+        else:
+            # Legacy document that has not been migrated off `pdf_binary` yet
+            data = base64.b64decode(doc['pdf_binary'])
+            size = len(data)
+            etag = f'"{hashlib.sha256(data).hexdigest()}"'
+            read_range = lambda start, end: iter([data[start:end + 1]])
+
+        headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "private, max-age=0, must-revalidate",
+            "Content-Disposition": _content_disposition(filename),
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == etag):
+            byte_range = _parse_range(range_header, size)
+            if byte_range is None:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(read_range(start, end), status_code=206,
+                                     media_type="application/pdf", headers=headers)
+
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read_range(0, size - 1), media_type="application/pdf", headers=headers)
+
+    except HTTPException:
+        raise
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="PDF blob not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve PDF: {str(e)}")
+
+@router.get("/api/slides/{document_id}/pages/{page_number}/thumbnail")
+async def get_slide_thumbnail(
+    document_id: str,
+    request: Request,
+    page_number: int = Path(..., ge=1),
+    thumbnail_service: "ThumbnailService" = Depends(get_thumbnail_service),
+    client: AsyncElasticsearch = Depends(get_es_client)
+):
+    """Low-resolution image of one page (1-based), cached by the browser for a year"""
+    if not thumbnail_service.enabled:
+        raise HTTPException(status_code=503, detail="Thumbnail rendering is not enabled")
+    try:
+        doc = await _get_pdf_source(client, document_id)
+        blob_key = doc.get('blob_key')
+        if not blob_key:
+            raise HTTPException(status_code=404, detail="PDF has not been migrated to the blob store")
+
+        # The URL always maps to the same content (blob keys are content hashes)
+        etag = thumbnail_service.etag(blob_key, page_number)
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+
+        path = await thumbnail_service.get_or_render(blob_key, page_number)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return FileResponse(path, media_type=thumbnail_service.media_type, headers=headers)
+
+    except HTTPException:
+        raise
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="PDF blob not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to render thumbnail: {str(e)}")
+
+@router.get("/api/pdf/{document_id}")
+async def get_pdf_binary(document_id: str, client: AsyncElasticsearch = Depends(get_es_client)):
+    """Retrieve PDF binary data as base64 (prefer /api/pdf/{document_id}/raw)"""
+    try:
+        doc = await _get_pdf_source(client, document_id)
+
+        if doc.get('blob_key'):
+            data = await run_in_threadpool(get_blob_store().read, doc['blob_key'])
+            pdf_binary = base64.b64encode(data).decode('utf-8')
+        else:
+            pdf_binary = doc.get('pdf_binary')
         
         return {
             "document_id": document_id,
             "filename": doc.get('filename'),
-            "pdf_binary": doc.get('pdf_binary'),
+            "pdf_binary": pdf_binary,
             "pdf_size": doc.get('pdf_size'),
             "title": doc.get('title')
         }
         
     except HTTPException:
         raise
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="PDF blob not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve PDF: {str(e)}")
 
-@app.get("/api/slides/{course_id}")
-async def get_slides_by_course(course_id: str):
+SLIDE_LIST_FIELDS = ["course_id", "course_name", "filename", "title", "text_snippet", "has_binary", "pdf_size", "page_count", "uploaded_at"]
+SLIDE_SORT_FIELDS = {"uploaded_at", "filename", "pdf_size"}
+
+
+def _decode_cursor(cursor: str) -> list:
     try:
-        response = client.search(
-            index=index_name,
-            body={
-                "query": {
-                    "term": {
-                        "course_id": course_id
-                    }
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid search_after cursor")
+
+
+@router.get("/api/slides/{course_id}")
+async def get_slides_by_course(
+    course_id: str,
+    size: int = Query(50, ge=1, le=500),
+    search_after: Optional[str] = None,
+    sort: str = "uploaded_at",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    include: Optional[str] = None,
+    client: AsyncElasticsearch = Depends(get_es_client)
+):
+    """List slide metadata for a course, paginated with a search_after cursor.
+
+    Pass `include=text` to also load the full extracted `text_content`.
+    """
+    if sort not in SLIDE_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {sorted(SLIDE_SORT_FIELDS)}")
+    include_text = include is not None and "text" in include.split(",")
+
+    try:
+        body = {
+            "query": {
+                "term": {
+                    "course_id": course_id
                 }
-            }
-        )
+            },
+            "size": size,
+            "_source": SLIDE_LIST_FIELDS + (["text_content"] if include_text else []),
+            # slide_id is unique per document and breaks ties between equal sort keys
+            "sort": [
+                {sort: {"order": order, "missing": "_last"}},
+                {"slide_id": {"order": order, "missing": "_last"}}
+            ],
+            "track_total_hits": True
+        }
+        if search_after:
+            body["search_after"] = _decode_cursor(search_after)
+
+        async def load_slides():
+            response = await client.search(index=index_name, body=body)
         
-        slides = []
-        for hit in response['hits']['hits']:
-            slides.append({
-                "id": hit['_id'],
-                "course_id": hit['_source']['course_id'],
-                "course_name": hit['_source']['course_name'],
-                "filename": hit['_source']['filename'],
-                "title": hit['_source']['title'],
-                "text_content": hit['_source']['text_content'],
-                "has_binary": hit['_source'].get('has_binary', False)
-            })
+            slides = []
+            hits = response['hits']['hits']
+            for hit in hits:
+                source = hit['_source']
+                slide = {
+                    "id": hit['_id'],
+                    "course_id": source['course_id'],
+                    "course_name": source['course_name'],
+                    "filename": source['filename'],
+                    "title": source['title'],
+                    "text_snippet": source.get('text_snippet', ''),
+                    "pdf_size": source.get('pdf_size'),
+                    "page_count": source.get('page_count'),
+                    "uploaded_at": source.get('uploaded_at'),
+                    "has_binary": source.get('has_binary', False)
+                }
+                if include_text:
+                    slide["text_content"] = source.get('text_content', '')
+                slides.append(slide)
+
+            next_cursor = encode_cursor(hits[-1]['sort']) if len(hits) == size else None
             
-        return {"slides": slides, "total": len(slides)}
+            return {"slides": slides, "total": response['hits']['total']['value'], "next_cursor": next_cursor}
+
+        cache_key = f"slides:{course_id}:{sort}:{order}:{size}:{search_after or ''}:{int(include_text)}"
+        return await get_cache().get_or_load(cache_key, load_slides)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        return {"error": f"Failed to retrieve slides: {str(e)}"}
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve slides: {str(e)}")
+
+@router.get("/api/search", response_model=SlideSearchResponse)
+async def search_slides(
+    q: str = Query(..., min_length=1),
+    course_id: Optional[str] = None,
+    offset: int = Query(0, ge=0, le=10000),
+    size: int = Query(10, ge=1, le=100),
+    mode: str = "hybrid",
+    search_service: SearchService = Depends(get_search_service)
+):
+    """Search slides with BM25 + ELSER fused by RRF (`mode=keyword|semantic` for one side only)"""
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {list(SEARCH_MODES)}")
+    try:
+        return await search_service.search_slides(q, course_id=course_id, offset=offset, size=size, mode=mode)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/upload")
+@router.get("/api/pages/search", response_model=PageSearchResponse)
+async def search_pages(
+    q: str = Query(..., min_length=1),
+    course_id: Optional[str] = None,
+    size: int = Query(10, ge=1, le=100),
+    semantic: bool = False,
+    page_service: PageService = Depends(get_page_service)
+):
+    """Search individual slide pages, returning the best pages with highlights"""
+    try:
+        return await page_service.search_pages(q, course_id=course_id, size=size, semantic=semantic)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _check_pdf(file: UploadFile) -> None:
+    """Reject an empty or non-PDF upload before anything is stored"""
+    # Readers accept the header anywhere in the first 1 KB, so we do too
+    head = await file.read(1024)
+    await file.seek(0)
+    if not head:
+        raise HTTPException(status_code=400, detail=f"{file.filename or 'Upload'} is empty")
+    if b"%PDF-" not in head:
+        raise HTTPException(status_code=415, detail=f"{file.filename or 'Upload'} is not a PDF")
+
+async def _store_pinned(file: UploadFile, ingest_queue: IngestQueue) -> str:
+    """Copy an upload into the blob store and pin its blob for the job about to be queued.
+
+    The multipart parser has already spooled the file (to disk past 1 MB); it's
+    copied in chunks, hashed as it goes. Blobs are content-addressed, so a delete
+    of an identical PDF may remove it between storing and pinning; store it again then.
+    """
+    store = get_blob_store()
+    blob_key = await run_in_threadpool(store.put_file, file.file)
+    await ingest_queue.pin_blobs([blob_key])
+    if not await run_in_threadpool(store.exists, blob_key):
+        await file.seek(0)
+        await run_in_threadpool(store.put_file, file.file)
+    return blob_key
+
+@router.post("/api/upload", status_code=202)
 async def upload_pdf(
     file: UploadFile = File(...),
     course_id: str = Form(...),
     course_name: str = Form(...),
-    title: str = Form(...)
+    title: str = Form(...),
+    ingest_queue: IngestQueue = Depends(get_ingest_queue)
 ):
+    """Store the PDF and queue it for extraction and indexing; poll /api/jobs/{job_id}"""
+    await _check_pdf(file)
+    pins = []
     try:
-        pdf_content = await file.read()
-        pdf_size = len(pdf_content)
-        
-
-        
-        # Convert PDF to Base64 for Elasticsearch storage
-        pdf_binary = base64.b64encode(pdf_content).decode('utf-8')
+        blob_key = await _store_pinned(file, ingest_queue)
+        pins.append(blob_key)
+        pdf_size = file.size
         
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-        
-        text_content = ""
-        for page in pdf_reader.pages:
-            text_content += page.extract_text()
-        
-        doc = {
+        document_id = uuid.uuid4().hex
+        job = await ingest_queue.submit("slide", {
+            "document_id": document_id,
+            "blob_key": blob_key,
             "course_id": course_id,
             "course_name": course_name,
             "filename": file.filename,
             "title": title,
-            "text_content": text_content,
-            "pdf_binary": pdf_binary,
             "pdf_size": pdf_size,
-            "has_binary": True
-        }
-        
-        response = client.index(index=index_name, body=doc, pipeline="elser-pipeline")
+            "uploaded_at": datetime.utcnow().isoformat()
+        }, pins=pins)
         
         return {
-            "message": "PDF uploaded and processed successfully",
-            "document_id": response['_id'],
+            "message": "PDF uploaded and queued for processing",
+            "job_id": job.id,
+            "status": job.status,
+            "document_id": document_id,
             "course_id": course_id,
             "course_name": course_name,
             "title": title,
@@ -154,21 +455,87 @@ async def upload_pdf(
         }
         
     except Exception as e:
-        return {"error": f"Failed to process PDF: {str(e)}"}
+        await ingest_queue.unpin_blobs(pins)
+        raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
+
+@router.post("/api/upload/batch", status_code=202)
+async def upload_pdf_batch(
+    files: List[UploadFile] = File(...),
+    course_id: str = Form(...),
+    course_name: str = Form(...),
+    titles: Optional[List[str]] = Form(None),
+    ingest_queue: IngestQueue = Depends(get_ingest_queue)
+):
+    """Queue many PDFs for one course as a single bulk-indexed job.
+
+    `titles` are matched to `files` by position and default to the filename.
+    """
+    if titles and len(titles) != len(files):
+        raise HTTPException(status_code=400, detail="titles must match files one-to-one")
+    for file in files:
+        await _check_pdf(file)
+    pins = []
+    try:
+        uploaded_at = datetime.utcnow().isoformat()
+        items = []
+        for i, file in enumerate(files):
+            blob_key = await _store_pinned(file, ingest_queue)
+            pins.append(blob_key)
+            items.append({
+                "document_id": uuid.uuid4().hex,
+                "blob_key": blob_key,
+                "course_id": course_id,
+                "course_name": course_name,
+                "filename": file.filename,
+                "title": titles[i] if titles else (file.filename or "").rsplit(".", 1)[0],
+                "pdf_size": file.size,
+                "uploaded_at": uploaded_at
+            })
+        
+        job = await ingest_queue.submit("slide_batch", {"items": items}, pins=pins)
+        
+        return {
+            "message": f"{len(items)} PDFs uploaded and queued for processing",
+            "job_id": job.id,
+            "status": job.status,
+            "course_id": course_id,
+            "course_name": course_name,
+            "documents": [
+                {"document_id": item["document_id"], "filename": item["filename"], "title": item["title"]}
+                for item in items
+            ]
+        }
+        
+    except Exception as e:
+        await ingest_queue.unpin_blobs(pins)
+        raise HTTPException(status_code=500, detail=f"Failed to process PDFs: {str(e)}")
+
+@router.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, ingest_queue: IngestQueue = Depends(get_ingest_queue)):
+    """Get the status of a background job (ingestion or course deletion)"""
+    try:
+        job = await ingest_queue.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 
 # Course CRUD API Routes
-@app.get("/api/courses", response_model=List[CourseResponse])
-async def get_all_courses():
+@router.get("/api/courses", response_model=List[CourseResponse])
+async def get_all_courses(course_service: CourseService = Depends(get_course_service)):
     """Get all courses"""
     try:
         return await course_service.get_all_courses()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/courses/{course_id}", response_model=CourseResponse)
-async def get_course_by_id(course_id: str):
+@router.get("/api/courses/{course_id}", response_model=CourseResponse)
+async def get_course_by_id(course_id: str, course_service: CourseService = Depends(get_course_service)):
     """Get a specific course by course_id"""
     try:
         course = await course_service.get_course_by_id(course_id)
@@ -180,8 +547,8 @@ async def get_course_by_id(course_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/courses", response_model=CourseResponse)
-async def create_course(course: CourseCreate):
+@router.post("/api/courses", response_model=CourseResponse)
+async def create_course(course: CourseCreate, course_service: CourseService = Depends(get_course_service)):
     """Create a new course"""
     try:
         return await course_service.create_course(course)
@@ -190,8 +557,12 @@ async def create_course(course: CourseCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/courses/{course_id}", response_model=CourseResponse)
-async def update_course(course_id: str, course_update: CourseUpdate):
+@router.put("/api/courses/{course_id}", response_model=CourseResponse)
+async def update_course(
+    course_id: str,
+    course_update: CourseUpdate,
+    course_service: CourseService = Depends(get_course_service)
+):
     """Update an existing course"""
     try:
         course = await course_service.update_course(course_id, course_update)
@@ -203,21 +574,32 @@ async def update_course(course_id: str, course_update: CourseUpdate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/courses/{course_id}")
-async def delete_course(course_id: str):
-    """Delete a course"""
+@router.delete("/api/courses/{course_id}", status_code=202)
+async def delete_course(
+    course_id: str,
+    course_service: CourseService = Depends(get_course_service),
+    ingest_queue: IngestQueue = Depends(get_ingest_queue)
+):
+    """Delete a course; its slides, pages and PDFs are removed in the background, poll /api/jobs/{job_id}"""
     try:
         success = await course_service.delete_course(course_id)
         if not success:
             raise HTTPException(status_code=404, detail="Course not found")
-        return {"message": "Course deleted successfully"}
+        # If this never runs the orphan sweeper (elastic-search/sweep-orphan-courses.py) catches it
+        job = await ingest_queue.submit("course_delete", {"course_id": course_id})
+        return {
+            "message": "Course deleted; its slides are being removed",
+            "course_id": course_id,
+            "job_id": job.id,
+            "status": job.status
+        }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/courses/dropdown/options")
-async def get_courses_for_dropdown():
+@router.get("/api/courses/dropdown/options")
+async def get_courses_for_dropdown(course_service: CourseService = Depends(get_course_service)):
     """Get courses formatted for dropdown options"""
     try:
         return await course_service.get_courses_for_dropdown()
@@ -225,19 +607,36 @@ async def get_courses_for_dropdown():
         raise HTTPException(status_code=500, detail=str(e))
 
 # Note CRUD API Routes
-@app.get("/api/notes", response_model=List[NoteResponse])
-async def get_all_notes():
-    """Get all notes"""
+@router.get("/api/notes", response_model=NoteListResponse)
+async def list_notes(
+    q: Optional[str] = None,
+    folder_id: Optional[str] = None,
+    unassigned: bool = False,
+    sort: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    size: int = Query(50, ge=1, le=500),
+    search_after: Optional[str] = None,
+    note_service: NoteService = Depends(get_note_service)
+):
+    """Search and list notes (titles and snippets, not bodies), paginated with a search_after cursor.
+
+    `sort` is `updated_at`, `title.keyword` or `_score` (the default when `q` is given).
+    `unassigned=true` keeps only notes that aren't in a folder.
+    """
+    if sort is not None and sort not in NOTE_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(NOTE_SORT_FIELDS)}")
+    cursor = _decode_cursor(search_after) if search_after else None
     try:
-        return note_service.get_all_notes()
+        return await note_service.list_notes(q, folder_id=folder_id, sort=sort, order=order,
+                                             size=size, search_after=cursor, unassigned=unassigned)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/notes/{note_id}", response_model=NoteResponse)
-async def get_note_by_id(note_id: str):
+@router.get("/api/notes/{note_id}", response_model=NoteResponse)
+async def get_note_by_id(note_id: str, note_service: NoteService = Depends(get_note_service)):
     """Get a specific note by ID"""
     try:
-        note = note_service.get_note_by_id(note_id)
+        note = await note_service.get_note_by_id(note_id)
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
         return note
@@ -246,19 +645,23 @@ async def get_note_by_id(note_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/notes", response_model=NoteResponse)
-async def create_note(note: NoteCreate):
+@router.post("/api/notes", response_model=NoteResponse)
+async def create_note(note: NoteCreate, note_service: NoteService = Depends(get_note_service)):
     """Create a new note"""
     try:
-        return note_service.create_note(note)
+        return await note_service.create_note(note)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/notes/{note_id}", response_model=NoteResponse)
-async def update_note(note_id: str, note_update: NoteUpdate):
+@router.put("/api/notes/{note_id}", response_model=NoteResponse)
+async def update_note(
+    note_id: str,
+    note_update: NoteUpdate,
+    note_service: NoteService = Depends(get_note_service)
+):
     """Update an existing note"""
     try:
-        note = note_service.update_note(note_id, note_update)
+        note = await note_service.update_note(note_id, note_update)
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
         return note
@@ -267,11 +670,38 @@ async def update_note(note_id: str, note_update: NoteUpdate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/notes/{note_id}")
-async def delete_note(note_id: str):
+@router.patch("/api/notes/{note_id}", response_model=NotePatchResponse)
+async def patch_note(
+    note_id: str,
+    patch: NotePatch,
+    flush: bool = False,
+    note_service: NoteService = Depends(get_note_service)
+):
+    """Apply text splices to a note made against `version` (autosave).
+
+    Edits are coalesced server-side and written shortly after typing pauses;
+    `flush=true` writes immediately (e.g. when the editor closes). A 409 means
+    the note changed elsewhere: reload it and re-apply.
+    """
+    try:
+        result = await note_service.patch_note(note_id, patch, flush=flush)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Note not found")
+        return result
+    except HTTPException:
+        raise
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "version": e.current_version})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/api/notes/{note_id}")
+async def delete_note(note_id: str, note_service: NoteService = Depends(get_note_service)):
     """Delete a note"""
     try:
-        success = note_service.delete_note(note_id)
+        success = await note_service.delete_note(note_id)
         if not success:
             raise HTTPException(status_code=404, detail="Note not found")
         return {"message": "Note deleted successfully"}
@@ -281,19 +711,19 @@ async def delete_note(note_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Folder CRUD API Routes
-@app.get("/api/folders", response_model=List[FolderResponse])
-async def get_all_folders():
+@router.get("/api/folders", response_model=List[FolderResponse])
+async def get_all_folders(folder_service: FolderService = Depends(get_folder_service)):
     """Get all folders"""
     try:
-        return folder_service.get_all_folders()
+        return await folder_service.get_all_folders()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/folders/{folder_id}", response_model=FolderResponse)
-async def get_folder_by_id(folder_id: str):
-    """Get a specific folder by ID"""
+@router.get("/api/folders/{folder_id}", response_model=FolderResponse)
+async def get_folder_by_id(folder_id: str, folder_service: FolderService = Depends(get_folder_service)):
+    """Get a specific folder by ID, with its note_count and last_note_updated_at"""
     try:
-        folder = folder_service.get_folder_by_id(folder_id)
+        folder = await folder_service.get_folder_by_id(folder_id, with_stats=True)
         if not folder:
             raise HTTPException(status_code=404, detail="Folder not found")
         return folder
@@ -302,19 +732,23 @@ async def get_folder_by_id(folder_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/folders", response_model=FolderResponse)
-async def create_folder(folder: FolderCreate):
+@router.post("/api/folders", response_model=FolderResponse)
+async def create_folder(folder: FolderCreate, folder_service: FolderService = Depends(get_folder_service)):
     """Create a new folder"""
     try:
-        return folder_service.create_folder(folder)
+        return await folder_service.create_folder(folder)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/folders/{folder_id}", response_model=FolderResponse)
-async def update_folder(folder_id: str, folder_update: FolderUpdate):
+@router.put("/api/folders/{folder_id}", response_model=FolderResponse)
+async def update_folder(
+    folder_id: str,
+    folder_update: FolderUpdate,
+    folder_service: FolderService = Depends(get_folder_service)
+):
     """Update an existing folder"""
     try:
-        folder = folder_service.update_folder(folder_id, folder_update)
+        folder = await folder_service.update_folder(folder_id, folder_update)
         if not folder:
             raise HTTPException(status_code=404, detail="Folder not found")
         return folder
@@ -323,28 +757,98 @@ async def update_folder(folder_id: str, folder_update: FolderUpdate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/folders/{folder_id}")
-async def delete_folder(folder_id: str):
-    """Delete a folder"""
+@router.get("/api/folders/{folder_id}/notes", response_model=NoteListResponse)
+async def get_folder_notes(
+    folder_id: str,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    size: int = Query(50, ge=1, le=500),
+    search_after: Optional[str] = None,
+    folder_service: FolderService = Depends(get_folder_service),
+    note_service: NoteService = Depends(get_note_service)
+):
+    """List the notes in a folder; same parameters and response as GET /api/notes"""
+    if sort is not None and sort not in NOTE_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(NOTE_SORT_FIELDS)}")
+    cursor = _decode_cursor(search_after) if search_after else None
     try:
-        success = folder_service.delete_folder(folder_id)
-        if not success:
+        folder, notes = await asyncio.gather(
+            folder_service.get_folder_by_id(folder_id),
+            note_service.list_notes(q, folder_id=folder_id, sort=sort, order=order,
+                                    size=size, search_after=cursor)
+        )
+        if not folder:
             raise HTTPException(status_code=404, detail="Folder not found")
-        return {"message": "Folder deleted successfully"}
+        return notes
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/slides/{document_id}")
-async def delete_slide(document_id: str):
+@router.delete("/api/folders/{folder_id}")
+async def delete_folder(
+    folder_id: str,
+    notes: str = Query("unassign", pattern="^(unassign|delete|move)$"),
+    move_to: Optional[str] = None,
+    folder_service: FolderService = Depends(get_folder_service)
+):
+    """Delete a folder. Its notes become unassigned (default), are deleted, or move to `move_to`."""
+    if (notes == "move") != (move_to is not None):
+        raise HTTPException(status_code=400, detail="move_to is required with (and only with) notes=move")
+    try:
+        result = await folder_service.delete_folder(folder_id, delete_notes=notes == "delete", move_to=move_to)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        return {"message": "Folder deleted successfully", **result}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/cache/stats")
+async def get_cache_stats():
+    """Cache hit/miss counters per namespace"""
+    return get_cache().stats.snapshot()
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics for this worker process"""
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.delete("/api/slides/{document_id}")
+async def delete_slide(
+    document_id: str,
+    page_service: PageService = Depends(get_page_service),
+    thumbnail_service: "ThumbnailService" = Depends(get_thumbnail_service),
+    ingest_queue: IngestQueue = Depends(get_ingest_queue),
+    client: AsyncElasticsearch = Depends(get_es_client)
+):
     """Delete a lecture slide from Elasticsearch"""
+    from slide_ingest import delete_unreferenced_blobs
     try:
-        response = client.delete(index=index_name, id=document_id)
+        try:
+            existing = await client.get(index=index_name, id=document_id, source_includes=["blob_key", "course_id"])
+        except NotFoundError:
+            raise HTTPException(status_code=404, detail="Slide not found")
+        blob_key = existing['_source'].get('blob_key')
+
+        response = await client.delete(index=index_name, id=document_id, refresh="wait_for")
         
         if response.get('result') == 'not_found':
             raise HTTPException(status_code=404, detail="Slide not found")
         
+        await page_service.delete_pages(document_id)
+        await get_cache().delete_prefix(f"slides:{existing['_source'].get('course_id')}:")
+        
+        # Blobs are content-addressed and may be shared by other slides or pending uploads
+        if blob_key:
+            await delete_unreferenced_blobs(client, [blob_key], thumbnail_service, ingest_queue=ingest_queue)
+        
         return {"message": "Slide deleted successfully", "document_id": document_id}
         
     except HTTPException:
@@ -352,6 +856,8 @@ async def delete_slide(document_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete slide: {str(e)}")
     
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
@@ -0,0 +1,323 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import functools
+import inspect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+load_dotenv()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def metrics_enabled() -> bool:
+    return os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+
+def server_timing_enabled() -> bool:
+    return os.getenv('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        # Observations can come from executor threads (e.g. Mongo command events)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {value:g}" for labels, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(counts), total) for labels, (counts, total) in self.values.items())
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of this process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled", ("method",))
+REQUEST_SIZE = registry.histogram(
+    "http_request_size_bytes", "Request body size by route", ("method", "route"), SIZE_BUCKETS)
+RESPONSE_SIZE = registry.histogram(
+    "http_response_size_bytes", "Response body size by route", ("method", "route"), SIZE_BUCKETS)
+SPAN_DURATION = registry.histogram(
+    "span_duration_seconds", "Time spent in Elasticsearch, MongoDB, PDF work and serialization",
+    ("system", "operation"))
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "admission_queue_depth", "Requests waiting for a slot, by route class", ("route_class",))
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "admission_in_flight", "Admitted requests holding a slot, by route class", ("route_class",))
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total", "Requests shed with 503, by route class and reason (queue_full, timeout)",
+    ("route_class", "reason"))
+ADMISSION_WAIT = registry.histogram(
+    "admission_wait_seconds", "Time queued requests waited for a slot, by route class", ("route_class",))
+
+
+class RequestTimings:
+    """Span totals for one request, per system"""
+
+    def __init__(self):
+        self.totals: Dict[str, List[float]] = {}
+        self.endpoint_done: Optional[float] = None
+
+    def add(self, system: str, seconds: float) -> None:
+        total = self.totals.setdefault(system, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+    def header(self, elapsed: float) -> bytes:
+        entries = [f'{system};dur={seconds * 1000:.2f};desc="calls={count}"'
+                   for system, (seconds, count) in self.totals.items()]
+        entries.append(f"total;dur={elapsed * 1000:.2f}")
+        return ", ".join(entries).encode()
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_metrics_on = metrics_enabled()
+
+
+def record_span(system: str, operation: str, seconds: float) -> None:
+    if _metrics_on:
+        SPAN_DURATION.observe(seconds, system, operation)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(system, seconds)
+
+
+@contextmanager
+def span(system: str, operation: str) -> Iterator[None]:
+    """Time a block as `system`/`operation` (a metric, plus Server-Timing when requested)"""
+    if not _metrics_on and _request_timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(system, operation, time.perf_counter() - start)
+
+
+def mongo_command_listener():
+    """pymongo listener timing every command; Motor runs commands with the caller's context"""
+    from pymongo import monitoring
+
+    class MongoCommandTimer(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            record_span("mongodb", event.command_name, event.duration_micros / 1e6)
+
+        def failed(self, event):
+            record_span("mongodb", event.command_name, event.duration_micros / 1e6)
+
+    return MongoCommandTimer()
+
+
+def _mark_endpoint_done(endpoint: Callable) -> Callable:
+    def mark():
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.endpoint_done = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                mark()
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """Notes when the endpoint returns, so response validation and encoding can be timed"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+
+
+def _route_template(scope: Scope) -> str:
+    # Templates, not raw paths, keep label cardinality bounded
+    route = scope.get("route")
+    # Requests shed by admission control carry the template they would have matched
+    return getattr(route, "path", None) or scope.get("route_template") or "unmatched"
+
+
+class MetricsMiddleware:
+    """Per-route latency and payload-size histograms plus an in-flight gauge.
+
+    With SERVER_TIMING_ENABLED, requests sending `X-Server-Timing: 1` get a
+    `Server-Timing` response header totalling the spans they caused.
+    """
+
+    def __init__(self, app: ASGIApp, collect: Optional[bool] = None, server_timing: Optional[bool] = None):
+        self.app = app
+        self.collect = _metrics_on if collect is None else collect
+        self.server_timing = server_timing_enabled() if server_timing is None else server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        wants_header = self.server_timing and (b"x-server-timing", b"1") in scope["headers"]
+        if not self.collect and not wants_header:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        status = 500
+        request_bytes = response_bytes = 0
+
+        async def counting_receive() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def timing_send(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timings.endpoint_done is not None:
+                    record_span("serialization", _route_template(scope), now - timings.endpoint_done)
+                if wants_header:
+                    message = {**message, "headers": list(message.get("headers", []))
+                               + [(b"server-timing", timings.header(now - start))]}
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        if self.collect:
+            REQUESTS_IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, counting_receive, timing_send)
+        finally:
+            _request_timings.reset(token)
+            if self.collect:
+                REQUESTS_IN_FLIGHT.dec(method)
+                route = _route_template(scope)
+                REQUEST_DURATION.observe(time.perf_counter() - start, method, route, str(status))
+                REQUEST_SIZE.observe(request_bytes, method, route)
+                RESPONSE_SIZE.observe(response_bytes, method, route)
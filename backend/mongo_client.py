@@ -1,24 +1,56 @@
-from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from metrics import metrics_enabled, mongo_command_listener, server_timing_enabled
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
 
 load_dotenv()
 
+# Indexes every collection needs, as (keys, IndexModel options); created
+# (idempotently) at startup. Plain tuples so importing this module doesn't
+# load pymongo: motor is only imported once a client is created.
+INDEXES: Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]] = {
+    "courses": [
+        ([("course_id", 1)], {"unique": True, "name": "course_id_unique"}),
+    ],
+}
+
 class MongoClient:
     _instance: Optional['MongoClient'] = None
-    _client: Optional[AsyncIOMotorClient] = None
+    _client: Optional['AsyncIOMotorClient'] = None
+    _indexes_ready = False
     
     def __new__(cls) -> 'MongoClient':
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
+    @staticmethod
+    def _client_options() -> dict:
+        """Pool, timeout and compression settings from the environment"""
+        options = {
+            "maxPoolSize": int(os.getenv('MONGODB_MAX_POOL_SIZE', '100')),
+            "minPoolSize": int(os.getenv('MONGODB_MIN_POOL_SIZE', '0')),
+            "maxIdleTimeMS": int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', '300000')),
+            "connectTimeoutMS": int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', '10000')),
+            "serverSelectionTimeoutMS": int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '10000')),
+        }
+        if os.getenv('MONGODB_SOCKET_TIMEOUT_MS'):
+            options["socketTimeoutMS"] = int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS'))
+        if os.getenv('MONGODB_COMPRESSORS'):
+            options["compressors"] = os.getenv('MONGODB_COMPRESSORS')
+        if metrics_enabled() or server_timing_enabled():
+            options["event_listeners"] = [mongo_command_listener()]
+        return options
+    
     @classmethod
-    async def get_client(cls) -> AsyncIOMotorClient:
+    async def get_client(cls) -> 'AsyncIOMotorClient':
         if cls._client is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
             mongodb_url = os.getenv('MONGODB_URL')
-            cls._client = AsyncIOMotorClient(mongodb_url)
+            cls._client = AsyncIOMotorClient(mongodb_url, **cls._client_options())
         return cls._client
     
     @classmethod
@@ -30,4 +62,30 @@ class MongoClient:
     async def get_courses_collection(cls):
         """Get courses collection"""
         db = await cls.get_database()
-        return db.courses
\ No newline at end of file
+        return db.courses
+    
+    @classmethod
+    async def ensure_indexes(cls) -> None:
+        """Create any missing indexes from INDEXES; after the first success this is free"""
+        if cls._indexes_ready:
+            return
+        from pymongo import IndexModel
+        db = await cls.get_database()
+        for collection, indexes in INDEXES.items():
+            # Idempotent, so workers racing on this (or a retry after a partial run) are harmless
+            await db[collection].create_indexes([IndexModel(keys, **options) for keys, options in indexes])
+        cls._indexes_ready = True
+    
+    @classmethod
+    async def bootstrap(cls) -> None:
+        """Connect, make sure indexes exist and open the pool before the first request"""
+        client = await cls.get_client()
+        await client.admin.command("ping")
+        await cls.ensure_indexes()
+    
+    @classmethod
+    async def close(cls) -> None:
+        if cls._client is not None:
+            cls._client.close()
+            cls._client = None
+            cls._indexes_ready = False
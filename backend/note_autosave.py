@@ -0,0 +1,249 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from pydantic import BaseModel, Field
+from elasticsearch import ConflictError, NotFoundError
+from dotenv import load_dotenv
+from datetime import datetime
+import asyncio
+import logging
+import os
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class NoteSplice(BaseModel):
+    """Replace `delete` characters at `pos` with `insert` (positions in Unicode code points)"""
+    pos: int = Field(..., ge=0)
+    delete: int = Field(0, ge=0)
+    insert: str = ""
+
+
+class NotePatch(BaseModel):
+    version: int
+    ops: List[NoteSplice] = []
+    title: Optional[str] = None
+    folder_id: Optional[str] = None
+
+
+class NotePatchResponse(BaseModel):
+    id: str
+    version: int
+    saved: bool
+    length: int
+
+
+class VersionConflict(Exception):
+    def __init__(self, current_version: Optional[int]):
+        super().__init__(f"Note was changed elsewhere (current version {current_version})")
+        self.current_version = current_version
+
+
+def apply_splices(text: str, ops: List[NoteSplice]) -> str:
+    """Apply splices in order, each against the result of the previous one"""
+    for op in ops:
+        if op.pos + op.delete > len(text):
+            raise ValueError(f"Splice at {op.pos} (+{op.delete}) is outside the note ({len(text)} characters)")
+        text = text[:op.pos] + op.insert + text[op.pos + op.delete:]
+    return text
+
+
+class _PendingNote:
+    def __init__(self, source: dict, seq_no: int, primary_term: int):
+        self.source = source
+        self.seq_no = seq_no
+        self.primary_term = primary_term
+        self.version = source.get("version", 0)
+        self.first_edit_at: Optional[float] = None
+        self.last_edit_at: Optional[float] = None
+        # Failed writes in a row, and when the next attempt may run
+        self.failures = 0
+        self.retry_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+
+class NoteAutosave:
+    """Coalesces bursts of note patches into a bounded number of ES writes.
+
+    Patches are applied to an in-memory copy of the note. It is written
+    back `delay` seconds after the last edit, and at most `max_delay`
+    seconds after the first unsaved one, guarded by if_seq_no /
+    if_primary_term so a concurrent PUT (or another worker) is never
+    overwritten: the buffered edits are dropped and the client's next patch
+    gets a version conflict instead. Any other failed write (a timeout, a
+    429 or 5xx) keeps them and tries again with exponential backoff.
+    """
+
+    def __init__(self, get_client: Callable[[], Awaitable], index: str):
+        self.get_client = get_client
+        self.index = index
+        self.delay = float(os.getenv('NOTE_AUTOSAVE_DELAY', '2'))
+        self.max_delay = float(os.getenv('NOTE_AUTOSAVE_MAX_DELAY', '10'))
+        self.max_retry_delay = float(os.getenv('NOTE_AUTOSAVE_MAX_RETRY_DELAY', '60'))
+        self.pending: Dict[str, _PendingNote] = {}
+        self.conflicted: Set[str] = set()
+        self.flush_tasks: Dict[str, asyncio.Task] = {}
+        self.writes = 0
+
+    async def _load(self, note_id: str) -> Optional[_PendingNote]:
+        state = self.pending.get(note_id)
+        if state is None:
+            client = await self.get_client()
+            try:
+                response = await client.get(index=self.index, id=note_id)
+            except NotFoundError:
+                return None
+            # Re-check: another patch may have loaded it while we awaited
+            state = self.pending.setdefault(
+                note_id, _PendingNote(response["_source"], response["_seq_no"], response["_primary_term"])
+            )
+        return state
+
+    def snapshot(self, note_id: str) -> Optional[dict]:
+        """The buffered (not yet written) version of a note, if any"""
+        state = self.pending.get(note_id)
+        if state is None or state.first_edit_at is None:
+            return None
+        return {**state.source, "version": state.version}
+
+    async def apply(self, note_id: str, patch: NotePatch, flush: bool = False) -> Optional[NotePatchResponse]:
+        """Apply a patch made against `patch.version`; None if the note doesn't exist"""
+        state = await self._load(note_id)
+        if state is None:
+            return None
+        async with state.lock:
+            if self.pending.get(note_id) is not state:
+                # Flushed or dropped while we waited for the lock; start over
+                return await self.apply(note_id, patch, flush)
+            try:
+                if note_id in self.conflicted or patch.version != state.version:
+                    self.conflicted.discard(note_id)
+                    raise VersionConflict(state.version)
+                source = dict(state.source)
+                if patch.ops:
+                    source["notes"] = apply_splices(source.get("notes", ""), patch.ops)
+            except Exception:
+                if state.first_edit_at is None:
+                    # Nothing buffered; don't keep a copy whose seq_no will go stale
+                    del self.pending[note_id]
+                raise
+            if patch.ops or patch.title is not None or patch.folder_id is not None:
+                if patch.title is not None:
+                    source["title"] = patch.title
+                if patch.folder_id is not None:
+                    source["folder_id"] = patch.folder_id
+                source["updated_at"] = datetime.utcnow().isoformat()
+                state.source = source
+                state.version += 1
+
+                now = asyncio.get_running_loop().time()
+                state.first_edit_at = state.first_edit_at or now
+                state.last_edit_at = now
+            elif state.first_edit_at is None:
+                # An empty patch (e.g. a bare flush) with nothing buffered
+                del self.pending[note_id]
+            version, length = state.version, len(source.get("notes", ""))
+
+        saved = False
+        if flush:
+            saved = await self.flush(note_id)
+        else:
+            self._schedule(note_id)
+        return NotePatchResponse(id=note_id, version=version, saved=saved, length=length)
+
+    def _schedule(self, note_id: str) -> None:
+        """Make sure a background flush is pending (the one running now is about to finish)"""
+        task = self.flush_tasks.get(note_id)
+        if task is None or task is asyncio.current_task():
+            self.flush_tasks[note_id] = asyncio.create_task(self._flush_later(note_id))
+
+    async def _flush_later(self, note_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                state = self.pending.get(note_id)
+                if state is None or state.first_edit_at is None:
+                    return
+                due = min(state.last_edit_at + self.delay, state.first_edit_at + self.max_delay)
+                if state.retry_at is not None:
+                    due = max(due, state.retry_at)
+                if loop.time() >= due:
+                    break
+                await asyncio.sleep(due - loop.time())
+            await self.flush(note_id)
+        except Exception:
+            logger.exception("Autosave of note %s failed", note_id)
+        finally:
+            if self.flush_tasks.get(note_id) is asyncio.current_task():
+                del self.flush_tasks[note_id]
+
+    async def flush(self, note_id: str) -> bool:
+        """Write a note's buffered edits now (one conditional update).
+
+        False if they weren't written: dropped after a conflict, or kept for a
+        retry after any other error.
+        """
+        state = self.pending.get(note_id)
+        if state is None:
+            return True
+        async with state.lock:
+            if self.pending.get(note_id) is not state:
+                return True
+            try:
+                if state.first_edit_at is not None:
+                    client = await self.get_client()
+                    fields = ("title", "notes", "folder_id", "updated_at")
+                    await client.update(
+                        index=self.index,
+                        id=note_id,
+                        body={"doc": {**{k: state.source[k] for k in fields if k in state.source},
+                                      "version": state.version}},
+                        if_seq_no=state.seq_no,
+                        if_primary_term=state.primary_term
+                    )
+                    self.writes += 1
+            except (ConflictError, NotFoundError) as e:
+                # The client still has its text; a 409 on its next patch makes it reload and retry
+                logger.warning("Dropped autosaved edits to note %s: %s", note_id, e)
+                self.conflicted.add(note_id)
+                saved = False
+            except Exception as e:
+                # Keep the edits and seq_no; if the write did land after all, the
+                # retry gets a conflict and the client reloads the saved text
+                state.failures += 1
+                backoff = min(self.delay * 2 ** state.failures, self.max_retry_delay)
+                state.retry_at = asyncio.get_running_loop().time() + backoff
+                logger.warning("Autosave of note %s failed, retrying in %.1f s: %s", note_id, backoff, e)
+                self._schedule(note_id)
+                return False
+            else:
+                saved = True
+            # Next patch reloads (and re-reads seq_no) from ES
+            if self.pending.get(note_id) is state:
+                del self.pending[note_id]
+            return saved
+
+    def discard(self, note_id: str, superseded: bool = False) -> None:
+        """Forget buffered edits because the note is being replaced (`superseded`) or deleted.
+
+        Superseded edits make the editing client's next patch a conflict:
+        its version may coincide with the one the replacement writes.
+        """
+        state = self.pending.pop(note_id, None)
+        if superseded and state is not None and state.first_edit_at is not None:
+            self.conflicted.add(note_id)
+        else:
+            self.conflicted.discard(note_id)
+        task = self.flush_tasks.pop(note_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def flush_all(self) -> None:
+        """Write everything buffered, e.g. on shutdown"""
+        for note_id in list(self.pending):
+            try:
+                await self.flush(note_id)
+            except Exception:
+                logger.exception("Autosave of note %s failed", note_id)
+        for task in list(self.flush_tasks.values()):
+            task.cancel()
@@ -1,19 +1,19 @@
 from typing import List, Optional
 from pydantic import BaseModel
-from elasticsearch import Elasticsearch
-from dotenv import load_dotenv
-import os
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from es_client import ESClient
+from pagination import encode_cursor
+from note_autosave import NoteAutosave, NotePatch, NotePatchResponse
 from datetime import datetime
-
-load_dotenv()
-
-client = Elasticsearch(
-    str(os.getenv('ELASTICSEARCH_URL')),
-    api_key=str(os.getenv('ELASTICSEARCH_API_KEY'))
-)
+import uuid
 
 notes_index = "notes-index"
 
+NOTE_SEARCH_FIELDS = ["title^2", "notes"]
+NOTE_LIST_FIELDS = ["title", "folder_id", "created_at", "updated_at"]
+NOTE_SORT_FIELDS = ("updated_at", "title.keyword", "_score")
+NOTE_SNIPPET_LENGTH = 150
+
 
 class NoteCreate(BaseModel):
     title: str
@@ -33,16 +33,43 @@ class NoteResponse(BaseModel):
     notes: str
     folder_id: Optional[str] = None
     created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    version: int = 0
 
     class Config:
         from_attributes = True
 
 
+class NoteSummary(BaseModel):
+    """A note in a listing: no body, just an HTML-escaped snippet with <mark> highlights"""
+    id: str
+    title: str
+    folder_id: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    snippet: str = ""
+    title_highlight: Optional[str] = None
+    score: Optional[float] = None
+
+
+class NoteListResponse(BaseModel):
+    notes: List[NoteSummary]
+    total: int
+    next_cursor: Optional[str] = None
+
+
 class NoteService:
-    def __init__(self):
-        pass
+    def __init__(self, client: Optional[AsyncElasticsearch] = None):
+        self.client = client
+        self.autosave = NoteAutosave(self._get_client, notes_index)
+
+    async def _get_client(self):
+        # Injected by the ServiceContainer; scripts that build a service on its own get the shared one
+        if self.client is None:
+            self.client = await ESClient.get_client()
+        return self.client
 
-    def create_note(self, note: NoteCreate) -> NoteResponse:
+    async def create_note(self, note: NoteCreate) -> NoteResponse:
         try:
             now = datetime.utcnow().isoformat()
             doc = {
@@ -54,27 +81,79 @@ class NoteService:
             if note.folder_id:
                 doc["folder_id"] = note.folder_id
 
-            response = client.index(index=notes_index, body=doc)
-            doc["id"] = response["_id"]
+            # note_id mirrors _id so listings can tie-break their sort on it
+            note_id = uuid.uuid4().hex
+            doc["note_id"] = note_id
+
+            client = await self._get_client()
+            await client.index(index=notes_index, id=note_id, body=doc)
+            doc["id"] = note_id
             return NoteResponse(**doc)
         except Exception as e:
             raise Exception(f"Error creating note: {str(e)}")
 
-    def get_all_notes(self) -> List[NoteResponse]:
+    def build_list_body(self, q: Optional[str], folder_id: Optional[str], sort: str, order: str,
+                        size: int, search_after: Optional[list], unassigned: bool = False) -> dict:
+        filters = [{"term": {"folder_id": folder_id}}] if folder_id else []
+        excluded = [{"exists": {"field": "folder_id"}}] if unassigned else []
+        query = {"multi_match": {"query": q, "fields": NOTE_SEARCH_FIELDS}} if q else {"match_all": {}}
+        primary = {"_score": {"order": order}} if sort == "_score" else {sort: {"order": order, "missing": "_last"}}
+        body = {
+            "query": {"bool": {"must": [query], "filter": filters, "must_not": excluded}},
+            "size": size,
+            "_source": NOTE_LIST_FIELDS,
+            "sort": [primary, {"note_id": {"order": order, "missing": "_last"}}],
+            "track_total_hits": True,
+            "highlight": {
+                "encoder": "html",
+                "pre_tags": ["<mark>"],
+                "post_tags": ["</mark>"],
+                "fields": {
+                    "title": {"number_of_fragments": 0},
+                    # no_match_size makes the snippet the start of the note when nothing matched
+                    "notes": {"fragment_size": NOTE_SNIPPET_LENGTH, "number_of_fragments": 1,
+                              "no_match_size": NOTE_SNIPPET_LENGTH}
+                }
+            }
+        }
+        if search_after:
+            body["search_after"] = search_after
+        return body
+
+    async def list_notes(self, q: Optional[str] = None, folder_id: Optional[str] = None,
+                         sort: Optional[str] = None, order: str = "desc", size: int = 50,
+                         search_after: Optional[list] = None, unassigned: bool = False) -> NoteListResponse:
+        """Search/list notes without their bodies; sort defaults to relevance when `q` is given"""
         try:
-            response = client.search(index=notes_index, body={"query": {"match_all": {}}})
+            sort = sort or ("_score" if q else "updated_at")
+            client = await self._get_client()
+            response = await client.search(
+                index=notes_index,
+                body=self.build_list_body(q, folder_id, sort, order, size, search_after, unassigned)
+            )
+            hits = response["hits"]["hits"]
             notes = []
-            for hit in response["hits"]["hits"]:
+            for hit in hits:
                 note_data = hit["_source"]
+                highlight = hit.get("highlight", {})
                 note_data["id"] = hit["_id"]
-                notes.append(NoteResponse(**note_data))
-            return notes
+                note_data["snippet"] = "".join(highlight.get("notes", []))
+                note_data["title_highlight"] = "".join(highlight.get("title", [])) or None
+                note_data["score"] = hit.get("_score")
+                notes.append(NoteSummary(**note_data))
+            next_cursor = encode_cursor(hits[-1]["sort"]) if len(hits) == size else None
+            return NoteListResponse(notes=notes, total=response["hits"]["total"]["value"], next_cursor=next_cursor)
         except Exception as e:
             raise Exception(f"Error fetching notes: {str(e)}")
 
-    def get_note_by_id(self, note_id: str) -> Optional[NoteResponse]:
+    async def get_note_by_id(self, note_id: str) -> Optional[NoteResponse]:
         try:
-            response = client.get(index=notes_index, id=note_id)
+            # Edits still being coalesced are newer than what ES has
+            pending = self.autosave.snapshot(note_id)
+            if pending is not None:
+                return NoteResponse(id=note_id, **pending)
+            client = await self._get_client()
+            response = await client.get(index=notes_index, id=note_id)
             if response["found"]:
                 note_data = response["_source"]
                 note_data["id"] = response["_id"]
@@ -83,12 +162,8 @@ class NoteService:
         except Exception as e:
             return None
 
-    def update_note(self, note_id: str, note_update: NoteUpdate) -> Optional[NoteResponse]:
+    async def update_note(self, note_id: str, note_update: NoteUpdate) -> Optional[NoteResponse]:
         try:
-            existing = self.get_note_by_id(note_id)
-            if not existing:
-                return None
-
             update_data = {"updated_at": datetime.utcnow().isoformat()}
 
             if note_update.title is not None:
@@ -98,14 +173,44 @@ class NoteService:
             if note_update.folder_id is not None:
                 update_data["folder_id"] = note_update.folder_id
 
-            client.update(index=notes_index, id=note_id, body={"doc": update_data})
-            return self.get_note_by_id(note_id)
+            client = await self._get_client()
+            # A full update supersedes any buffered autosave edits
+            self.autosave.discard(note_id, superseded=True)
+            # Bump version so autosave clients editing an older copy get a conflict;
+            # "_source": True returns the updated document, saving a follow-up get
+            try:
+                response = await client.update(
+                    index=notes_index,
+                    id=note_id,
+                    body={
+                        "script": {
+                            "source": "ctx._source.putAll(params.doc); ctx._source.version = (ctx._source.version ?: 0) + 1",
+                            "lang": "painless",
+                            "params": {"doc": update_data}
+                        },
+                        "_source": True
+                    }
+                )
+            except NotFoundError:
+                return None
+            note_data = response["get"]["_source"]
+            note_data["id"] = response["_id"]
+            return NoteResponse(**note_data)
         except Exception as e:
             raise Exception(f"Error updating note: {str(e)}")
 
-    def delete_note(self, note_id: str) -> bool:
+    async def patch_note(self, note_id: str, patch: NotePatch, flush: bool = False) -> Optional[NotePatchResponse]:
+        """Apply text splices against `patch.version`; written to ES in coalesced batches.
+
+        Raises VersionConflict if the note changed since `patch.version`.
+        """
+        return await self.autosave.apply(note_id, patch, flush=flush)
+
+    async def delete_note(self, note_id: str) -> bool:
         try:
-            response = client.delete(index=notes_index, id=note_id)
+            self.autosave.discard(note_id)
+            client = await self._get_client()
+            response = await client.delete(index=notes_index, id=note_id)
             return response.get("result") in ["deleted", "not_found"]
         except Exception as e:
             return False
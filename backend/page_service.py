@@ -0,0 +1,157 @@
+from typing import List, Optional
+from pydantic import BaseModel
+from elasticsearch import ApiError, AsyncElasticsearch, ConnectionError as ESConnectionError
+from elasticsearch.helpers import BulkIndexError, async_bulk
+from es_client import ESClient
+
+pages_index = "lecture-pages"
+
+# async_bulk retries 429-rejected pages itself with backoff before giving up
+BULK_RETRY_OPTIONS = {"max_retries": 3, "initial_backoff": 2}
+
+# Raised unwrapped, so the ingest queue can see a 429 or dropped connection and retry the job
+RETRYABLE_ERRORS = (ApiError, ESConnectionError, BulkIndexError)
+
+
+class PageHit(BaseModel):
+    id: str
+    parent_id: str
+    course_id: str
+    title: Optional[str] = None
+    page_number: int
+    score: Optional[float] = None
+    highlights: List[str] = []
+
+
+class PageSearchResponse(BaseModel):
+    pages: List[PageHit]
+    total: int
+
+
+class PageService:
+    def __init__(self, client: Optional[AsyncElasticsearch] = None):
+        self.client = client
+
+    async def _get_client(self):
+        # Injected by the ServiceContainer; scripts that build a service on its own get the shared one
+        if self.client is None:
+            self.client = await ESClient.get_client()
+        return self.client
+
+    def page_actions(self, parent_id: str, course_id: str, title: str, pages: List[str]):
+        """Bulk actions for one document per non-empty page (1-based page_number)"""
+        for number, text in enumerate(pages, start=1):
+            if not text.strip():
+                continue
+            yield {
+                "_index": pages_index,
+                "_id": f"{parent_id}-{number}",
+                "pipeline": "elser-pipeline",
+                "_source": {
+                    "parent_id": parent_id,
+                    "course_id": course_id,
+                    "title": title,
+                    "page_number": number,
+                    "text_content": text
+                }
+            }
+
+    async def index_pages(self, parent_id: str, course_id: str, title: str, pages: List[str]) -> int:
+        """Index one document per page through the ELSER pipeline"""
+        try:
+            client = await self._get_client()
+            actions = self.page_actions(parent_id, course_id, title, pages)
+            indexed, _ = await async_bulk(client, actions, **BULK_RETRY_OPTIONS)
+            return indexed
+        except RETRYABLE_ERRORS:
+            raise
+        except Exception as e:
+            raise Exception(f"Error indexing pages: {str(e)}")
+
+    async def copy_page_actions(self, source_parent_id: str, parent_id: str, course_id: str, title: str) -> List[dict]:
+        """Bulk actions re-parenting another slide's pages, embeddings included (no pipeline)"""
+        try:
+            client = await self._get_client()
+            response = await client.search(
+                index=pages_index,
+                body={"query": {"term": {"parent_id": source_parent_id}}, "size": 10000},
+                ignore_unavailable=True
+            )
+            actions = []
+            for hit in response["hits"]["hits"]:
+                page_data = hit["_source"]
+                page_data.update(parent_id=parent_id, course_id=course_id, title=title)
+                actions.append({
+                    "_index": pages_index,
+                    "_id": f"{parent_id}-{page_data['page_number']}",
+                    "_source": page_data
+                })
+            return actions
+        except RETRYABLE_ERRORS:
+            raise
+        except Exception as e:
+            raise Exception(f"Error copying pages: {str(e)}")
+
+    async def copy_pages(self, source_parent_id: str, parent_id: str, course_id: str, title: str) -> int:
+        try:
+            client = await self._get_client()
+            actions = await self.copy_page_actions(source_parent_id, parent_id, course_id, title)
+            indexed, _ = await async_bulk(client, actions, **BULK_RETRY_OPTIONS)
+            return indexed
+        except RETRYABLE_ERRORS:
+            raise
+        except Exception as e:
+            raise Exception(f"Error copying pages: {str(e)}")
+
+    async def search_pages(self, q: str, course_id: Optional[str] = None, size: int = 10,
+                           semantic: bool = False) -> PageSearchResponse:
+        """Return the best matching pages with highlighted fragments"""
+        try:
+            client = await self._get_client()
+            should = [{"match": {"text_content": {"query": q}}}]
+            if semantic:
+                should.append({
+                    "sparse_vector": {
+                        "field": "text_embedding",
+                        "inference_id": ".elser_model_2",
+                        "query": q
+                    }
+                })
+            query = {"bool": {"should": should, "minimum_should_match": 1}}
+            if course_id:
+                query["bool"]["filter"] = [{"term": {"course_id": course_id}}]
+
+            response = await client.search(
+                index=pages_index,
+                body={
+                    "query": query,
+                    "size": size,
+                    "_source": ["parent_id", "course_id", "title", "page_number"],
+                    "highlight": {
+                        "fields": {"text_content": {"fragment_size": 150, "number_of_fragments": 3}}
+                    }
+                }
+            )
+            pages = []
+            for hit in response["hits"]["hits"]:
+                page_data = hit["_source"]
+                page_data["id"] = hit["_id"]
+                page_data["score"] = hit.get("_score")
+                page_data["highlights"] = hit.get("highlight", {}).get("text_content", [])
+                pages.append(PageHit(**page_data))
+            return PageSearchResponse(pages=pages, total=response["hits"]["total"]["value"])
+        except Exception as e:
+            raise Exception(f"Error searching pages: {str(e)}")
+
+    async def delete_pages(self, parent_id: str) -> int:
+        try:
+            client = await self._get_client()
+            response = await client.delete_by_query(
+                index=pages_index,
+                body={"query": {"term": {"parent_id": parent_id}}},
+                conflicts="proceed",
+                ignore_unavailable=True
+            )
+            return response.get("deleted", 0)
+        except Exception as e:
+            raise Exception(f"Error deleting pages: {str(e)}")
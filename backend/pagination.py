@@ -0,0 +1,15 @@
+import base64
+import json
+
+
+def encode_cursor(sort_values: list) -> str:
+    """Opaque `search_after` cursor from the last hit's sort values"""
+    return base64.urlsafe_b64encode(json.dumps(sort_values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """Sort values back from a cursor; ValueError if it's malformed"""
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(values, list):
+        raise ValueError("Invalid search_after cursor")
+    return values
@@ -0,0 +1,165 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from metrics import span
+import asyncio
+import faulthandler
+import mmap
+import os
+import signal
+from typing import Any, Callable, List, Optional
+
+load_dotenv()
+
+# Don't bother fanning out decks smaller than this many pages per worker
+MIN_PAGES_PER_CHUNK = 8
+
+# A task still running this long past its timeout (stuck in C code, where
+# the alarm can't interrupt it) has its worker process exit
+HARD_TIMEOUT_GRACE = 10.0
+
+
+def _open_mapped(pdf_path: str) -> mmap.mmap:
+    # Workers get a path rather than the bytes, so nothing is pickled across
+    # processes and the page cache backs the parser instead of private heap.
+    with open(pdf_path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _count_pages(pdf_path: str) -> int:
+    import PyPDF2
+
+    with _open_mapped(pdf_path) as mapped:
+        return len(PyPDF2.PdfReader(mapped).pages)
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract text for pages [start, end) in a worker process"""
+    import PyPDF2
+
+    with _open_mapped(pdf_path) as mapped:
+        reader = PyPDF2.PdfReader(mapped)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _init_worker(niceness: int = 0) -> None:
+    # Forked workers inherit uvicorn's SIGTERM/SIGINT handlers, which would
+    # leave them running (and orphaned) when the server is stopped
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Background parsing yields the CPU to the worker serving requests
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+class PdfExtractionTimeout(Exception):
+    pass
+
+
+def _on_deadline(signum, frame):
+    raise PdfExtractionTimeout("PDF processing timed out")
+
+
+def _call_with_deadline(timeout: float, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run `fn(*args)` in a worker, timed from when the worker picks it up.
+
+    Time spent queued behind other documents doesn't count, and a timeout
+    only fails this task: the worker stays in the pool for the next one.
+    """
+    if not hasattr(signal, "setitimer"):
+        return fn(*args)
+    faulthandler.dump_traceback_later(timeout + HARD_TIMEOUT_GRACE, exit=True)
+    signal.signal(signal.SIGALRM, _on_deadline)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    except PdfExtractionTimeout:
+        raise PdfExtractionTimeout(f"PDF processing exceeded {timeout:g}s") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        faulthandler.cancel_dump_traceback_later()
+
+
+class PdfExtractor:
+    """Runs per-page PDF work (text extraction, thumbnails) in a process pool, off the event loop"""
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv('PDF_EXTRACT_WORKERS', '0')) or os.cpu_count() or 1
+        self.timeout = timeout or float(os.getenv('PDF_EXTRACT_TIMEOUT', '60'))
+        self.niceness = int(os.getenv('PDF_EXTRACT_NICE', '10'))
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                             initargs=(self.niceness,))
+        return self._pool
+
+    def _chunks(self, page_count: int) -> List[range]:
+        if page_count == 0:
+            return []
+        n_chunks = max(1, min(self.max_workers, page_count // MIN_PAGES_PER_CHUNK))
+        step = -(-page_count // n_chunks)
+        return [range(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` in the pool under the per-task timeout.
+
+        If a worker died (a hard timeout, or the OOM killer) the pool is
+        broken for every task in it, so it is replaced and the task
+        resubmitted once; a second break is raised as BrokenProcessPool,
+        which the ingest queue retries.
+        """
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                return await asyncio.wrap_future(pool.submit(_call_with_deadline, self.timeout, fn, *args))
+            except BrokenProcessPool:
+                self._discard(pool)
+                if attempt:
+                    raise
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a single `fn(*args)` in the pool, under the same timeout"""
+        with span("pdf", fn.__name__.lstrip("_")):
+            return await self._submit(fn, *args)
+
+    async def map_page_ranges(self, worker: Callable[..., List[Any]], pdf_path: str, *args: Any,
+                              page_count: Optional[int] = None) -> List[Any]:
+        """Run `worker(pdf_path, start, end, *args)` over page ranges in the pool.
+
+        Results are concatenated in page order. Each range gets the timeout
+        from when a worker starts it; if one fails, the ranges not yet
+        started are dropped.
+        """
+        with span("pdf", worker.__name__.lstrip("_")):
+            if page_count is None:
+                page_count = await self._submit(_count_pages, pdf_path)
+            tasks = [asyncio.ensure_future(self._submit(worker, pdf_path, chunk.start, chunk.stop, *args))
+                     for chunk in self._chunks(page_count)]
+            try:
+                parts = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            return [item for part in parts for item in part]
+
+    async def extract_pages(self, pdf_path: str) -> List[str]:
+        """Return the text of every page of the PDF at `pdf_path`, in page order"""
+        return await self.map_page_ranges(_extract_page_range, pdf_path)
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        # Other tasks may already have replaced it
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def join_pages(pages: List[str]) -> str:
+    return "\n".join(pages)
@@ -0,0 +1,202 @@
+from dotenv import load_dotenv
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import importlib.util
+import os
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+load_dotenv()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Compress bodies at least this big in a worker thread (zlib, brotli and
+# zstandard release the GIL) rather than stalling the event loop
+THREADPOOL_THRESHOLD = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON rendered with orjson when it's installed, else the stdlib encoder"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONRoute(APIRoute):
+    """Routes that don't name a response class default to FastJSONResponse.
+
+    It stays a Default(), so routes with a response model keep FastAPI's
+    own path (validated once, dumped straight to bytes by pydantic) and
+    only plain dict/list results come through FastJSONResponse. An app's
+    `default_response_class=Default(...)` can't do this: each route's own
+    Default(JSONResponse) takes precedence over it.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, *, response_class: Any = Default(JSONResponse), **kwargs):
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = Default(FastJSONResponse)
+        super().__init__(path, endpoint, response_class=response_class, **kwargs)
+
+
+class _Encoder:
+    def __init__(self, compress: Callable[[bytes], bytes], finish: Callable[[], bytes]):
+        self._compress = compress
+        self._finish = finish
+
+    def _encode(self, data: bytes, last: bool) -> bytes:
+        out = self._compress(data)
+        return out + self._finish() if last else out
+
+    async def encode(self, data: bytes, last: bool) -> bytes:
+        if len(data) >= THREADPOOL_THRESHOLD:
+            return await run_in_threadpool(self._encode, data, last)
+        return self._encode(data, last)
+
+
+def _gzip_encoder() -> _Encoder:
+    compressor = zlib.compressobj(int(os.getenv('GZIP_LEVEL', '5')), zlib.DEFLATED, 31)
+    return _Encoder(compressor.compress, compressor.flush)
+
+
+def _brotli_encoder() -> _Encoder:
+    import brotli
+
+    compressor = brotli.Compressor(quality=int(os.getenv('BROTLI_QUALITY', '4')))
+    return _Encoder(compressor.process, compressor.finish)
+
+
+def _zstd_encoder() -> _Encoder:
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=int(os.getenv('ZSTD_LEVEL', '3'))).compressobj()
+    return _Encoder(compressor.compress, compressor.flush)
+
+
+# Content-Encoding -> (module it needs, factory)
+ENCODERS: Dict[str, tuple] = {
+    "zstd": ("zstandard", _zstd_encoder),
+    "br": ("brotli", _brotli_encoder),
+    "gzip": (None, _gzip_encoder),
+}
+
+
+def available_encodings(preference: Optional[List[str]] = None) -> List[str]:
+    """Encodings we can produce, in server preference order"""
+    if preference is None:
+        preference = [e.strip() for e in os.getenv('COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(",") if e.strip()]
+    return [
+        name for name in preference
+        if name in ENCODERS and (ENCODERS[name][0] is None or importlib.util.find_spec(ENCODERS[name][0]))
+    ]
+
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the encoding with the highest q-value; ties go to our preference order"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for name in encodings:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressionMiddleware:
+    """Negotiated zstd/br/gzip compression for text and JSON responses.
+
+    Bodies smaller than `minimum_size` are sent as-is. Already-encoded,
+    partial (206) and binary responses (PDFs, thumbnails) are never
+    touched. zstd needs `zstandard` and br needs `brotli`; an encoding
+    whose module isn't installed is simply not offered.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None,
+                 encodings: Optional[List[str]] = None):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+        self.encodings = available_encodings(encodings)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def compressing_send(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is not None:
+                data = await encoder.encode(body, last=not more_body)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            # First body chunk: decide now, with the headers and (maybe) the whole body in hand
+            headers = MutableHeaders(raw=start["headers"])
+            if not self._compressible(start["status"], headers) or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            encoder = ENCODERS[encoding][1]()
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The bytes differ from the identity representation
+                headers["ETag"] = "W/" + etag
+            data = await encoder.encode(body, last=not more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(data))
+            await send(start)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
+
+    @staticmethod
+    def _compressible(status: int, headers: MutableHeaders) -> bool:
+        if status in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,101 @@
+from typing import List, Optional
+from pydantic import BaseModel
+from elasticsearch import AsyncElasticsearch
+from es_client import ESClient
+
+slides_index = "lecture-slides-index"
+
+SEARCH_FIELDS = ["title^2", "text_content"]
+RESULT_FIELDS = ["course_id", "course_name", "filename", "title", "page_count", "uploaded_at"]
+SEARCH_MODES = ("hybrid", "keyword", "semantic")
+
+
+class SlideSearchHit(BaseModel):
+    id: str
+    course_id: str
+    course_name: Optional[str] = None
+    filename: Optional[str] = None
+    title: Optional[str] = None
+    page_count: Optional[int] = None
+    uploaded_at: Optional[str] = None
+    score: Optional[float] = None
+    highlights: List[str] = []
+
+
+class SlideSearchResponse(BaseModel):
+    results: List[SlideSearchHit]
+    total: int
+
+
+class SearchService:
+    """Slide search: BM25 and ELSER sparse vectors, fused with RRF"""
+
+    def __init__(self, client: Optional[AsyncElasticsearch] = None):
+        self.client = client
+
+    async def _get_client(self):
+        # Injected by the ServiceContainer; scripts that build a service on its own get the shared one
+        if self.client is None:
+            self.client = await ESClient.get_client()
+        return self.client
+
+    def _keyword_query(self, q: str) -> dict:
+        return {"multi_match": {"query": q, "fields": SEARCH_FIELDS}}
+
+    def _semantic_query(self, q: str) -> dict:
+        return {
+            "sparse_vector": {
+                "field": "text_embedding",
+                "inference_id": ".elser_model_2",
+                "query": q
+            }
+        }
+
+    def build_body(self, q: str, course_id: Optional[str], offset: int, size: int, mode: str) -> dict:
+        filters = [{"term": {"course_id": course_id}}] if course_id else []
+
+        def filtered(query: dict) -> dict:
+            return {"bool": {"must": [query], "filter": filters}}
+
+        body = {
+            "from": offset,
+            "size": size,
+            "_source": RESULT_FIELDS,
+            "highlight": {
+                "fields": {"text_content": {"fragment_size": 150, "number_of_fragments": 3}},
+                # Highlight from the keyword query; sparse vectors can't be highlighted
+                "highlight_query": self._keyword_query(q)
+            }
+        }
+        if mode == "keyword":
+            body["query"] = filtered(self._keyword_query(q))
+        elif mode == "semantic":
+            body["query"] = filtered(self._semantic_query(q))
+        else:
+            body["retriever"] = {
+                "rrf": {
+                    "retrievers": [
+                        {"standard": {"query": filtered(self._keyword_query(q))}},
+                        {"standard": {"query": filtered(self._semantic_query(q))}}
+                    ],
+                    "rank_window_size": max(100, offset + size),
+                    "rank_constant": 60
+                }
+            }
+        return body
+
+    async def search_slides(self, q: str, course_id: Optional[str] = None, offset: int = 0,
+                            size: int = 10, mode: str = "hybrid") -> SlideSearchResponse:
+        try:
+            client = await self._get_client()
+            response = await client.search(index=slides_index, body=self.build_body(q, course_id, offset, size, mode))
+            results = []
+            for hit in response["hits"]["hits"]:
+                slide_data = hit["_source"]
+                slide_data["id"] = hit["_id"]
+                slide_data["score"] = hit.get("_score")
+                slide_data["highlights"] = hit.get("highlight", {}).get("text_content", [])
+                results.append(SlideSearchHit(**slide_data))
+            return SlideSearchResponse(results=results, total=response["hits"]["total"]["value"])
+        except Exception as e:
+            raise Exception(f"Error searching slides: {str(e)}")
@@ -0,0 +1,295 @@
+from typing import Any, Dict, List, Optional
+from collections import Counter
+from datetime import datetime
+from dotenv import load_dotenv
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from starlette.concurrency import run_in_threadpool
+from es_client import ESClient
+from cache import get_cache
+from blob_store import get_blob_store
+from pdf_extractor import PdfExtractor, join_pages
+from page_service import PageService, pages_index
+from index_management import relaxed_refresh
+from thumbnails import ThumbnailService
+from ingest_queue import IngestQueue
+import asyncio
+import itertools
+import os
+
+load_dotenv()
+
+slides_index = "lecture-slides-index"
+
+TEXT_SNIPPET_LENGTH = 500
+
+# Fields a duplicate upload can reuse instead of re-extracting/re-embedding
+REUSABLE_FIELDS = ["pdf_sha256", "text_content", "text_snippet", "text_embedding", "page_count"]
+
+
+async def _delete_blob(blob_key: str, thumbnail_service: Optional[ThumbnailService]) -> None:
+    await run_in_threadpool(get_blob_store().delete, blob_key)
+    if thumbnail_service is not None:
+        await thumbnail_service.delete(blob_key)
+
+
+async def delete_unreferenced_blobs(client, blob_keys: List[str], thumbnail_service: Optional[ThumbnailService] = None,
+                                    batch_size: int = 1000, ingest_queue: Optional[IngestQueue] = None,
+                                    held: Optional[Dict[str, int]] = None) -> int:
+    """Delete the blobs (and thumbnails) no slide document points at and, given
+    `ingest_queue`, no queued or running job has pinned; blobs are content-addressed,
+    so one may be shared by slides of other courses or an upload still being ingested.
+
+    `held` counts pins the caller holds itself, which don't keep a blob alive.
+    """
+    deleted = 0
+    for i in range(0, len(blob_keys), batch_size):
+        batch = blob_keys[i:i + batch_size]
+        response = await client.search(
+            index=slides_index,
+            body={
+                "size": 0,
+                "query": {"terms": {"blob_key": batch}},
+                "aggs": {"used": {"terms": {"field": "blob_key", "size": len(batch)}}}
+            }
+        )
+        used = {bucket["key"] for bucket in response["aggregations"]["used"]["buckets"]}
+        if ingest_queue is not None:
+            pins = await ingest_queue.blob_pins(batch)
+            used |= {key for key, count in pins.items() if count > (held or {}).get(key, 0)}
+        unused = [key for key in batch if key not in used]
+        await asyncio.gather(*(_delete_blob(key, thumbnail_service) for key in unused))
+        deleted += len(unused)
+    return deleted
+
+
+class SlideIngestService:
+    """Turns stored PDF blobs into slide documents plus per-page documents"""
+
+    def __init__(self, pdf_extractor: PdfExtractor, page_service: PageService,
+                 thumbnail_service: Optional[ThumbnailService] = None,
+                 client: Optional[AsyncElasticsearch] = None,
+                 ingest_queue: Optional[IngestQueue] = None):
+        self.pdf_extractor = pdf_extractor
+        self.page_service = page_service
+        self.thumbnail_service = thumbnail_service
+        # Consulted for blobs of other uploads still waiting to be ingested
+        self.ingest_queue = ingest_queue
+        self.bulk_chunk_size = int(os.getenv('INGEST_BULK_CHUNK_SIZE', '50'))
+        self.bulk_max_bytes = int(os.getenv('INGEST_BULK_MAX_BYTES', str(10 * 1024 * 1024)))
+        self.deduplicate = os.getenv('INGEST_DEDUPLICATE', 'true').lower() == 'true'
+        self.relax_refresh_min_docs = int(os.getenv('INGEST_RELAX_REFRESH_MIN_DOCS', '20'))
+        # Files of one batch extracted at once; more would only queue in the pool
+        self.batch_extract_concurrency = (int(os.getenv('INGEST_BATCH_EXTRACT_CONCURRENCY', '0'))
+                                          or pdf_extractor.max_workers)
+        self.client = client
+
+    async def _get_client(self):
+        # Injected by the ServiceContainer; scripts that build a service on its own get the shared one
+        if self.client is None:
+            self.client = await ESClient.get_client()
+        return self.client
+
+    async def _extract(self, blob_key: str) -> List[str]:
+        # Parse from a file rather than reading the whole blob into memory;
+        # local blobs are used in place, remote ones are streamed to a temp file
+        async with get_blob_store().async_local_copy(blob_key) as pdf_path:
+            pages = await self.pdf_extractor.extract_pages(pdf_path)
+            # Duplicates skip this too: thumbnails are keyed by blob, so they're shared
+            if self.thumbnail_service is not None:
+                await self.thumbnail_service.render_document(blob_key, pdf_path, len(pages))
+            return pages
+
+    async def _find_duplicates(self, items: List[Dict[str, Any]]) -> Dict[str, dict]:
+        """Map pdf_sha256 -> an already-indexed slide hit with the same content"""
+        if not self.deduplicate:
+            return {}
+        client = await self._get_client()
+        hashes = sorted({item["blob_key"] for item in items})
+        response = await client.search(
+            index=slides_index,
+            body={
+                "query": {
+                    "bool": {
+                        "filter": [{"terms": {"pdf_sha256": hashes}}],
+                        # A retried job must not "deduplicate" against itself
+                        "must_not": [{"ids": {"values": [item["document_id"] for item in items]}}]
+                    }
+                },
+                "collapse": {"field": "pdf_sha256"},
+                "size": len(hashes),
+                "_source": REUSABLE_FIELDS
+            }
+        )
+        duplicates = {}
+        for hit in response["hits"]["hits"]:
+            duplicates.setdefault(hit["_source"]["pdf_sha256"], hit)
+        return duplicates
+
+    def _base_doc(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "slide_id": payload["document_id"],
+            "course_id": payload["course_id"],
+            "course_name": payload["course_name"],
+            "filename": payload["filename"],
+            "title": payload["title"],
+            "uploaded_at": payload.get("uploaded_at") or datetime.utcnow().isoformat(),
+            "blob_key": payload["blob_key"],
+            "pdf_sha256": payload["blob_key"],
+            "pdf_size": payload["pdf_size"],
+            "has_binary": True
+        }
+
+    def _build_doc(self, payload: Dict[str, Any], pages: List[str]) -> Dict[str, Any]:
+        text_content = join_pages(pages)
+        return {
+            **self._base_doc(payload),
+            "text_content": text_content,
+            "text_snippet": text_content[:TEXT_SNIPPET_LENGTH],
+            "page_count": len(pages)
+        }
+
+    def _build_doc_from_duplicate(self, payload: Dict[str, Any], duplicate: dict) -> Dict[str, Any]:
+        source = duplicate["_source"]
+        return {
+            **self._base_doc(payload),
+            "text_content": source.get("text_content", ""),
+            "text_snippet": source.get("text_snippet", ""),
+            "text_embedding": source.get("text_embedding"),
+            "page_count": source.get("page_count"),
+            "deduplicated_from": duplicate["_id"]
+        }
+
+    async def ingest(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Ingest job handler; idempotent because document_id is fixed up front"""
+        document_id = payload["document_id"]
+        client = await self._get_client()
+        duplicate = (await self._find_duplicates([payload])).get(payload["blob_key"])
+
+        # wait_for so the course listing reloaded after invalidation includes it
+        if duplicate:
+            # Same bytes already ingested: reuse text and embeddings, skip parsing and ELSER
+            doc = self._build_doc_from_duplicate(payload, duplicate)
+            await client.index(index=slides_index, id=document_id, body=doc, refresh="wait_for")
+            await self.page_service.copy_pages(duplicate["_id"], document_id, payload["course_id"], payload["title"])
+        else:
+            pages = await self._extract(payload["blob_key"])
+            doc = self._build_doc(payload, pages)
+            await client.index(index=slides_index, id=document_id, body=doc,
+                               pipeline="elser-pipeline", refresh="wait_for")
+            await self.page_service.index_pages(document_id, payload["course_id"], payload["title"], pages)
+        await get_cache().delete_prefix(f"slides:{payload['course_id']}:")
+
+        result = {"document_id": document_id, "page_count": doc["page_count"]}
+        if duplicate:
+            result["deduplicated_from"] = duplicate["_id"]
+        return result
+
+    async def ingest_batch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Batch job handler: extract the files a few at a time, index through _bulk.
+
+        Files already in the index (or repeated within the batch) are
+        extracted at most once. Failures are reported per item instead of
+        failing the whole batch.
+        """
+        items = payload["items"]
+        duplicates = await self._find_duplicates(items)
+
+        semaphore = asyncio.Semaphore(self.batch_extract_concurrency)
+
+        async def extract(blob_key: str) -> List[str]:
+            async with semaphore:
+                return await self._extract(blob_key)
+
+        to_extract = sorted({item["blob_key"] for item in items} - set(duplicates))
+        extracted = dict(zip(to_extract, await asyncio.gather(
+            *(extract(blob_key) for blob_key in to_extract),
+            return_exceptions=True
+        )))
+
+        results = {item["document_id"]: {"document_id": item["document_id"], "filename": item["filename"]}
+                   for item in items}
+        slide_actions = []
+        # document_id -> its page actions, indexed only if the slide itself was
+        page_actions: Dict[str, Any] = {}
+        for item in items:
+            result = results[item["document_id"]]
+            duplicate = duplicates.get(item["blob_key"])
+            if duplicate:
+                doc = self._build_doc_from_duplicate(item, duplicate)
+                slide_actions.append({"_index": slides_index, "_id": item["document_id"], "_source": doc})
+                page_actions[item["document_id"]] = await self.page_service.copy_page_actions(
+                    duplicate["_id"], item["document_id"], item["course_id"], item["title"]
+                )
+                result.update(page_count=doc["page_count"], deduplicated_from=duplicate["_id"])
+                continue
+
+            pages = extracted[item["blob_key"]]
+            if isinstance(pages, BaseException):
+                result.update(status="failed", error=f"Extraction failed: {pages}")
+                continue
+            result["page_count"] = len(pages)
+            slide_actions.append({
+                "_index": slides_index,
+                "_id": item["document_id"],
+                "pipeline": "elser-pipeline",
+                "_source": self._build_doc(item, pages)
+            })
+            page_actions[item["document_id"]] = self.page_service.page_actions(
+                item["document_id"], item["course_id"], item["title"], pages
+            )
+
+        client = await self._get_client()
+        bulk_options = {
+            "chunk_size": self.bulk_chunk_size,
+            "max_chunk_bytes": self.bulk_max_bytes,
+            "raise_on_error": False,
+            # async_bulk retries 429-rejected items itself with backoff
+            "max_retries": 3,
+            "initial_backoff": 2
+        }
+        # Big batches index with refresh slowed down and refresh once at the
+        # end, instead of every chunk waiting for its own refresh
+        relax = len(items) >= self.relax_refresh_min_docs
+        async with relaxed_refresh(client, [slides_index, pages_index], enabled=relax) as relaxed:
+            _, slide_errors = await async_bulk(client, slide_actions, refresh=False if relaxed else "wait_for",
+                                               **bulk_options)
+            for error in slide_errors:
+                info = next(iter(error.values()))
+                results[info["_id"]].update(status="failed", error=str(info.get("error")))
+
+            # Pages of a slide that failed to index would be orphans
+            indexed_pages = (actions for document_id, actions in page_actions.items()
+                             if results[document_id].get("status") != "failed")
+            # Page errors only degrade page-level search, so report rather than fail
+            _, page_errors = await async_bulk(client, itertools.chain.from_iterable(indexed_pages), **bulk_options)
+            for error in page_errors:
+                info = next(iter(error.values()))
+                parent_id = info["_id"].rsplit("-", 1)[0]
+                if parent_id in results:
+                    results[parent_id].setdefault("page_errors", 0)
+                    results[parent_id]["page_errors"] += 1
+
+        for course_id in {item["course_id"] for item in items}:
+            await get_cache().delete_prefix(f"slides:{course_id}:")
+
+        for result in results.values():
+            result.setdefault("status", "indexed")
+        failed_blobs = {item["blob_key"] for item in items if results[item["document_id"]]["status"] == "failed"}
+        if failed_blobs:
+            # This job still holds one pin per item until it finishes
+            await delete_unreferenced_blobs(client, sorted(failed_blobs), self.thumbnail_service,
+                                            ingest_queue=self.ingest_queue,
+                                            held=Counter(item["blob_key"] for item in items))
+        succeeded = sum(1 for r in results.values() if r["status"] == "indexed")
+        deduplicated = sum(1 for r in results.values() if "deduplicated_from" in r)
+        return {"indexed": succeeded, "failed": len(results) - succeeded, "deduplicated": deduplicated,
+                "items": list(results.values())}
+
+    async def discard(self, payload: Dict[str, Any]) -> int:
+        """Failure handler for "slide" and "slide_batch" jobs that won't be retried:
+        deletes their blobs unless a slide (such as an earlier identical upload) uses them"""
+        client = await self._get_client()
+        blob_keys = sorted({item["blob_key"] for item in payload.get("items", [payload])})
+        return await delete_unreferenced_blobs(client, blob_keys, self.thumbnail_service,
+                                               ingest_queue=self.ingest_queue)
@@ -0,0 +1,51 @@
+import os
+import sys
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import pytest
+
+# Modules are imported flat from backend/, as uvicorn runs them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def call_asgi(app, method: str, path: str, headers: Optional[Dict[str, str]] = None,
+                    chunks: Optional[List[bytes]] = None) -> SimpleNamespace:
+    """Send one HTTP request straight to an ASGI app (the body in `chunks`);
+    returns its status, headers, body and the request scope"""
+    chunks = list(chunks or [b""])
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80), "state": {},
+    }
+    response = SimpleNamespace(status=None, headers={}, body=b"", scope=scope)
+
+    async def receive():
+        if chunks:
+            chunk = chunks.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+            response.headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response.body += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response
+
+
+@pytest.fixture
+def asgi():
+    return call_asgi
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    """Backend choices from a developer's .env must not leak into tests"""
+    for name in ("INGEST_QUEUE_BACKEND", "CACHE_BACKEND", "WEB_CONCURRENCY"):
+        monkeypatch.delenv(name, raising=False)
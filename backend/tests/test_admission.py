@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from starlette.responses import JSONResponse
+
+from admission import AdmissionControlMiddleware, RouteClassLimiter
+
+
+class SlowApp:
+    """Holds each request until `release` is set"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.entered = 0
+
+    async def __call__(self, scope, receive, send):
+        self.entered += 1
+        await self.release.wait()
+        await JSONResponse({"ok": True})(scope, receive, send)
+
+
+def _middleware(app, queue_size: int = 0, queue_timeout: float = 0.05) -> AdmissionControlMiddleware:
+    limiter = RouteClassLimiter("search", concurrency=1, queue_size=queue_size, queue_timeout=queue_timeout,
+                                collect=False)
+    return AdmissionControlMiddleware(app, {"search": limiter})
+
+
+async def _until(condition) -> None:
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("condition never became true")
+
+
+def test_request_over_a_full_queue_is_shed_with_503(asgi):
+    async def scenario():
+        app = SlowApp()
+        middleware = _middleware(app, queue_size=0)
+
+        first = asyncio.create_task(asgi(middleware, "GET", "/api/search"))
+        await _until(lambda: app.entered == 1)
+
+        shed = await asgi(middleware, "GET", "/api/search")
+        assert shed.status == 503
+        assert int(shed.headers["retry-after"]) >= 1
+        assert "search" in json.loads(shed.body)["detail"]
+        # Never routed, so the metrics middleware learns the route from the scope
+        assert shed.scope["route_template"] == "/api/search"
+        assert app.entered == 1
+
+        app.release.set()
+        assert (await first).status == 200
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_times_out_with_503(asgi):
+    async def scenario():
+        app = SlowApp()
+        middleware = _middleware(app, queue_size=1, queue_timeout=0.02)
+
+        first = asyncio.create_task(asgi(middleware, "GET", "/api/search"))
+        await _until(lambda: app.entered == 1)
+
+        waited = await asgi(middleware, "GET", "/api/search")
+        assert waited.status == 503
+
+        app.release.set()
+        await first
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_is_admitted_when_a_slot_frees(asgi):
+    async def scenario():
+        app = SlowApp()
+        middleware = _middleware(app, queue_size=1, queue_timeout=1.0)
+
+        first = asyncio.create_task(asgi(middleware, "GET", "/api/search"))
+        await _until(lambda: app.entered == 1)
+        second = asyncio.create_task(asgi(middleware, "GET", "/api/search"))
+        await _until(lambda: middleware.limiters["search"].waiting == 1)
+
+        app.release.set()
+        assert (await first).status == 200
+        assert (await second).status == 200
+        assert app.entered == 2
+
+    asyncio.run(scenario())
+
+
+def test_unclassified_routes_are_never_held_back(asgi):
+    async def scenario():
+        app = SlowApp()
+        middleware = _middleware(app, queue_size=0)
+
+        first = asyncio.create_task(asgi(middleware, "GET", "/api/search"))
+        await _until(lambda: app.entered == 1)
+
+        # Note CRUD isn't a limited route class, and nor is a POST to a search path
+        notes = asyncio.create_task(asgi(middleware, "GET", "/api/notes"))
+        other_method = asyncio.create_task(asgi(middleware, "POST", "/api/search"))
+        await _until(lambda: app.entered == 3)
+
+        app.release.set()
+        assert [(await task).status for task in (first, notes, other_method)] == [200, 200, 200]
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from dependencies import check_worker_backends
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use, never by importing the app
+LAZY_ON_IMPORT = ["PyPDF2", "pypdfium2", "pdf_extractor", "thumbnails", "slide_ingest", "course_cleanup",
+                  "motor", "pymongo"]
+
+
+def test_importing_the_app_builds_no_clients_or_ingestion_stack():
+    code = (
+        "import json, sys\n"
+        "import main\n"
+        "container = main.app.state.services\n"
+        f"print(json.dumps({{'loaded': [m for m in {LAZY_ON_IMPORT!r} if m in sys.modules],\n"
+        "                   'es_client_built': 'es_client' in vars(container)}))\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k not in ("ELASTICSEARCH_URL", "MONGODB_URL")}
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True,
+                         text=True, check=True)
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    assert report == {"loaded": [], "es_client_built": False}
+
+
+def test_single_worker_may_use_in_process_backends(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    check_worker_backends()
+
+
+def test_several_workers_need_shared_backends(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with pytest.raises(RuntimeError, match="INGEST_QUEUE_BACKEND and CACHE_BACKEND"):
+        check_worker_backends()
+
+    monkeypatch.setenv("INGEST_QUEUE_BACKEND", "redis")
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    check_worker_backends()
@@ -0,0 +1,116 @@
+import asyncio
+
+from cache import MemoryCache, NullCache
+
+
+def test_get_or_load_loads_once_then_hits():
+    async def scenario():
+        cache = MemoryCache()
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return ["CS101"]
+
+        assert await cache.get_or_load("courses:all", loader) == ["CS101"]
+        assert await cache.get_or_load("courses:all", loader) == ["CS101"]
+        assert len(loads) == 1
+        assert cache.stats.snapshot() == {"courses": {"hits": 1, "misses": 1}}
+
+    asyncio.run(scenario())
+
+
+def test_delete_prefix_drops_only_matching_keys():
+    async def scenario():
+        cache = MemoryCache()
+        await cache.set("slides:CS101:page1", [1])
+        await cache.set("slides:CS101:page2", [2])
+        await cache.set("slides:CS102:page1", [3])
+        await cache.set("folders:all", [4])
+
+        await cache.delete_prefix("slides:CS101:")
+
+        assert await cache.get("slides:CS101:page1") is None
+        assert await cache.get("slides:CS101:page2") is None
+        assert await cache.get("slides:CS102:page1") == [3]
+        assert await cache.get("folders:all") == [4]
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_and_evict_least_recently_used():
+    async def scenario():
+        cache = MemoryCache(max_entries=2, default_ttl=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+
+        await cache.set("short", 1, ttl=0.01)
+        await asyncio.sleep(0.02)
+        assert await cache.get("short") is None
+
+    asyncio.run(scenario())
+
+
+async def _load_racing_invalidation(cache, key: str, invalidate: str):
+    """Start get_or_load(key), run delete_prefix(invalidate) while its loader is
+    in flight, then return what the loader got and what the cache kept"""
+    loading, finish = asyncio.Event(), asyncio.Event()
+
+    async def slow_loader():
+        loading.set()
+        await finish.wait()
+        return ["read before the write"]
+
+    load = asyncio.create_task(cache.get_or_load(key, slow_loader))
+    await loading.wait()
+    await cache.delete_prefix(invalidate)
+    finish.set()
+    return await load, await cache.get(key)
+
+
+def test_load_overlapping_an_invalidation_is_not_written_back():
+    async def scenario():
+        cache = MemoryCache()
+        returned, cached = await _load_racing_invalidation(cache, "slides:CS101:page1", "slides:CS101:")
+        # The caller still gets its result, but a later read must reload
+        assert returned == ["read before the write"]
+        assert cached is None
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_without_a_trailing_colon_still_guards_loads():
+    async def scenario():
+        cache = MemoryCache()
+        _, cached = await _load_racing_invalidation(cache, "slides:CS101:page1", "slides:CS1")
+        assert cached is None
+
+    asyncio.run(scenario())
+
+
+def test_unrelated_invalidation_does_not_block_write_back():
+    async def scenario():
+        cache = MemoryCache()
+        _, cached = await _load_racing_invalidation(cache, "slides:CS101:page1", "slides:CS102:")
+        assert cached == ["read before the write"]
+
+    asyncio.run(scenario())
+
+
+def test_null_cache_always_loads():
+    async def scenario():
+        cache = NullCache()
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return {"n": len(loads)}
+
+        await cache.get_or_load("folders:all", loader)
+        assert await cache.get_or_load("folders:all", loader) == {"n": 2}
+
+    asyncio.run(scenario())
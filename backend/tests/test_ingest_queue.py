@@ -0,0 +1,160 @@
+import asyncio
+
+from elasticsearch import ConnectionError as ESConnectionError
+
+from ingest_queue import (JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, InMemoryJobBackend, IngestQueue,
+                          report_progress)
+
+
+def make_queue(**kwargs) -> IngestQueue:
+    kwargs.setdefault("max_retries", 2)
+    return IngestQueue(backend=InMemoryJobBackend(), concurrency=1, backoff_base=0.001, **kwargs)
+
+
+async def wait_for_status(queue: IngestQueue, job_id: str, *statuses: str, timeout: float = 2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        job = await queue.get(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"job {job_id} stuck in {job.status}")
+
+
+def test_job_moves_from_queued_through_running_to_succeeded():
+    async def scenario():
+        queue = make_queue()
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(payload):
+            started.set()
+            await report_progress({"done": 1})
+            await release.wait()
+            return {"echo": payload["value"]}
+
+        queue.register("echo", handler)
+        job = await queue.submit("echo", {"value": 42})
+        assert job.status == JOB_QUEUED
+
+        await queue.start()
+        try:
+            await started.wait()
+            running = await queue.get(job.id)
+            assert running.status == JOB_RUNNING
+            assert running.attempts == 1
+            assert running.progress == {"done": 1}
+
+            release.set()
+            done = await wait_for_status(queue, job.id, JOB_SUCCEEDED, JOB_FAILED)
+            assert done.status == JOB_SUCCEEDED
+            assert done.result == {"echo": 42}
+            assert done.error is None
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_retryable_error_requeues_then_succeeds():
+    async def scenario():
+        queue = make_queue()
+        calls = []
+
+        async def flaky(payload):
+            calls.append(payload)
+            if len(calls) == 1:
+                raise ESConnectionError("connection reset")
+            return {"ok": True}
+
+        queue.register("flaky", flaky)
+        await queue.start()
+        try:
+            job = await queue.submit("flaky", {})
+            done = await wait_for_status(queue, job.id, JOB_SUCCEEDED, JOB_FAILED)
+            assert done.status == JOB_SUCCEEDED
+            assert done.attempts == 2
+            assert done.error is None
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_permanent_error_fails_once_and_runs_the_failure_handler():
+    async def scenario():
+        queue = make_queue()
+        calls, cleaned = [], []
+
+        async def broken(payload):
+            calls.append(payload)
+            raise ValueError("not a PDF")
+
+        async def discard(payload):
+            # The job's own pins are released before cleanup runs
+            cleaned.append(await queue.blob_pins([payload["blob_key"]]))
+
+        queue.register("broken", broken, on_failure=discard)
+        await queue.start()
+        try:
+            await queue.pin_blobs(["abc"])
+            job = await queue.submit("broken", {"blob_key": "abc"}, pins=["abc"])
+            done = await wait_for_status(queue, job.id, JOB_FAILED, JOB_SUCCEEDED)
+            assert done.status == JOB_FAILED
+            assert done.error == "not a PDF"
+            assert len(calls) == 1
+            for _ in range(100):
+                if cleaned:
+                    break
+                await asyncio.sleep(0.005)
+            assert cleaned == [{}]
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_retries_stop_after_max_retries():
+    async def scenario():
+        queue = make_queue(max_retries=2)
+
+        async def down(payload):
+            raise ESConnectionError("cluster unreachable")
+
+        queue.register("down", down)
+        await queue.start()
+        try:
+            job = await queue.submit("down", {})
+            done = await wait_for_status(queue, job.id, JOB_FAILED, JOB_SUCCEEDED)
+            assert done.status == JOB_FAILED
+            assert done.attempts == 3
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_pins_are_counted_and_released_by_the_job():
+    async def scenario():
+        queue = make_queue()
+
+        async def ok(payload):
+            return {}
+
+        queue.register("ok", ok)
+        await queue.pin_blobs(["a", "a", "b"])
+        assert await queue.blob_pins(["a", "b", "c"]) == {"a": 2, "b": 1}
+
+        await queue.start()
+        try:
+            job = await queue.submit("ok", {}, pins=["a", "b"])
+            await wait_for_status(queue, job.id, JOB_SUCCEEDED)
+            for _ in range(100):
+                if await queue.blob_pins(["b"]) == {}:
+                    break
+                await asyncio.sleep(0.005)
+            assert await queue.blob_pins(["a", "b"]) == {"a": 1}
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+
+from blob_store import CHUNK_SIZE, LocalBlobStore
+from upload_limits import MB, UploadSizeLimitMiddleware
+
+
+def _app(limit: int):
+    app = FastAPI()
+    app.state.bodies = []
+
+    @app.post("/api/upload")
+    async def upload(request: Request):
+        body = b""
+        async for chunk in request.stream():
+            body += chunk
+        app.state.bodies.append(body)
+        return {"size": len(body)}
+
+    @app.post("/api/notes")
+    async def notes(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, limits={"/api/upload": limit})
+    return app
+
+
+def test_declared_oversize_body_is_refused_before_reading(asgi):
+    app = _app(limit=MB)
+    response = asyncio.run(asgi(app, "POST", "/api/upload", headers={"Content-Length": str(2 * MB)},
+                                chunks=[b"x" * 10]))
+    assert response.status == 413
+    assert json.loads(response.body)["detail"] == "Upload exceeds the 1 MB limit"
+    assert app.state.bodies == []
+
+
+def test_streamed_body_is_cut_off_once_it_crosses_the_limit(asgi):
+    # Chunked: no Content-Length, so only the bytes received give it away
+    app = _app(limit=1000)
+    response = asyncio.run(asgi(app, "POST", "/api/upload", chunks=[b"x" * 600, b"x" * 600, b"x" * 600]))
+    assert response.status == 413
+    assert app.state.bodies == []
+
+
+def test_body_within_the_limit_passes_through(asgi):
+    app = _app(limit=1000)
+    response = asyncio.run(asgi(app, "POST", "/api/upload", headers={"Content-Length": "900"},
+                                chunks=[b"x" * 500, b"x" * 400]))
+    assert response.status == 200
+    assert json.loads(response.body) == {"size": 900}
+
+
+def test_other_routes_are_not_limited(asgi):
+    app = _app(limit=10)
+    response = asyncio.run(asgi(app, "POST", "/api/notes", headers={"Content-Length": "100"},
+                                chunks=[b"x" * 100]))
+    assert response.status == 200
+
+
+class ChunkCountingFile(io.BytesIO):
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.largest_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.largest_read = max(self.largest_read, len(chunk))
+        return chunk
+
+
+def test_blob_store_copies_in_chunks_and_keys_by_content(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    data = os.urandom(3 * CHUNK_SIZE + 123)
+    upload = ChunkCountingFile(data)
+
+    key = store.put_file(upload)
+
+    assert key == hashlib.sha256(data).hexdigest()
+    assert upload.largest_read == CHUNK_SIZE
+    assert store.read(key) == data
+    # An identical upload shares the blob and leaves no temp file behind
+    assert store.put_file(io.BytesIO(data)) == key
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_blob_store_rejects_a_digest_mismatch(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.put_file(io.BytesIO(b"%PDF-1.4"), digest="0" * 64)
+    assert os.listdir(tmp_path) == []
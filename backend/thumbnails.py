@@ -0,0 +1,105 @@
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from blob_store import get_blob_store
+from pdf_extractor import PdfExtractor
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_MEDIA_TYPES = {"webp": "image/webp", "png": "image/png"}
+
+
+def _render_page_range(pdf_path: str, start: int, end: int, out_dir: str, width: int, fmt: str) -> List[str]:
+    """Render pages [start, end) to `out_dir/<page_number>.<fmt>` in a worker process"""
+    import pypdfium2 as pdfium
+
+    os.makedirs(out_dir, exist_ok=True)
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        written = []
+        for i in range(start, min(end, len(pdf))):
+            page = pdf[i]
+            image = page.render(scale=width / page.get_width()).to_pil()
+            path = os.path.join(out_dir, f"{i + 1}.{fmt}")
+            fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".part")
+            with os.fdopen(fd, "wb") as tmp:
+                image.save(tmp, format=fmt.upper(), **({"quality": 70} if fmt == "webp" else {"optimize": True}))
+            os.replace(tmp_path, path)
+            written.append(path)
+        return written
+    finally:
+        pdf.close()
+
+
+class ThumbnailService:
+    """Low-resolution page images, rendered in the PDF worker pool.
+
+    Thumbnails are cached on disk under the PDF's content hash, so
+    duplicate uploads share them and a cached image never goes stale.
+    """
+
+    def __init__(self, pdf_extractor: PdfExtractor):
+        self.pdf_extractor = pdf_extractor
+        self.root = os.getenv('THUMBNAIL_CACHE_PATH', 'data/thumbnails')
+        self.width = int(os.getenv('THUMBNAIL_WIDTH', '320'))
+        self.format = os.getenv('THUMBNAIL_FORMAT', 'webp').lower()
+        if self.format not in THUMBNAIL_MEDIA_TYPES:
+            raise ValueError(f"Unsupported THUMBNAIL_FORMAT: {self.format}")
+        # pypdfium2 renders, Pillow encodes (`to_pil()` needs it too)
+        self.enabled = (os.getenv('THUMBNAILS_ENABLED', 'true').lower() == 'true'
+                        and all(importlib.util.find_spec(name) is not None for name in ("pypdfium2", "PIL")))
+
+    @property
+    def media_type(self) -> str:
+        return THUMBNAIL_MEDIA_TYPES[self.format]
+
+    def _dir(self, blob_key: str) -> str:
+        # Width is part of the path so changing it never serves old sizes
+        return os.path.join(self.root, blob_key[:2], blob_key, f"w{self.width}")
+
+    def path(self, blob_key: str, page_number: int) -> str:
+        return os.path.join(self._dir(blob_key), f"{page_number}.{self.format}")
+
+    def etag(self, blob_key: str, page_number: int) -> str:
+        return f'"{blob_key}-{page_number}-w{self.width}.{self.format}"'
+
+    async def render_document(self, blob_key: str, pdf_path: str, page_count: Optional[int] = None) -> int:
+        """Render every page of a PDF; failures are logged, never raised, so ingestion carries on"""
+        if not self.enabled:
+            return 0
+        try:
+            written = await self.pdf_extractor.map_page_ranges(
+                _render_page_range, pdf_path, self._dir(blob_key), self.width, self.format,
+                page_count=page_count
+            )
+            return len(written)
+        except Exception as e:
+            logger.warning("Thumbnail rendering failed for blob %s: %s", blob_key, e)
+            return 0
+
+    async def get_or_render(self, blob_key: str, page_number: int) -> Optional[str]:
+        """Path of a page's thumbnail, rendering it from the blob if it isn't cached yet.
+
+        Returns None when the page doesn't exist.
+        """
+        path = self.path(blob_key, page_number)
+        if os.path.exists(path):
+            return path
+
+        # Slides ingested before thumbnails existed: render just this page
+        async with get_blob_store().async_local_copy(blob_key) as pdf_path:
+            written = await self.pdf_extractor.run(
+                _render_page_range, pdf_path, page_number - 1, page_number,
+                self._dir(blob_key), self.width, self.format
+            )
+        return written[0] if written else None
+
+    async def delete(self, blob_key: str) -> None:
+        await run_in_threadpool(shutil.rmtree, os.path.join(self.root, blob_key[:2], blob_key), True)
@@ -0,0 +1,61 @@
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import os
+from typing import Dict, Optional
+
+load_dotenv()
+
+MB = 1024 * 1024
+
+
+def upload_limits_from_env() -> Dict[str, int]:
+    """Request body limits (bytes) per upload route, from MAX_UPLOAD_MB / MAX_BATCH_UPLOAD_MB"""
+    return {
+        "/api/upload": int(float(os.getenv('MAX_UPLOAD_MB', '100')) * MB),
+        "/api/upload/batch": int(float(os.getenv('MAX_BATCH_UPLOAD_MB', '1024')) * MB),
+    }
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized upload bodies with 413 before they are spooled.
+
+    A declared Content-Length over the limit is refused before a single body
+    byte is read. Chunked or lying clients are cut off as soon as the bytes
+    actually received cross the limit.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.limits = limits if limits is not None else upload_limits_from_env()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": self._detail(limit)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # HTTPException passes through FastAPI's body parsing untouched
+                    raise HTTPException(status_code=413, detail=self._detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    def _detail(limit: int) -> str:
+        return f"Upload exceeds the {limit / MB:g} MB limit"
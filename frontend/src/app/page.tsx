@@ -1,7 +1,7 @@
 "use client";
 
-import { useState, useEffect } from "react";
-import { apiService, Course, NoteResponse, FolderResponse } from "@/services/api";
+import { useState, useEffect, useRef } from "react";
+import { apiService, ApiError, noteSplice, Course, NoteResponse, NoteSummary, NoteListParams, FolderResponse } from "@/services/api";
 import AgentChat from "@/components/AgentChat";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
@@ -20,12 +20,18 @@ import ReactMarkdown from "react-markdown";
 
 type TabType = "slides" | "upload" | "addCourse" | "notes";
 
+// "" leaves the order to the server: relevance when searching, else most recently updated
+type NoteSort = "" | Exclude<NoteListParams["sort"], "_score" | undefined>;
+
+const NOTES_PAGE_SIZE = 50;
+
 interface SlideData {
   id: string;
   title: string;
   filename: string;
   has_binary?: boolean;
-  text_content: string;
+  page_count?: number;
+  text_snippet: string;
 }
 
 interface CourseWithSlides extends Course {
@@ -64,8 +70,13 @@ export default function Home() {
     name: ""
   });
 
-  const [notes, setNotes] = useState<NoteResponse[]>([]);
+  // Unassigned notes, one server page at a time
+  const [notes, setNotes] = useState<NoteSummary[]>([]);
+  const [notesCursor, setNotesCursor] = useState<string | null>(null);
   const [notesLoading, setNotesLoading] = useState(false);
+  const [noteQuery, setNoteQuery] = useState("");
+  const [noteSort, setNoteSort] = useState<NoteSort>("");
+  const notesRequest = useRef(0);
   const [noteForm, setNoteForm] = useState({
     title: "",
     notes: "",
@@ -75,6 +86,9 @@ export default function Home() {
   const [notePreview, setNotePreview] = useState(false);
   const [editNoteMarkdown, setEditNoteMarkdown] = useState("");
   const [editNoteTitle, setEditNoteTitle] = useState("");
+  // Last text/title the server acknowledged while editing, and its version
+  const autosaved = useRef<{ noteId: string; version: number; notes: string; title: string } | null>(null);
+  const autosaveChain = useRef<Promise<void>>(Promise.resolve());
 
   const [folders, setFolders] = useState<FolderResponse[]>([]);
   const [, setFoldersLoading] = useState(false);
@@ -83,8 +97,12 @@ export default function Home() {
   });
   const [editingFolder, setEditingFolder] = useState<string | null>(null);
   const [expandedFolders, setExpandedFolders] = useState<Set<string>>(new Set());
+  const [folderNotes, setFolderNotes] = useState<{ [key: string]: NoteSummary[] }>({});
+  const [folderNotesCursor, setFolderNotesCursor] = useState<{ [key: string]: string | null }>({});
   const [selectedNote, setSelectedNote] = useState<NoteResponse | null>(null);
   const [showAddToFolder, setShowAddToFolder] = useState<string | null>(null);
+  const [addCandidates, setAddCandidates] = useState<NoteSummary[]>([]);
+  const [addCandidatesCursor, setAddCandidatesCursor] = useState<string | null>(null);
 
   useEffect(() => {
     fetchCourses();
@@ -92,11 +110,17 @@ export default function Home() {
 
   useEffect(() => {
     if (activeTab === "notes") {
-      fetchNotes();
       fetchFolders();
     }
   }, [activeTab]);
 
+  // Search and sort run on the server; wait for typing to pause
+  useEffect(() => {
+    if (activeTab !== "notes") return;
+    const timer = setTimeout(() => fetchNotes(), 300);
+    return () => clearTimeout(timer);
+  }, [activeTab, noteQuery, noteSort]);
+
   const fetchCourses = async () => {
     try {
       setLoading(true);
@@ -116,10 +140,16 @@ export default function Home() {
 
   const fetchSlidesForCourse = async (courseId: string) => {
     try {
-      const slides = await apiService.getSlidesByCourse(courseId) as { slides?: SlideData[] };
+      const slides: SlideData[] = [];
+      let cursor: string | undefined;
+      do {
+        const page = await apiService.getSlidesByCourse(courseId, cursor);
+        slides.push(...(page.slides || []));
+        cursor = page.next_cursor ?? undefined;
+      } while (cursor);
       setSlidesData(prev => ({
         ...prev,
-        [courseId]: slides.slides || []
+        [courseId]: slides
       }));
     } catch (err) {
       console.error(`Failed to fetch slides for course ${courseId}:`, err);
@@ -143,7 +173,7 @@ export default function Home() {
     setExpandedCourses(newExpanded);
   };
 
-  const toggleSlide = async (slideId: string, documentId: string, hasBinary: boolean) => {
+  const toggleSlide = async (slideId: string, documentId: string, hasBinary: boolean, pageCount?: number) => {
     const newExpanded = new Set(expandedSlides);
     const slideKey = slideId;
     
@@ -152,18 +182,23 @@ export default function Home() {
     } else {
       newExpanded.add(slideKey);
       
-      if (hasBinary && !pdfDataUrls[documentId]) {
-        try {
-          await loadPdfBinary(slideId, documentId);
-        } catch (error) {
-          console.error('Failed to load PDF:', error);
-          setError('Failed to load PDF content');
-        }
+      // Decks with thumbnails preview from page images; the full PDF loads on demand
+      if (hasBinary && !pdfDataUrls[documentId] && !pageCount) {
+        await openPdf(slideId, documentId);
       }
     }
     setExpandedSlides(newExpanded);
   };
 
+  const openPdf = async (slideId: string, documentId: string) => {
+    try {
+      await loadPdfBinary(slideId, documentId);
+    } catch (error) {
+      console.error('Failed to load PDF:', error);
+      setError('Failed to load PDF content');
+    }
+  };
+
   const handleAddCourse = async () => {
     if (!courseForm.id || !courseForm.name) {
       setError("Please fill in all fields");
@@ -195,13 +230,15 @@ export default function Home() {
     try {
       setError(null);
       setSuccess(null);
-      await apiService.uploadPdf(
+      const upload = await apiService.uploadPdf(
         uploadForm.pdfFile,
         uploadForm.courseId,
         courses.find(c => c.id === uploadForm.courseId)?.name || "",
         uploadForm.title
       );
       
+      setSuccess("Slide uploaded, processing...");
+      await apiService.waitForJob(upload.job_id);
       setSuccess("Slide uploaded successfully!");
       setUploadForm({ title: "", courseId: "", pdfFile: null });
       if (expandedCourses.has(uploadForm.courseId)) {
@@ -212,18 +249,36 @@ export default function Home() {
     }
   };
 
-  const fetchNotes = async () => {
+  // First page of unassigned notes, or the next one when `more` is set
+  const fetchNotes = async (more: boolean = false) => {
+    const request = ++notesRequest.current;
     try {
       setNotesLoading(true);
-      const notesData = await apiService.getNotes();
-      setNotes(notesData);
+      const page = await apiService.listNotes({
+        unassigned: true,
+        q: noteQuery.trim() || undefined,
+        sort: noteSort || undefined,
+        order: noteSort === "title.keyword" ? "asc" : "desc",
+        size: NOTES_PAGE_SIZE,
+        search_after: more ? notesCursor ?? undefined : undefined,
+      });
+      // A newer search has replaced this one
+      if (request !== notesRequest.current) return;
+      setNotes(prev => more ? [...prev, ...page.notes] : page.notes);
+      setNotesCursor(page.next_cursor);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to fetch notes");
     } finally {
-      setNotesLoading(false);
+      if (request === notesRequest.current) setNotesLoading(false);
     }
   };
 
+  // Reload only what a note change touched: the folders it left or joined, or the unassigned list
+  const refreshNotes = async (folderIds: (string | undefined)[]) => {
+    const touched = new Set(folderIds.map(id => id || ""));
+    await Promise.all(Array.from(touched).map(id => id ? refreshFolder(id) : fetchNotes()));
+  };
+
   const handleCreateNote = async () => {
     if (!noteForm.title.trim()) {
       setError("Please enter a title");
@@ -237,7 +292,7 @@ export default function Home() {
     try {
       setError(null);
       setSuccess(null);
-      await apiService.createNote({ 
+      const created = await apiService.createNote({ 
         title: noteForm.title,
         notes: noteForm.notes,
         folder_id: noteForm.folder_id || undefined
@@ -245,7 +300,7 @@ export default function Home() {
       setSuccess("Note created successfully!");
       setNoteForm({ title: "", notes: "", folder_id: "" });
       setNotePreview(false);
-      await fetchNotes();
+      await refreshNotes([created.folder_id]);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to create note");
     }
@@ -264,16 +319,71 @@ export default function Home() {
     try {
       setError(null);
       setSuccess(null);
-      await apiService.updateNote(noteId, { notes: updatedNotes, title: updatedTitle });
+      // The full save supersedes autosave; let an in-flight patch land first
+      autosaved.current = null;
+      await autosaveChain.current;
+      const updated = await apiService.updateNote(noteId, { notes: updatedNotes, title: updatedTitle });
+      setSelectedNote(updated);
       setSuccess("Note updated successfully!");
       setEditingNote(null);
-      await fetchNotes();
+      await refreshNotes([updated.folder_id]);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to update note");
     }
   };
 
-  const handleDeleteNote = async (noteId: string) => {
+  const startEditingNote = (note: NoteResponse) => {
+    autosaved.current = { noteId: note.id, version: note.version ?? 0, notes: note.notes, title: note.title };
+    setEditingNote(note.id);
+    setEditNoteMarkdown(note.notes);
+    setEditNoteTitle(note.title);
+  };
+
+  // Patches are serialized so each one is sent against the version the previous returned
+  const autosaveNote = (notes: string, title: string, flush: boolean = false) => {
+    const run = async (retried: boolean): Promise<void> => {
+      const saved = autosaved.current;
+      if (!saved) return;
+      const splice = noteSplice(saved.notes, notes);
+      const titleChanged = title.trim() !== "" && title !== saved.title;
+      if (!splice && !titleChanged && !flush) return;
+      try {
+        const result = await apiService.patchNote(saved.noteId, {
+          version: saved.version,
+          ops: splice ? [splice] : [],
+          title: titleChanged ? title : undefined,
+        }, flush);
+        autosaved.current = { ...saved, version: result.version, notes, title: titleChanged ? title : saved.title };
+      } catch (err) {
+        if (err instanceof ApiError && err.status === 409 && !retried) {
+          // Changed elsewhere: re-apply our text on top of the current version
+          const current = await apiService.getNote(saved.noteId);
+          autosaved.current = { noteId: current.id, version: current.version, notes: current.notes, title: current.title };
+          return run(true);
+        }
+        setError(err instanceof Error ? err.message : "Failed to autosave note");
+      }
+    };
+    autosaveChain.current = autosaveChain.current.then(() => run(false));
+    return autosaveChain.current;
+  };
+
+  useEffect(() => {
+    if (!editingNote) return;
+    const timer = setTimeout(() => autosaveNote(editNoteMarkdown, editNoteTitle), 1000);
+    return () => clearTimeout(timer);
+  }, [editingNote, editNoteMarkdown, editNoteTitle]);
+
+  // Listings only carry snippets; load the full note when it's opened
+  const selectNote = async (noteId: string) => {
+    try {
+      setSelectedNote(await apiService.getNote(noteId));
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Failed to load note");
+    }
+  };
+
+  const handleDeleteNote = async (note: NoteResponse) => {
     if (!confirm("Are you sure you want to delete this note?")) {
       return;
     }
@@ -281,9 +391,9 @@ export default function Home() {
     try {
       setError(null);
       setSuccess(null);
-      await apiService.deleteNote(noteId);
+      await apiService.deleteNote(note.id);
       setSuccess("Note deleted successfully!");
-      await fetchNotes();
+      await refreshNotes([note.folder_id]);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to delete note");
     }
@@ -301,6 +411,35 @@ export default function Home() {
     }
   };
 
+  // First page of a folder's notes, or the next one when `more` is set
+  const fetchFolderNotes = async (folderId: string, more: boolean = false) => {
+    try {
+      const page = await apiService.getFolderNotes(folderId, more ? folderNotesCursor[folderId] ?? undefined : undefined);
+      setFolderNotes(prev => ({ ...prev, [folderId]: more ? [...(prev[folderId] || []), ...page.notes] : page.notes }));
+      setFolderNotesCursor(prev => ({ ...prev, [folderId]: page.next_cursor }));
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Failed to fetch folder notes");
+    }
+  };
+
+  // New count from the server; contents reload now if shown, else on the next expand
+  const refreshFolder = async (folderId: string) => {
+    try {
+      const folder = await apiService.getFolder(folderId);
+      setFolders(prev => prev.map(f => f.id === folderId ? folder : f));
+      if (expandedFolders.has(folderId)) {
+        await fetchFolderNotes(folderId);
+      } else {
+        setFolderNotes(prev => {
+          const { [folderId]: _stale, ...rest } = prev;
+          return rest;
+        });
+      }
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Failed to fetch folder");
+    }
+  };
+
   const handleCreateFolder = async () => {
     if (!folderForm.name.trim()) {
       setError("Please enter a folder name");
@@ -350,33 +489,64 @@ export default function Home() {
       const newExpanded = new Set(expandedFolders);
       newExpanded.delete(folderId);
       setExpandedFolders(newExpanded);
+      setFolderNotes(prev => {
+        const { [folderId]: _removed, ...rest } = prev;
+        return rest;
+      });
       if (selectedNote && folders.find(f => f.id === folderId)) {
         setSelectedNote(null);
       }
-      await fetchFolders();
+      setFolders(prev => prev.filter(f => f.id !== folderId));
+      // Its notes are now unassigned
+      await fetchNotes();
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to delete folder");
     }
   };
 
-  const toggleFolder = (folderId: string) => {
+  const toggleFolder = async (folderId: string) => {
     const newExpanded = new Set(expandedFolders);
     if (newExpanded.has(folderId)) {
       newExpanded.delete(folderId);
     } else {
       newExpanded.add(folderId);
+      if (!folderNotes[folderId]) {
+        await fetchFolderNotes(folderId);
+      }
     }
     setExpandedFolders(newExpanded);
   };
 
-  const handleAddNoteToFolder = async (noteId: string, folderId: string) => {
+  // Any note not already in the folder can be moved into it
+  const fetchAddCandidates = async (folderId: string, more: boolean = false) => {
+    try {
+      const page = await apiService.listNotes({
+        size: NOTES_PAGE_SIZE,
+        search_after: more ? addCandidatesCursor ?? undefined : undefined,
+      });
+      const candidates = page.notes.filter(n => n.folder_id !== folderId);
+      setAddCandidates(prev => more ? [...prev, ...candidates] : candidates);
+      setAddCandidatesCursor(page.next_cursor);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Failed to fetch notes");
+    }
+  };
+
+  const openAddToFolder = async (folderId: string) => {
+    setAddCandidates([]);
+    setAddCandidatesCursor(null);
+    setShowAddToFolder(folderId);
+    await fetchAddCandidates(folderId);
+  };
+
+  const handleAddNoteToFolder = async (note: NoteSummary, folderId: string) => {
     try {
       setError(null);
       setSuccess(null);
-      await apiService.updateNote(noteId, { folder_id: folderId });
+      await apiService.updateNote(note.id, { folder_id: folderId });
       setSuccess("Note added to folder!");
       setShowAddToFolder(null);
-      await fetchNotes();
+      await refreshNotes([note.folder_id, folderId]);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to add note to folder");
     }
@@ -404,16 +574,7 @@ export default function Home() {
     }
 
     try {
-      const pdfData = await apiService.getPdfBinary(documentId);
-      const base64Content = pdfData.pdf_binary;
-      
-      const binaryString = atob(base64Content);
-      const bytes = new Uint8Array(binaryString.length);
-      for (let i = 0; i < binaryString.length; i++) {
-        bytes[i] = binaryString.charCodeAt(i);
-      }
-      
-      const blob = new Blob([bytes], { type: 'application/pdf' });
+      const blob = await apiService.getPdfBlob(documentId);
       const objectUrl = URL.createObjectURL(blob);
       
       setPdfDataUrls(prev => ({
@@ -580,7 +741,7 @@ export default function Home() {
                                 style={{ borderColor: "oklch(1 0 0 / 10%)" }}
                               >
                                 <button
-                                  onClick={() => toggleSlide(`${course.id}-${slide.id || index}`, slide.id, slide.has_binary || false)}
+                                  onClick={() => toggleSlide(`${course.id}-${slide.id || index}`, slide.id, slide.has_binary || false, slide.page_count)}
                                   className="w-full px-4 py-3 flex items-center justify-between hover:bg-muted/30 transition-colors"
                                 >
                                   <span className="text-sm" style={{ color: "oklch(0.9 0 0)" }}>{slide.title}</span>
@@ -594,6 +755,15 @@ export default function Home() {
                                     <div className="flex items-center justify-between mb-4">
                                       <div className="text-sm text-muted-foreground">{slide.filename}</div>
                                       <div className="flex items-center space-x-3">
+                                        {slide.has_binary && !pdfDataUrls[slide.id] && (
+                                          <Button
+                                            size="sm"
+                                            onClick={() => openPdf(`${course.id}-${slide.id || index}`, slide.id)}
+                                            style={{ backgroundColor: "#0B64DD" }}
+                                          >
+                                            Open PDF
+                                          </Button>
+                                        )}
                                         <Button
                                           size="sm"
                                           onClick={() => handleDeleteSlide(slide.id, course.id)}
@@ -623,6 +793,19 @@ export default function Home() {
                                               }
                                             }}
                                           />
+                                        ) : (slide.has_binary && slide.page_count) ? (
+                                          <div className="grid grid-cols-3 gap-2 h-full overflow-auto p-2">
+                                            {Array.from({ length: slide.page_count }, (_, i) => (
+                                              <img
+                                                key={i}
+                                                src={apiService.getThumbnailUrl(slide.id, i + 1)}
+                                                alt={`${slide.title} page ${i + 1}`}
+                                                loading="lazy"
+                                                className="w-full rounded border"
+                                                style={{ borderColor: "oklch(1 0 0 / 10%)" }}
+                                              />
+                                            ))}
+                                          </div>
                                         ) : slide.has_binary ? (
                                           <div className="flex items-center justify-center h-full text-muted-foreground">
                                             <div className="text-center">
@@ -655,8 +838,8 @@ export default function Home() {
                                               style={{ backgroundColor: "oklch(0.1 0 0)", borderColor: "oklch(1 0 0 / 10%)" }}
                                             >
                                               <div className="text-sm font-mono whitespace-pre-wrap" style={{ color: "oklch(0.9 0 0)" }}>
-                                                {slide.text_content.substring(0, 500)}
-                                                {slide.text_content.length > 500 ? '...' : ''}
+                                                {slide.text_snippet}
+                                                {slide.text_snippet.length >= 500 ? '...' : ''}
                                               </div>
                                             </div>
                                           </div>
@@ -833,7 +1016,7 @@ export default function Home() {
                     </button>
 
                   {folders.map((folder) => {
-                    const folderNotes = notes.filter(n => n.folder_id === folder.id);
+                    const notesInFolder = folderNotes[folder.id] || [];
                     const isExpanded = expandedFolders.has(folder.id);
                     
                     return (
@@ -880,13 +1063,13 @@ export default function Home() {
                                   <path d="M2 6a2 2 0 012-2h5l2 2h5a2 2 0 012 2v6a2 2 0 01-2 2H4a2 2 0 01-2-2V6z" />
                                 </svg>
                                 <span className="truncate">{folder.folder_name}</span>
-                                <span className="ml-auto text-xs text-muted-foreground">{folderNotes.length}</span>
+                                <span className="ml-auto text-xs text-muted-foreground">{folder.note_count}</span>
                               </button>
                               <div className="hidden group-hover:flex items-center">
                                 <Button
                                   size="sm"
                                   variant="ghost"
-                                  onClick={() => setShowAddToFolder(folder.id)}
+                                  onClick={() => openAddToFolder(folder.id)}
                                 >
                                   <svg className="w-3 h-3" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                                     <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M12 4v16m8-8H4" />
@@ -916,13 +1099,13 @@ export default function Home() {
                             
                             {isExpanded && (
                               <div className="ml-6 space-y-1">
-                                {folderNotes.length === 0 ? (
+                                {notesInFolder.length === 0 ? (
                                   <div className="text-xs text-muted-foreground px-3 py-1">No pages</div>
                                 ) : (
-                                  folderNotes.map((note) => (
+                                  notesInFolder.map((note) => (
                                     <button
                                       key={note.id}
-                                      onClick={() => setSelectedNote(note)}
+                                      onClick={() => selectNote(note.id)}
                                       className={`w-full flex items-center space-x-2 px-3 py-2 rounded-lg text-sm text-left transition-colors ${
                                         selectedNote?.id === note.id
                                           ? "bg-primary text-primary-foreground"
@@ -936,6 +1119,14 @@ export default function Home() {
                                     </button>
                                   ))
                                 )}
+                                {folderNotesCursor[folder.id] && (
+                                  <button
+                                    onClick={() => fetchFolderNotes(folder.id, true)}
+                                    className="w-full px-3 py-1 rounded-lg text-xs text-left text-muted-foreground hover:bg-muted/50 transition-colors"
+                                  >
+                                    Load more
+                                  </button>
+                                )}
                               </div>
                             )}
                           </div>
@@ -968,11 +1159,7 @@ export default function Home() {
                       <Button
                         variant="ghost"
                         size="sm"
-                        onClick={() => {
-                          setEditingNote(selectedNote.id);
-                          setEditNoteMarkdown(selectedNote.notes);
-                          setEditNoteTitle(selectedNote.title);
-                        }}
+                        onClick={() => startEditingNote(selectedNote)}
                       >
                         <svg className="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                           <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M15.232 5.232l3.536 3.536m-2.036-5.036a2.5 2.5 0 113.536 3.536L6.5 21.036H3v-3.572L16.732 3.732z" />
@@ -981,7 +1168,7 @@ export default function Home() {
                       <Button
                         variant="ghost"
                         size="sm"
-                        onClick={() => handleDeleteNote(selectedNote.id)}
+                        onClick={() => handleDeleteNote(selectedNote)}
                         style={{ color: "#C61E25" }}
                       >
                         <svg className="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -1054,12 +1241,17 @@ export default function Home() {
                         </Button>
                         <Button
                           variant="outline"
-                          onClick={() => {
+                          onClick={async () => {
+                            // Edits are already autosaved; write out what's still buffered and show it
                             setEditingNote(null);
                             setNotePreview(false);
+                            await autosaveNote(editNoteMarkdown, editNoteTitle, true);
+                            autosaved.current = null;
+                            await selectNote(selectedNote.id);
+                            await refreshNotes([selectedNote.folder_id]);
                           }}
                         >
-                          Cancel
+                          Done
                         </Button>
                       </div>
                     </div>
@@ -1172,18 +1364,36 @@ export default function Home() {
 
                   <div>
                     <h3 className="text-lg font-semibold mb-4" style={{ color: "oklch(0.985 0 0)" }}>Unassigned Notes</h3>
-                    {notesLoading ? (
+                    <div className="flex items-center space-x-2 mb-4">
+                      <Input
+                        type="text"
+                        value={noteQuery}
+                        onChange={(e) => setNoteQuery(e.target.value)}
+                        placeholder="Search notes..."
+                      />
+                      <select
+                        value={noteSort}
+                        onChange={(e) => setNoteSort(e.target.value as NoteSort)}
+                        className="px-3 py-2 rounded-md border bg-background text-foreground text-sm"
+                        style={{ borderColor: "oklch(1 0 0 / 15%)" }}
+                      >
+                        <option value="">Best match</option>
+                        <option value="updated_at">Recently updated</option>
+                        <option value="title.keyword">Title</option>
+                      </select>
+                    </div>
+                    {notesLoading && notes.length === 0 ? (
                       <div className="text-muted-foreground">Loading...</div>
-                    ) : notes.filter(n => !n.folder_id).length === 0 ? (
-                      <div className="text-muted-foreground">No unassigned notes</div>
+                    ) : notes.length === 0 ? (
+                      <div className="text-muted-foreground">{noteQuery.trim() ? "No matching notes" : "No unassigned notes"}</div>
                     ) : (
                       <div className="grid grid-cols-2 gap-3">
-                        {notes.filter(n => !n.folder_id).map((note) => (
+                        {notes.map((note) => (
                           <Card 
                             key={note.id} 
                             className="cursor-pointer hover:bg-muted/50 transition-colors"
                             style={{ backgroundColor: "oklch(0.15 0 0)", borderColor: "oklch(1 0 0 / 10%)" }}
-                            onClick={() => setSelectedNote(note)}
+                            onClick={() => selectNote(note.id)}
                           >
                             <CardContent className="pt-4">
                               <div 
@@ -1192,14 +1402,25 @@ export default function Home() {
                               >
                                 {note.title}
                               </div>
-                              <div className="text-xs text-muted-foreground truncate">
-                                {note.notes.substring(0, 50)}{note.notes.length > 50 ? '...' : ''}
-                              </div>
+                              <div
+                                className="text-xs text-muted-foreground truncate"
+                                dangerouslySetInnerHTML={{ __html: note.snippet }}
+                              />
                             </CardContent>
                           </Card>
                         ))}
                       </div>
                     )}
+                    {notesCursor && (
+                      <Button
+                        variant="outline"
+                        onClick={() => fetchNotes(true)}
+                        disabled={notesLoading}
+                        className="w-full mt-3"
+                      >
+                        {notesLoading ? "Loading..." : "Load more"}
+                      </Button>
+                    )}
                   </div>
                 </div>
               )}
@@ -1217,10 +1438,10 @@ export default function Home() {
                 </DialogDescription>
               </DialogHeader>
               <div className="max-h-60 overflow-auto space-y-2 py-4">
-                {notes.filter(n => !n.folder_id || n.folder_id !== showAddToFolder).map((note) => (
+                {addCandidates.map((note) => (
                   <button
                     key={note.id}
-                    onClick={() => handleAddNoteToFolder(note.id, showAddToFolder)}
+                    onClick={() => handleAddNoteToFolder(note, showAddToFolder)}
                     className="w-full rounded-lg p-3 text-left transition-colors hover:bg-muted/50 border"
                     style={{ borderColor: "oklch(1 0 0 / 10%)" }}
                   >
@@ -1229,7 +1450,16 @@ export default function Home() {
                     </div>
                   </button>
                 ))}
-                {notes.filter(n => !n.folder_id || n.folder_id !== showAddToFolder).length === 0 && (
+                {addCandidatesCursor && (
+                  <Button
+                    variant="ghost"
+                    onClick={() => fetchAddCandidates(showAddToFolder, true)}
+                    className="w-full"
+                  >
+                    Load more
+                  </Button>
+                )}
+                {addCandidates.length === 0 && !addCandidatesCursor && (
                   <div className="text-muted-foreground text-center py-4">No notes available to add</div>
                 )}
               </div>
@@ -34,6 +34,67 @@ export interface NoteResponse {
   folder_id?: string;
   created_at?: string;
   updated_at?: string;
+  version: number;
+}
+
+// Replace `delete` code points at `pos` with `insert`
+export interface NoteSplice {
+  pos: number;
+  delete: number;
+  insert: string;
+}
+
+export interface NotePatch {
+  version: number;
+  ops: NoteSplice[];
+  title?: string;
+  folder_id?: string;
+}
+
+export interface NotePatchResponse {
+  id: string;
+  version: number;
+  saved: boolean;
+  length: number;
+}
+
+// The smallest single splice turning `before` into `after`, or null if they're equal
+export function noteSplice(before: string, after: string): NoteSplice | null {
+  const a = Array.from(before);
+  const b = Array.from(after);
+  let start = 0;
+  while (start < a.length && start < b.length && a[start] === b[start]) start++;
+  let end = 0;
+  while (end < a.length - start && end < b.length - start && a[a.length - 1 - end] === b[b.length - 1 - end]) end++;
+  if (start === a.length && start === b.length) return null;
+  return { pos: start, delete: a.length - start - end, insert: b.slice(start, b.length - end).join('') };
+}
+
+export interface NoteSummary {
+  id: string;
+  title: string;
+  folder_id?: string;
+  created_at?: string;
+  updated_at?: string;
+  snippet: string; // HTML-escaped, matches wrapped in <mark>
+  title_highlight?: string;
+  score?: number;
+}
+
+export interface NoteListResponse {
+  notes: NoteSummary[];
+  total: number;
+  next_cursor: string | null;
+}
+
+export interface NoteListParams {
+  q?: string;
+  folder_id?: string;
+  unassigned?: boolean;
+  sort?: 'updated_at' | 'title.keyword' | '_score';
+  order?: 'asc' | 'desc';
+  size?: number;
+  search_after?: string;
 }
 
 // Folder interfaces
@@ -50,6 +111,21 @@ export interface FolderResponse {
   folder_name: string;
   created_at?: string;
   updated_at?: string;
+  note_count: number;
+  last_note_updated_at?: string;
+}
+
+// Ingestion job interfaces
+export interface JobResponse {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  attempts: number;
+  error?: string;
+  result?: Record<string, unknown>;
+  progress?: Record<string, unknown>;
+  created_at: string;
+  updated_at: string;
 }
 
 // Agent chat interfaces
@@ -64,6 +140,12 @@ export interface Message {
   content: string;
 }
 
+export class ApiError extends Error {
+  constructor(message: string, public status: number) {
+    super(message);
+  }
+}
+
 class ApiService {
   private async request<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
     const url = `${API_BASE_URL}${endpoint}`;
@@ -77,12 +159,28 @@ class ApiService {
 
     if (!response.ok) {
       const error = await response.json().catch(() => ({}));
-      throw new Error(error.detail || `HTTP error! status: ${response.status}`);
+      const detail = typeof error.detail === 'object' ? error.detail?.message : error.detail;
+      throw new ApiError(detail || `HTTP error! status: ${response.status}`, response.status);
     }
 
     return response.json();
   }
 
+  // Uploads shed under load (503) are retried once the server's Retry-After has passed
+  private async postForm(endpoint: string, formData: FormData, attempts = 3): Promise<Response> {
+    for (let attempt = 1; ; attempt++) {
+      const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        method: 'POST',
+        body: formData,
+      });
+      if (response.status !== 503 || attempt >= attempts) {
+        return response;
+      }
+      const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+      await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+    }
+  }
+
   // Course API methods
   async getCourses(): Promise<CourseResponse[]> {
     return this.request<CourseResponse[]>('/api/courses');
@@ -106,8 +204,8 @@ class ApiService {
     });
   }
 
-  async deleteCourse(courseId: string): Promise<{ message: string }> {
-    return this.request<{ message: string }>(`/api/courses/${courseId}`, {
+  async deleteCourse(courseId: string): Promise<{ message: string; job_id: string; status: string }> {
+    return this.request<{ message: string; job_id: string; status: string }>(`/api/courses/${courseId}`, {
       method: 'DELETE',
     });
   }
@@ -117,33 +215,70 @@ class ApiService {
   }
 
   // Slides API methods
-  async getSlidesByCourse(courseId: string): Promise<{ slides: Array<{ id: string; course_id: string; course_name: string; filename: string; title: string; text_content: string }>, total: number }> {
-    return this.request(`/api/slides/${courseId}`);
+  async getSlidesByCourse(courseId: string, cursor?: string): Promise<{ slides: Array<{ id: string; course_id: string; course_name: string; filename: string; title: string; text_snippet: string; text_content?: string }>, total: number, next_cursor: string | null }> {
+    const query = cursor ? `?search_after=${encodeURIComponent(cursor)}` : '';
+    return this.request(`/api/slides/${courseId}${query}`);
   }
 
-  async uploadPdf(file: File, courseId: string, courseName: string, title: string): Promise<{ message: string; document_id: string; course_id: string; course_name: string; title: string; filename: string }> {
+  async uploadPdf(file: File, courseId: string, courseName: string, title: string): Promise<{ message: string; job_id: string; status: string; document_id: string; course_id: string; course_name: string; title: string; filename: string }> {
     const formData = new FormData();
     formData.append('file', file);
     formData.append('course_id', courseId);
     formData.append('course_name', courseName);
     formData.append('title', title);
 
-    const response = await fetch(`${API_BASE_URL}/api/upload`, {
-      method: 'POST',
-      body: formData,
-    });
+    const response = await this.postForm('/api/upload', formData);
 
     if (!response.ok) {
       const error = await response.json().catch(() => ({}));
-      throw new Error(error.error || `HTTP error! status: ${response.status}`);
+      throw new Error(error.detail || `HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  async uploadPdfBatch(files: File[], courseId: string, courseName: string, titles?: string[]): Promise<{ message: string; job_id: string; status: string; documents: Array<{ document_id: string; filename: string; title: string }> }> {
+    const formData = new FormData();
+    files.forEach(file => formData.append('files', file));
+    titles?.forEach(title => formData.append('titles', title));
+    formData.append('course_id', courseId);
+    formData.append('course_name', courseName);
+
+    const response = await this.postForm('/api/upload/batch', formData);
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `HTTP error! status: ${response.status}`);
     }
 
     return response.json();
   }
 
+  async getJob(jobId: string): Promise<JobResponse> {
+    return this.request<JobResponse>(`/api/jobs/${jobId}`);
+  }
+
+  async waitForJob(jobId: string, intervalMs = 1000): Promise<JobResponse> {
+    for (;;) {
+      const job = await this.getJob(jobId);
+      if (job.status === 'succeeded') {
+        return job;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Processing failed');
+      }
+      await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+  }
+
   // Note API methods
-  async getNotes(): Promise<NoteResponse[]> {
-    return this.request<NoteResponse[]>('/api/notes');
+  async listNotes(params: NoteListParams = {}): Promise<NoteListResponse> {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') query.set(key, String(value));
+    });
+    const qs = query.toString();
+    return this.request<NoteListResponse>(`/api/notes${qs ? `?${qs}` : ''}`);
   }
 
   async getNote(noteId: string): Promise<NoteResponse> {
@@ -164,6 +299,14 @@ class ApiService {
     });
   }
 
+  // Send just the edits since `patch.version`; the server coalesces them into one write
+  async patchNote(noteId: string, patch: NotePatch, flush: boolean = false): Promise<NotePatchResponse> {
+    return this.request<NotePatchResponse>(`/api/notes/${noteId}${flush ? '?flush=true' : ''}`, {
+      method: 'PATCH',
+      body: JSON.stringify(patch),
+    });
+  }
+
   async deleteNote(noteId: string): Promise<{ message: string }> {
     return this.request<{ message: string }>(`/api/notes/${noteId}`, {
       method: "DELETE",
@@ -193,8 +336,18 @@ class ApiService {
     });
   }
 
-  async deleteFolder(folderId: string): Promise<{ message: string }> {
-    return this.request<{ message: string }>(`/api/folders/${folderId}`, {
+  async getFolderNotes(folderId: string, cursor?: string): Promise<NoteListResponse> {
+    const query = cursor ? `?search_after=${encodeURIComponent(cursor)}` : '';
+    return this.request<NoteListResponse>(`/api/folders/${folderId}/notes${query}`);
+  }
+
+  async deleteFolder(
+    folderId: string,
+    notes: 'unassign' | 'delete' | 'move' = 'unassign',
+    moveTo?: string
+  ): Promise<{ message: string; notes_moved?: number; notes_deleted?: number }> {
+    const query = `?notes=${notes}${moveTo ? `&move_to=${encodeURIComponent(moveTo)}` : ''}`;
+    return this.request(`/api/folders/${folderId}${query}`, {
       method: 'DELETE',
     });
   }
@@ -205,6 +358,21 @@ class ApiService {
     });
   }
 
+  getThumbnailUrl(documentId: string, pageNumber: number): string {
+    return `${API_BASE_URL}/api/slides/${documentId}/pages/${pageNumber}/thumbnail`;
+  }
+
+  async getPdfBlob(documentId: string): Promise<Blob> {
+    const response = await fetch(`${API_BASE_URL}/api/pdf/${documentId}/raw`);
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `HTTP error! status: ${response.status}`);
+    }
+
+    return response.blob();
+  }
+
   async getPdfBinary(documentId: string): Promise<{ document_id: string; filename: string; pdf_binary: string; pdf_size: number; title: string }> {
     return this.request(`/api/pdf/${documentId}`);
   }